@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from api.routes.real_estate import fetch_options_route
 from api.routes.real_estate import download_zip_route
 from api.routes.real_estate import fetch_latest_notice_route
+from api.routes.real_estate import update_status_route
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.background import BackgroundScheduler
 
@@ -9,6 +10,7 @@ from ngui.preprocessing.process_real_estate_and_import import *
 from utils.logger import log_info
 from utils.response_helper import success_response, error_response
 from service.fetch_service import *
+from service.update_job import start_update
 
 scheduler = BackgroundScheduler()
 
@@ -18,9 +20,11 @@ scheduler = BackgroundScheduler()
 def cron_h2m0():
     log_info("📅 排程任務執行：每日 AM 02:00 任務已觸發")
 
-    # fetch_func()
-    
-    print("📅 每日排程：AM 02:00 任務已執行")
+    # 更新在獨立的子行程執行，排程執行緒立即返回；跨行程的重複執行由更新鎖擋下
+    if start_update("cron"):
+        print("📅 每日排程：AM 02:00 任務已啟動")
+    else:
+        print("⚠️ 每日排程：上一次更新仍在執行，略過此次")
 
 @asynccontextmanager
 async def _lifespan(_: FastAPI):
@@ -52,3 +56,4 @@ def read_root():
 app.include_router(fetch_options_route.router, prefix="/api")
 app.include_router(download_zip_route.router, prefix="/api")
 app.include_router(fetch_latest_notice_route.router, prefix="/api")
+app.include_router(update_status_route.router, prefix="/api")
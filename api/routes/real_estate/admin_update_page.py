@@ -1,11 +1,14 @@
 from nicegui import ui
-from ngui.components.sidebar import update_data  # 假設你原本的更新流程在這裡
+from service.update_job import start_update
 
 def create_admin_update_page():
     @ui.page('/admin/update')
     async def admin_update_page():
-        # 直接呼叫更新流程
-        await update_data()
+        # 更新在子行程執行，頁面立即回應；進度可由 /api/update/status 查詢
+        started = start_update("admin")
         # 回傳一個簡單頁面提示
         with ui.card():
-            ui.label('✅ 更新流程已觸發，請稍候檢查結果。')
+            if started:
+                ui.label('✅ 更新流程已觸發，請稍候檢查結果。')
+            else:
+                ui.label('⚠️ 更新流程執行中，請稍候檢查結果。')
@@ -1,35 +1,43 @@
 import os
-import requests
+import httpx
 from fastapi import APIRouter, Query
 from typing import Tuple
 
+from utils.http_download import download_file
 from utils.logger import log_error
 from enums.error_code import ErrorCode
 from utils.trace import generate_trace_id
 from utils.response_helper import success_response, error_response
+from config.open_data import SEASON_ZIP_URL
 from config.paths import RAW_DATA_DIR  # 統一使用全域可寫入資料夾
 
+def season_zip_url(season: str) -> str:
+    return SEASON_ZIP_URL.format(season=season)
+
+def season_zip_path(season: str) -> str:
+    # 使用全域資料夾
+    return os.path.join(RAW_DATA_DIR, f"{season}.zip")
+
 # ===== 核心下載函式 =====
 def download_season_zip(season: str) -> Tuple[bool, str, str]:
-    url = f"https://plvr.land.moi.gov.tw/DownloadSeason?season={season}&type=zip&fileName=lvr_landcsv.zip"
+    url = season_zip_url(season)
     trace_id = generate_trace_id()
 
-    # 使用全域資料夾
-    save_dir = RAW_DATA_DIR
-    zip_path = os.path.join(save_dir, f"{season}.zip")
-    os.makedirs(save_dir, exist_ok=True)
+    zip_path = season_zip_path(season)
+    os.makedirs(RAW_DATA_DIR, exist_ok=True)
 
     try:
-        response = requests.get(url, timeout=30)
-        if response.status_code != 200:
-            log_error(ErrorCode.FILE_NOT_FOUND.value, f"下載失敗: {response.status_code}", trace_id)
-            return False, f"下載失敗，狀態碼：{response.status_code}", trace_id
-
-        with open(zip_path, "wb") as f:
-            f.write(response.content)
+        # 串流寫入 .part 後再換名，中斷時下次從已下載的位置續傳
+        with httpx.Client(timeout=30, follow_redirects=True) as client:
+            download_file(client, url, zip_path)
 
         return True, f"{season}.zip 下載並儲存成功", ""
 
+    except httpx.HTTPStatusError as e:
+        status = e.response.status_code
+        log_error(ErrorCode.FILE_NOT_FOUND.value, f"下載失敗: {status}", trace_id)
+        return False, f"下載失敗，狀態碼：{status}", trace_id
+
     except Exception as e:
         log_error(ErrorCode.UNKNOWN_ERROR.value, str(e), trace_id)
         return False, f"下載過程出錯：{str(e)}", trace_id
@@ -1,22 +1,43 @@
 import os
 import json
-import requests
+import httpx
 from datetime import datetime
-# from playwright.sync_api import sync_playwright
-from playwright.async_api import async_playwright
 
 from fastapi import APIRouter
-from utils.logger import log_info, log_error
+from utils.download_validators import conditional_headers, load_validators, save_validators, update_validator
+from utils.http_download import download_file, remove_part
+from utils.logger import log_info, log_error, log_warning
 from utils.trace import generate_trace_id
-from utils.notice_parser import parse_notice_to_dict
+from utils.notice_parser import has_notice_dates, parse_notice_to_dict
+from utils.open_data_page import OPEN_DATA_URL, fetch_open_data_html, parse_notice_text, with_browser
 from enums.error_code import ErrorCode
 from utils.response_helper import success_response, error_response
+from config.open_data import LATEST_NOTICE_ZIP_URL
 from config.paths import RAW_DATA_DIR, OLD_DATA_DIR
 
 router = APIRouter()
 
+
+async def _notice_text_with_playwright(url: str) -> str:
+    return await with_browser(url, lambda browser: browser.notice_text())
+
+
+async def fetch_notice_text(url: str = OPEN_DATA_URL) -> str:
+    """
+    取得本期公告文字：先以 HTTP + BeautifulSoup 解析靜態 HTML，
+    靜態頁面沒有公告日期 (例如改由 JavaScript 渲染) 或請求失敗時才啟動 Playwright。
+    """
+    try:
+        span_text = parse_notice_text(await fetch_open_data_html(url))
+        if has_notice_dates(span_text):
+            return span_text
+        log_warning("⚠️[靜態頁面] 找不到本期公告文字，改用 Playwright 抓取")
+    except httpx.HTTPError as e:
+        log_warning(f"⚠️[靜態頁面] 請求失敗（{type(e).__name__}: {e}），改用 Playwright 抓取")
+    return await _notice_text_with_playwright(url)
+
+
 async def info_json() -> dict:
-    url = "https://plvr.land.moi.gov.tw/DownloadOpenData"
     trace_id = generate_trace_id()
     json_path = os.path.join(RAW_DATA_DIR, "latest_notice.json")
     zip_path = os.path.join(RAW_DATA_DIR, "latest_notice.zip")
@@ -25,14 +46,7 @@ async def info_json() -> dict:
     os.makedirs(OLD_DATA_DIR, exist_ok=True)
 
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            await page.goto(url, timeout=30000)
-
-            # 等待元素渲染出來
-            span_text = await page.locator("#tab_opendata_active_content span.text-danger").inner_text(timeout=10000)
-            await browser.close()
+        span_text = await fetch_notice_text()
 
         # 解析公告文字
         new = parse_notice_to_dict(span_text)
@@ -52,6 +66,8 @@ async def info_json() -> dict:
             os.rename(json_path, os.path.join(OLD_DATA_DIR, f"{timestamp}_latest_notice.json"))
         if os.path.exists(zip_path):
             os.rename(zip_path, os.path.join(OLD_DATA_DIR, f"{timestamp}_latest_notice.zip"))
+        # 公告已更新，上一期未下載完的 .part 不能拿來續傳
+        remove_part(zip_path)
 
         # 儲存新 JSON
         with open(json_path, "w", encoding="utf-8") as f:
@@ -67,21 +83,37 @@ async def info_json() -> dict:
 def latest_notice_zip() -> dict:
     trace_id = generate_trace_id()
     try:
-        zip_url = "https://plvr.land.moi.gov.tw/Download?type=zip&fileName=lvr_landcsv.zip"
-        response = requests.get(zip_url, timeout=30)
+        zip_url = LATEST_NOTICE_ZIP_URL
         zip_path = os.path.join(RAW_DATA_DIR, "latest_notice.zip")
         os.makedirs(RAW_DATA_DIR, exist_ok=True)
 
-        if response.status_code != 200:
-            log_error(ErrorCode.FILE_NOT_FOUND.value, f"HTTP {response.status_code}", trace_id)
-            return {"success": False, "trace_id": trace_id, "error": f"HTTP {response.status_code}"}
-
-        with open(zip_path, "wb") as f:
-            f.write(response.content)
-
+        # 串流寫入 .part 後再換名，中斷時下次從已下載的位置續傳；
+        # 以上次的 ETag / Last-Modified 送出條件式請求，內容未變更時不需重新解壓、匯入
+        validators = load_validators()
+        with httpx.Client(timeout=30, follow_redirects=True) as client:
+            result = download_file(client, zip_url, zip_path, conditional_headers(validators, zip_url))
+
+        if result["not_modified"]:
+            log_info("☑️[無須更新][本期下載 zip] 伺服器回應 304，內容未變更")
+            return {"success": True, "updated": False, "content": None}
+
+        changed = update_validator(validators, zip_url, zip_path, result["etag"], result["last_modified"])
+        save_validators(validators)
+        if not changed:
+            os.remove(zip_path)
+            log_info("☑️[無須更新][本期下載 zip] 檔案大小與 sha256 與上次相同")
+            return {"success": True, "updated": False, "content": None}
+
+        if result["resumed_from"]:
+            log_info(f"☑️[續傳] 從 {result['resumed_from']} bytes 接續下載")
         log_info("✅[下載成功]")
         return {"success": True, "updated": True, "content": None}
 
+    except httpx.HTTPStatusError as e:
+        status = e.response.status_code
+        log_error(ErrorCode.FILE_NOT_FOUND.value, f"HTTP {status}", trace_id)
+        return {"success": False, "trace_id": trace_id, "error": f"HTTP {status}"}
+
     except Exception as e:
         log_error(ErrorCode.UNKNOWN_ERROR.value, str(e), trace_id)
         return {"success": False, "trace_id": trace_id, "error": str(e)}
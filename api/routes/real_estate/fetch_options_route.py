@@ -1,12 +1,12 @@
 import os
 import json
-import requests
+import httpx
 from fastapi import APIRouter
 import asyncio
-from playwright.async_api import async_playwright
 
 from enums.error_code import ErrorCode
-from utils.logger import log_error
+from utils.logger import log_error, log_warning
+from utils.open_data_page import OPEN_DATA_URL, fetch_open_data_html, parse_history_options, with_browser
 from utils.trace import generate_trace_id
 from config.paths import RAW_DATA_DIR
 
@@ -39,34 +39,29 @@ def need_to_update_or_not(new_data: dict) -> bool:
     return updated
 
 
-async def get_history_data_and_save() -> dict:
-    trace_id = generate_trace_id()
-    try:
-        url = "https://plvr.land.moi.gov.tw/DownloadOpenData"
-
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            await page.goto(url, timeout=30000)
-
-            # 切換到「歷史資料」分頁
-            await page.locator('a.btndl[aria-controls="tab_opendata_history_content"]').click()
+async def _history_options_with_playwright(url: str) -> dict:
+    return await with_browser(url, lambda browser: browser.history_options())
 
-            # 等待 select 出現
-            select_locator = page.locator("#historySeason_id")
-            await select_locator.wait_for(timeout=10000)
 
-            # 正確方式：拿 element handles
-            option_handles = await select_locator.locator("option").element_handles()
+async def fetch_history_options(url: str = OPEN_DATA_URL) -> dict:
+    """
+    取得歷史期別選單 {value: 文字}：先以 HTTP + BeautifulSoup 解析靜態 HTML，
+    靜態頁面沒有選項或請求失敗時才啟動 Playwright。
+    """
+    try:
+        options = parse_history_options(await fetch_open_data_html(url))
+        if options:
+            return options
+        log_warning("⚠️[靜態頁面] 找不到歷史期別選單，改用 Playwright 抓取")
+    except httpx.HTTPError as e:
+        log_warning(f"⚠️[靜態頁面] 請求失敗（{type(e).__name__}: {e}），改用 Playwright 抓取")
+    return await _history_options_with_playwright(url)
 
-            result = {"historySeason_id": {}}
-            for opt in option_handles:
-                value = await opt.get_attribute("value")
-                if value:
-                    text = (await opt.inner_text()).strip()
-                    result["historySeason_id"][value] = text
 
-            await browser.close()
+async def get_history_data_and_save() -> dict:
+    trace_id = generate_trace_id()
+    try:
+        result = {"historySeason_id": await fetch_history_options()}
 
         if not result["historySeason_id"]:
             msg = "抓取失敗，歷史 Season 選單為空"
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+
+from service.update_job import get_update_status
+from utils.response_helper import success_response
+
+# ===== FastAPI Router =====
+router = APIRouter()
+
+
+@router.get("/update/status")
+def update_status():
+    # 同步路由由 FastAPI 的執行緒池處理，檢查檔案鎖不會卡住 event loop
+    return success_response(data=get_update_status(), message="更新狀態")
@@ -0,0 +1,83 @@
+"""
+不連網的端對端 benchmark：以本機模擬下載站 (FakeMoiServer) 取代內政部網站，
+實際執行 fetch_data (抓公告、下載、解壓縮) 與 apply_clean_and_import_file (清洗、匯入)，並列出各步驟耗時。
+
+    python -m benchmarks.bench_fetch_and_import --seasons 4 --rows 2000
+    python -m benchmarks.bench_fetch_and_import --seasons 1 --rows 50 --max-seconds 60   # CI：超過時間回傳非 0
+
+依序執行三輪：
+- 首次：下載本期與所有歷史期別並匯入
+- 公告更新、檔案未變更：公告文字改變但壓縮檔相同，應由條件式請求略過下載與匯入
+- 公告未變更：只抓公告文字
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# 必須在匯入專案模組 (config.paths、config.open_data) 之前指定資料根目錄與下載站網址
+BENCH_ROOT = tempfile.mkdtemp(prefix="land_bot_bench_")
+os.environ["LAND_BOT_DATA_ROOT"] = BENCH_ROOT
+
+from benchmarks.fake_moi_server import DEFAULT_NOTICE, FakeMoiServer  # noqa: E402
+
+
+def _run_round(name: str, workers: int) -> dict:
+    from ngui.preprocessing.process_real_estate_and_import import apply_clean_and_import_file
+    from service.fetch_service import fetch_data
+
+    timings = {}
+    started = time.perf_counter()
+    success, need_db = asyncio.run(fetch_data(timings))
+    if not success:
+        raise RuntimeError(f"{name}：fetch_data 失敗")
+
+    rows = 0
+    if need_db:
+        import_started = time.perf_counter()
+        rows = apply_clean_and_import_file(workers=workers)["rows"]
+        timings["匯入"] = round(time.perf_counter() - import_started, 3)
+    return {"name": name, "need_db": need_db, "rows": rows, "timings": timings,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seasons", type=int, default=4, help="歷史期別數")
+    parser.add_argument("--rows", type=int, default=2000, help="每個 a 檔的筆數 (b 檔為 1/4)")
+    parser.add_argument("--latency", type=float, default=0.0, help="每個請求的模擬延遲秒數")
+    parser.add_argument("--workers", type=int, default=1, help="匯入時平行清洗的子行程數")
+    parser.add_argument("--max-seconds", type=float, default=None, help="首次匯入超過此秒數時回傳 1")
+    args = parser.parse_args()
+
+    server = FakeMoiServer.with_synthetic_data(args.seasons, args.rows, args.latency).start()
+    os.environ["OPEN_DATA_BASE_URL"] = server.base_url
+    try:
+        results = [_run_round("首次", args.workers)]
+        server.notice_text = DEFAULT_NOTICE.replace("6月20日", "6月30日")
+        results.append(_run_round("公告更新、檔案未變更", args.workers))
+        results.append(_run_round("公告未變更", args.workers))
+    finally:
+        server.stop()
+        shutil.rmtree(BENCH_ROOT, ignore_errors=True)
+
+    print(f"\n模擬下載站：{args.seasons} 期歷史資料 + 本期，每個 a 檔 {args.rows} 筆，共 {len(server.requests)} 個請求")
+    for result in results:
+        steps = "、".join(f"{step} {seconds:.2f}" for step, seconds in result["timings"].items())
+        print(f"{result['name']:<12} 總計 {result['seconds']:>7.2f} 秒  匯入 {result['rows']:>8} 筆  ({steps})")
+
+    first = results[0]
+    if not first["rows"] or any(result["need_db"] for result in results[1:]):
+        print("❌ 匯入結果不符預期")
+        return 1
+    if args.max_seconds is not None and first["seconds"] > args.max_seconds:
+        print(f"❌ 首次匯入耗時 {first['seconds']:.2f} 秒，超過上限 {args.max_seconds} 秒")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+比較「分階段」與「管線式」匯入多個期別的總耗時。
+
+    python -m benchmarks.bench_ingest_pipeline --seasons 6 --rows 5000 --latency 0.5
+
+以本機模擬下載站 (FakeMoiServer) 提供模擬期別壓縮檔，latency 模擬每期的下載時間：
+- 分階段：download_seasons 下載全部 → 逐一解壓縮 → apply_clean_and_import_file 匯入全部
+- 管線式：run_ingest_pipeline，下載、解壓縮、清洗、匯入同時進行
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+# 必須在匯入專案模組 (config.paths) 之前指定資料根目錄，避免寫到正式資料庫
+BENCH_ROOT = tempfile.mkdtemp(prefix="land_bot_bench_")
+os.environ["LAND_BOT_DATA_ROOT"] = BENCH_ROOT
+
+from benchmarks.fake_moi_server import FakeMoiServer  # noqa: E402
+from benchmarks.synthetic_lvr_land import build_season_zip  # noqa: E402
+
+
+def _reset_data():
+    from config.paths import DB_PATH, OLD_DATA_DIR, RAW_DATA_DIR
+
+    for path in (DB_PATH, DB_PATH + "-wal", DB_PATH + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    for directory in (RAW_DATA_DIR, OLD_DATA_DIR):
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def _phased(seasons, workers: int, clean_workers: int) -> float:
+    from ngui.preprocessing.process_real_estate_and_import import apply_clean_and_import_file
+    from service.ingest_pipeline import extract_season
+    from service.season_downloader import download_seasons
+
+    started = time.perf_counter()
+    asyncio.run(download_seasons(seasons, concurrency=workers))
+    for season in seasons:
+        extract_season(season)
+    apply_clean_and_import_file(workers=clean_workers)
+    return time.perf_counter() - started
+
+
+def _pipelined(seasons, workers: int, clean_workers: int) -> float:
+    from service.ingest_pipeline import run_ingest_pipeline
+
+    started = time.perf_counter()
+    asyncio.run(run_ingest_pipeline(seasons, download_workers=workers, clean_workers=clean_workers))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seasons", type=int, default=6)
+    parser.add_argument("--rows", type=int, default=5000, help="每個 a 檔的筆數 (b 檔為 1/4)")
+    parser.add_argument("--latency", type=float, default=0.5, help="每期下載的模擬延遲秒數")
+    parser.add_argument("--download-workers", type=int, default=1)
+    parser.add_argument("--clean-workers", type=int, default=1)
+    args = parser.parse_args()
+
+    from service import season_downloader
+
+    seasons = [f"{100 + i // 4}S{i % 4 + 1}" for i in range(args.seasons)]
+    zips = {season: build_season_zip(args.rows, seed=i) for i, season in enumerate(seasons)}
+
+    try:
+        with FakeMoiServer(zips, latency=args.latency) as server:
+            season_downloader.season_zip_url = server.season_url
+            results = []
+            for name, run in (("分階段", _phased), ("管線式", _pipelined)):
+                _reset_data()
+                results.append((name, run(seasons, args.download_workers, args.clean_workers)))
+
+        print(f"{'模式':<8}{'耗時 (秒)':>12}")
+        for name, seconds in results:
+            print(f"{name:<8}{seconds:>12.2f}")
+    finally:
+        shutil.rmtree(BENCH_ROOT, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+比較 SQLite 寫入端在一般模式與大量匯入模式 (bulk_load_session) 下的寫入速度。
+
+    python -m benchmarks.bench_sqlite_load --rows 20000
+
+以模擬資料產生一整期 (22 個縣市代碼 a/b 檔) 的 CSV，先清洗成 DataFrame，
+再分別計時「僅寫入」與「完整匯入 (讀檔 + 清洗 + 寫入)」兩種情況的每秒筆數。
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+# 必須在匯入專案模組 (config.paths) 之前指定資料根目錄，避免寫到正式資料庫
+BENCH_ROOT = tempfile.mkdtemp(prefix="land_bot_bench_")
+os.environ["LAND_BOT_DATA_ROOT"] = BENCH_ROOT
+
+from benchmarks.synthetic_lvr_land import write_season_csvs  # noqa: E402
+
+
+def _sink_to_sql(season_dir: str, db_path: str) -> float:
+    """
+    改版前的寫入方式：預設日誌模式下每個 chunk 以 pandas to_sql 寫入 (每次呼叫各自 commit)。
+    """
+    from ngui.preprocessing.process_real_estate_and_import import clean_file, create_city_table
+
+    files = sorted(os.path.join(season_dir, f) for f in os.listdir(season_dir))
+    cleaned = [clean_file(path) for path in files]
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+
+    started = time.perf_counter()
+    rows = 0
+    for city, chunks, _ in cleaned:
+        for df in chunks:
+            create_city_table(conn, city, df)
+            df.to_sql(city, conn, if_exists="append", index=False)
+            rows += len(df)
+    conn.commit()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return rows / elapsed
+
+
+def _sink_only(season_dir: str, db_path: str, bulk_load: bool) -> float:
+    from ngui.preprocessing.process_real_estate_and_import import (
+        check_import_needed, clean_file, get_city_name, write_file_transaction,
+    )
+    from ngui.preprocessing.sqlite_bulk_load import bulk_load_session
+
+    files = sorted(os.path.join(season_dir, f) for f in os.listdir(season_dir))
+    cleaned = [clean_file(path) for path in files]
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    pending = [check_import_needed(conn, "bench", path) for path in files]
+    cities = {get_city_name(os.path.basename(path)) for path in files}
+
+    started = time.perf_counter()
+    rows = 0
+    if bulk_load:
+        with bulk_load_session(conn, cities):
+            for path, task, (city, chunks, _) in zip(files, pending, cleaned):
+                rows += write_file_transaction(conn, task, os.path.basename(path), city, chunks)
+    else:
+        for path, task, (city, chunks, _) in zip(files, pending, cleaned):
+            rows += write_file_transaction(conn, task, os.path.basename(path), city, chunks)
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return rows / elapsed
+
+
+def _full_import(root: str, season_src: str, bulk_load: bool) -> float:
+    from ngui.preprocessing.process_real_estate_and_import import apply_clean_and_import_file
+    from config.paths import DB_PATH, OLD_DATA_DIR, RAW_DATA_DIR
+
+    for path in (DB_PATH, DB_PATH + "-wal", DB_PATH + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(OLD_DATA_DIR, ignore_errors=True)
+    shutil.copytree(season_src, os.path.join(RAW_DATA_DIR, "bench"), dirs_exist_ok=True)
+
+    stats = apply_clean_and_import_file(workers=1, bulk_load=bulk_load)
+    return stats["rows"] / stats["seconds"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="每個 a 檔的筆數 (b 檔為 1/4)")
+    args = parser.parse_args()
+
+    root = BENCH_ROOT
+    season_src = os.path.join(root, "season_src")
+    total = write_season_csvs(season_src, args.rows)
+    print(f"模擬資料：{total} 筆，位於 {season_src}")
+
+    try:
+        sink_db = os.path.join(root, "sink.sqlite")
+        results = [("to_sql (改版前)", _sink_to_sql(season_src, sink_db), None)]
+        for bulk_load in (False, True):
+            sink = _sink_only(season_src, sink_db, bulk_load)
+            full = _full_import(root, season_src, bulk_load)
+            results.append(("bulk_load" if bulk_load else "default", sink, full))
+
+        print(f"{'模式':<16}{'僅寫入 (筆/秒)':>16}{'完整匯入 (筆/秒)':>16}")
+        for name, sink, full in results:
+            full_text = f"{full:,.0f}" if full is not None else "-"
+            print(f"{name:<16}{sink:>16,.0f}{full_text:>16}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+本機模擬的內政部實價登錄下載站，可單獨啟動供手動測試 (設定 OPEN_DATA_BASE_URL 指向它)：
+
+    python -m benchmarks.fake_moi_server --seasons 4 --rows 2000 --port 8765
+    OPEN_DATA_BASE_URL=http://127.0.0.1:8765 python sqlite.py
+"""
+import argparse
+import hashlib
+import html
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# 本期資料 (/Download) 在 fail_counts、truncate_at、requests 中使用的代號
+LATEST_KEY = "latest"
+
+DEFAULT_NOTICE = ("資料內容：登記日期 114年6月11日至 114年6月20日之買賣案件，"
+                  "及訂約日期 114年5月11日至 114年5月20日之租賃案件，"
+                  "及交易日期114年5月11日至 114年5月20日之預售屋案件")
+
+
+def synthetic_seasons(count: int, last_year: int = 113) -> List[str]:
+    """
+    由新到舊的期別代號，例如 ["113S4", "113S3", ...]。
+    """
+    return [f"{last_year - i // 4}S{4 - i % 4}" for i in range(count)]
+
+
+class FakeMoiServer:
+    """
+    本機模擬的內政部實價登錄下載站 (測試、benchmark 用)：
+    - GET /DownloadSeason?season=<期別> 回傳 seasons[期別] 的 zip 內容，不存在的期別回 404
+    - GET /Download 回傳 latest_zip (本期資料)，未設定時回 404
+    - GET /DownloadOpenData 回傳資料下載頁面：有設定 open_data_html 時原樣回傳，
+      否則依 notice_text 與 seasons 產生含本期公告與 historySeason_id 選單的靜態 HTML
+    - latency：每個請求回應前的延遲秒數，模擬往返時間
+    - fail_counts：各期別前 N 次請求回 503，模擬暫時性錯誤
+    - truncate_at：各期別下一次請求只送出前 N bytes 就斷線，模擬下載中斷 (觸發一次後移除)
+    - supports_range：是否支援 Range: bytes=<start>- 續傳 (回 206)；False 時一律回完整內容。
+      帶有 If-Range 且與目前的 ETag / Last-Modified 不符時 (內容已變更) 回完整內容
+    - send_validators：是否回傳 ETag / Last-Modified 並處理 If-None-Match / If-Modified-Since (回 304)
+    """
+    LAST_MODIFIED = "Mon, 01 Jan 2024 00:00:00 GMT"
+
+    def __init__(
+        self,
+        seasons: Optional[Dict[str, bytes]] = None,
+        latency: float = 0.0,
+        latest_zip: Optional[bytes] = None,
+        notice_text: str = DEFAULT_NOTICE,
+    ):
+        self.seasons: Dict[str, bytes] = dict(seasons or {})
+        self.latest_zip = latest_zip
+        self.notice_text = notice_text
+        self.latency = latency
+        self.fail_counts: Dict[str, int] = {}
+        self.truncate_at: Dict[str, int] = {}
+        self.supports_range = True
+        self.send_validators = True
+        self.open_data_html = ""
+        self.requests: List[Dict] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def season_url(self, season: str) -> str:
+        return f"{self.base_url}/DownloadSeason?season={season}&type=zip&fileName=lvr_landcsv.zip"
+
+    @classmethod
+    def with_synthetic_data(cls, season_count: int, rows_per_file: int, latency: float = 0.0) -> "FakeMoiServer":
+        """
+        以模擬資料建立：season_count 期歷史資料與一份本期資料，每期含各縣市 a/b 檔 (a 檔 rows_per_file 筆)。
+        """
+        from benchmarks.synthetic_lvr_land import build_season_zip
+
+        seasons = {season: build_season_zip(rows_per_file, seed=i + 1)
+                   for i, season in enumerate(synthetic_seasons(season_count))}
+        return cls(seasons, latency=latency, latest_zip=build_season_zip(rows_per_file, seed=0))
+
+    def render_open_data_html(self) -> str:
+        if self.open_data_html:
+            return self.open_data_html
+        options = "\n".join(
+            f'      <option value="{html.escape(season)}">{html.escape(season)}</option>' for season in self.seasons
+        )
+        return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>不動產成交案件實際資訊資料供應系統</title></head>
+<body>
+  <a class="btndl" aria-controls="tab_opendata_active_content">本期下載</a>
+  <a class="btndl" aria-controls="tab_opendata_history_content">歷史資料</a>
+  <div id="tab_opendata_active_content">
+    <span class="text-danger">{html.escape(self.notice_text)}</span>
+  </div>
+  <div id="tab_opendata_history_content">
+    <select id="historySeason_id">
+      <option value="">請選擇</option>
+{options}
+    </select>
+  </div>
+</body></html>
+"""
+
+    def start(self, port: int = 0) -> "FakeMoiServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeMoiServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _record(self, key: str, path: str, headers: Dict[str, str]) -> bool:
+        """
+        紀錄請求，回傳此請求是否應模擬失敗。
+        """
+        with self._lock:
+            self.requests.append({"path": path, "season": key, "headers": headers, "time": time.perf_counter()})
+            remaining = self.fail_counts.get(key, 0)
+            if remaining:
+                self.fail_counts[key] = remaining - 1
+            return remaining > 0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                try:
+                    self._serve()
+                except (BrokenPipeError, ConnectionResetError):
+                    # 用戶端逾時或取消下載時會先斷線，不需要印出錯誤
+                    self.close_connection = True
+
+            def _serve(self):
+                if server.latency:
+                    time.sleep(server.latency)
+
+                url = urlparse(self.path)
+                key = LATEST_KEY if url.path == "/Download" else parse_qs(url.query).get("season", [""])[0]
+                if server._record(key, self.path, dict(self.headers)):
+                    self.send_error(503)
+                    return
+                if url.path == "/DownloadOpenData":
+                    body = server.render_open_data_html().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                if url.path == "/Download":
+                    body = server.latest_zip
+                elif url.path == "/DownloadSeason":
+                    body = server.seasons.get(key)
+                else:
+                    body = None
+                if body is None:
+                    self.send_error(404)
+                    return
+
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if server.send_validators and self._not_modified(etag):
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                start = self._range_start(len(body), etag)
+                if start is None:
+                    self.send_error(416)
+                    return
+
+                self.send_response(206 if start else 200)
+                self.send_header("Content-Type", "application/zip")
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(len(body) - start))
+                if server.send_validators:
+                    self.send_header("ETag", etag)
+                    self.send_header("Last-Modified", server.LAST_MODIFIED)
+                if start:
+                    self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+                self.end_headers()
+
+                with server._lock:
+                    cut = server.truncate_at.pop(key, None)
+                if cut is not None:
+                    self.wfile.write(body[start:start + cut])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body[start:])
+
+            def _not_modified(self, etag: str) -> bool:
+                if "If-None-Match" in self.headers:
+                    return self.headers["If-None-Match"] == etag
+                return self.headers.get("If-Modified-Since") == server.LAST_MODIFIED
+
+            def _range_start(self, size: int, etag: str) -> Optional[int]:
+                """
+                回傳續傳起點 (0 代表回完整內容)；超出檔案大小時回傳 None (416)。
+                """
+                spec = self.headers.get("Range", "")
+                if_range = self.headers.get("If-Range")
+                if if_range is not None and if_range not in (etag, server.LAST_MODIFIED):
+                    return 0
+                if not server.supports_range or not spec.startswith("bytes=") or not spec.endswith("-"):
+                    return 0
+                start = spec[len("bytes="):-1]
+                if not start.isdigit():
+                    return 0
+                return int(start) if int(start) < size else None
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seasons", type=int, default=4, help="歷史期別數")
+    parser.add_argument("--rows", type=int, default=2000, help="每個 a 檔的筆數 (b 檔為 1/4)")
+    parser.add_argument("--latency", type=float, default=0.0, help="每個請求的模擬延遲秒數")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = FakeMoiServer.with_synthetic_data(args.seasons, args.rows, args.latency).start(args.port)
+    print(f"模擬下載站：{server.base_url} (期別：{', '.join(server.seasons)})，Ctrl+C 結束")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
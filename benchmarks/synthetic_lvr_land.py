@@ -0,0 +1,97 @@
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+import numpy as np
+import pandas as pd
+
+from ngui.preprocessing.process_real_estate_and_import import CITY_CODE_MAP
+
+# 內政部實價登錄 lvr_land 檔案的欄位 (a: 不動產買賣、b: 預售屋買賣)
+LVR_LAND_A_COLUMNS = [
+    "鄉鎮市區", "交易標的", "土地位置建物門牌", "土地移轉總面積平方公尺", "都市土地使用分區",
+    "非都市土地使用分區", "非都市土地使用編定", "交易年月日", "交易筆棟數", "移轉層次", "總樓層數",
+    "建物型態", "主要用途", "主要建材", "建築完成年月", "建物移轉總面積平方公尺", "建物現況格局-房",
+    "建物現況格局-廳", "建物現況格局-衛", "建物現況格局-隔間", "有無管理組織", "總價元",
+    "單價元平方公尺", "車位類別", "車位移轉總面積(平方公尺)", "車位總價元", "備註", "編號",
+    "主建物面積", "附屬建物面積", "陽台面積", "電梯", "移轉編號",
+]
+LVR_LAND_B_COLUMNS = LVR_LAND_A_COLUMNS[:24] + [
+    "車位移轉總面積平方公尺", "車位總價元", "備註", "編號", "建案名稱", "棟及號", "解約情形",
+]
+
+TRADE_OBJECTS = ["房地(土地+建物)", "房地(土地+建物)+車位", "土地", "建物", "車位"]
+BUILDING_TYPES = ["住宅大樓(11層含以上有電梯)", "華廈(10層含以下有電梯)", "公寓(5樓含以下無電梯)",
+                  "透天厝", "套房(1房1廳1衛)", "其他"]
+DISTRICTS = ["中正區", "大安區", "信義區", "板橋區", "中和區", "西屯區", "前鎮區", "東區"]
+
+
+def build_lvr_land_frame(rows: int, presale: bool = False, seed: int = 0) -> pd.DataFrame:
+    """
+    產生欄位與格式接近實價登錄 CSV 的模擬資料 (民國年月日、平方公尺、元)。
+    """
+    rng = np.random.default_rng(seed)
+    columns = LVR_LAND_B_COLUMNS if presale else LVR_LAND_A_COLUMNS
+
+    trade = rng.integers(101, 114, rows) * 10000 + rng.integers(1, 13, rows) * 100 + rng.integers(1, 29, rows)
+    build = trade - rng.integers(0, 45, rows) * 10000
+    area = np.round(rng.gamma(2.0, 45.0, rows), 2)
+    price = (area * rng.uniform(80000, 400000, rows)).astype("int64")
+
+    df = pd.DataFrame({col: "" for col in columns}, index=range(rows))
+    df["鄉鎮市區"] = rng.choice(DISTRICTS, rows)
+    df["交易標的"] = rng.choice(TRADE_OBJECTS, rows, p=[0.5, 0.25, 0.15, 0.05, 0.05])
+    df["交易年月日"] = trade.astype(str)
+    df["建物型態"] = rng.choice(BUILDING_TYPES, rows)
+    df["主要用途"] = "住家用"
+    df["建築完成年月"] = "" if presale else [f"{d:07d}" for d in build]
+    df["建物移轉總面積平方公尺"] = area.astype(str)
+    df["總價元"] = price.astype(str)
+    df["單價元平方公尺"] = (price / np.maximum(area, 1)).astype("int64").astype(str)
+    car_area_column = "車位移轉總面積平方公尺" if presale else "車位移轉總面積(平方公尺)"
+    has_car = rng.random(rows) < 0.3
+    df[car_area_column] = np.where(has_car, np.round(rng.uniform(10, 40, rows), 2), 0).astype(str)
+    df["車位總價元"] = np.where(has_car, rng.integers(500000, 3000000, rows), 0).astype(str)
+    df["編號"] = [f"RPSYN{seed:04d}{i:08d}" for i in range(rows)]
+    return df
+
+
+def write_lvr_land_csv(path: str, rows: int, presale: bool = False, seed: int = 0):
+    df = build_lvr_land_frame(rows, presale=presale, seed=seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(df.columns) + "\n")
+        # 實際檔案第二列為英文欄名，匯入時會略過
+        f.write(",".join(f"column {i}" for i in range(len(df.columns))) + "\n")
+        df.to_csv(f, header=False, index=False)
+
+
+def write_season_csvs(directory: str, rows_per_file: int, seed: int = 0) -> int:
+    """
+    在 directory 底下產生一整期各縣市的 *_lvr_land_a.csv / *_lvr_land_b.csv，回傳總筆數。
+    """
+    os.makedirs(directory, exist_ok=True)
+    total = 0
+    for i, code in enumerate(sorted(CITY_CODE_MAP)):
+        for j, kind in enumerate("ab"):
+            rows = rows_per_file if kind == "a" else max(rows_per_file // 4, 1)
+            write_lvr_land_csv(os.path.join(directory, f"{code}_lvr_land_{kind}.csv"),
+                               rows, presale=(kind == "b"), seed=seed * 100 + i * 2 + j)
+            total += rows
+    return total
+
+
+def build_season_zip(rows_per_file: int, seed: int = 0) -> bytes:
+    """
+    產生一整期的模擬壓縮檔內容 (各縣市 a/b 檔，與 write_season_csvs 相同)。
+    """
+    directory = tempfile.mkdtemp(prefix="lvr_land_season_")
+    try:
+        write_season_csvs(directory, rows_per_file, seed=seed)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name in sorted(os.listdir(directory)):
+                archive.write(os.path.join(directory, name), name)
+        return buffer.getvalue()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
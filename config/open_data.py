@@ -0,0 +1,11 @@
+import os
+
+# 內政部實價登錄開放資料網站；可由環境變數改指向本機模擬站 (benchmark、測試用，見 benchmarks/fake_moi_server.py)
+OPEN_DATA_BASE_URL = os.getenv("OPEN_DATA_BASE_URL", "https://plvr.land.moi.gov.tw").rstrip("/")
+
+# 資料下載頁面 (本期公告文字、歷史期別選單)
+OPEN_DATA_URL = f"{OPEN_DATA_BASE_URL}/DownloadOpenData"
+# 本期資料壓縮檔
+LATEST_NOTICE_ZIP_URL = f"{OPEN_DATA_BASE_URL}/Download?type=zip&fileName=lvr_landcsv.zip"
+# 歷史期別壓縮檔
+SEASON_ZIP_URL = OPEN_DATA_BASE_URL + "/DownloadSeason?season={season}&type=zip&fileName=lvr_landcsv.zip"
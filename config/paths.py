@@ -2,7 +2,10 @@ import os
 import sys
 import tempfile
 
-if sys.platform.startswith("win"):
+if os.getenv("LAND_BOT_DATA_ROOT"):
+    # 可由環境變數指定資料根目錄 (benchmark、測試用)
+    TMP_ROOT = os.getenv("LAND_BOT_DATA_ROOT")
+elif sys.platform.startswith("win"):
     PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     TMP_ROOT = os.path.join(PROJECT_ROOT, "api/data/real_estate")
 else:
@@ -154,7 +154,7 @@ def render_data_distribution():
                     return False
 
                 try:
-                    df = query_distribution_data(
+                    df = await aquery_distribution_data(
                         year_value, city_value, type_value, status_value, 
                         remove_percent, remove_zero, limit_100m)
                 except Exception as e:
@@ -293,7 +293,7 @@ def render_multi_city_3d():
                     return
 
                 try:
-                    df = query_multi_city_3d_data(
+                    df = await aquery_multi_city_3d_data(
                         selected_cities, selected_year, type_value, status_value, 
                         remove_percent, remove_zero, limit_100m)
                 except Exception as e:
@@ -395,7 +395,7 @@ def render_data_trends():
                     return False
 
                 try:
-                    df = query_avg_price(city_value, trade_type, year_value, house_status)
+                    df = await aquery_avg_price(city_value, trade_type, year_value, house_status)
                 except Exception as e:
                     ui.notify('查詢失敗，請反應給站長協助處理', type='negative', position='top')
                     log_warning(f'查詢 [不動產年度趨勢圖] 失敗：{str(e)}')
@@ -500,7 +500,7 @@ def render_multi_year_trends():
                     return
 
                 try:
-                    df = query_multi_year_price(city, trade_type, selected_years, house_status)
+                    df = await aquery_multi_year_price(city, trade_type, selected_years, house_status)
                 except Exception as e:
                     ui.notify('查詢失敗，請反應給站長協助處理', type='negative', position='top')
                     log_warning(f'查詢 [複合年度比較趨勢圖] 失敗：{str(e)}')
@@ -614,7 +614,7 @@ def render_3D_multi_year_trends():
                     return
 
                 try:
-                    df = query_multi_city_price_with_age(
+                    df = await aquery_multi_city_price_with_age(
                         selected_cities, selected_year,
                         trade_type, house_status,
                         remove_percent,
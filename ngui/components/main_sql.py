@@ -1,18 +1,342 @@
+import asyncio
+import functools
 import sqlite3
+import threading
+import time
 import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from contextlib import closing
-from typing import Optional, List
+from typing import Any, Callable, Dict, Optional, List, Sequence
 
 from utils.logger import *
 
 import os
 from supabase import create_client, Client
+from config.paths import DB_PATH
+from ngui.components.sqlite_client import SqliteClient
+from ngui.preprocessing.unified_schema import UNIFIED_SCHEMA_ENABLED, UNIFIED_VIEW
+from ngui.preprocessing.price_rollups import (
+    AGE_ROLLUP_TABLE, PRICE_BAND_OVER_100M, PRICE_BAND_ZERO, ROLLUP_TABLE, rollup_quantile,
+)
 
 SUPABASE_URL = os.getenv("SUPABASE_URL", "https://wptftadkiqfvtxbjmusr.supabase.co")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "sb_publishable_Yt1W1aogrXlc7nlRosyacw_pZvdaUl2")
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# 查詢來源：supabase (預設) 或 sqlite (直接查本機匯入的 DB_PATH)
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase")
+
+db = SqliteClient(DB_PATH) if DATA_BACKEND == "sqlite" else supabase
+
+# 單一事實表 (UNIFIED_SCHEMA=1) 只存在於本機 SQLite，多縣市查詢可合併成一次查詢
+USE_UNIFIED_SCHEMA = DATA_BACKEND == "sqlite" and UNIFIED_SCHEMA_ENABLED
+
+
+# 價格欄位與「1 億以下」的上限 (萬元)
+PRICE_COLUMN = "建物總價萬元"
+PRICE_LIMIT_100M = 10000
+
+# 分佈圖 (create_distribution_chart) 實際用到的欄位：座標、顏色與 hover
+DISTRIBUTION_COLUMNS = "建物坪數, 建物總價萬元, 鄉鎮市區, 建物型態, 建物每坪單價萬元, 主要用途, 房齡, 屋況"
+
+
+def apply_price_filters(query, remove_zero: bool = False, limit_under_100m: bool = False):
+    """
+    價格條件在資料庫端過濾 (not null / gt / lt)，不需要的資料列不會傳回前端。
+    """
+    query = query.not_.is_(PRICE_COLUMN, "null")
+    if remove_zero:
+        query = query.gt(PRICE_COLUMN, 0)
+    if limit_under_100m:
+        query = query.lt(PRICE_COLUMN, PRICE_LIMIT_100M)
+    return query
+
+
+# PostgREST 每次回應最多 max-rows 筆 (Supabase 預設 1000)，超過的部分會被直接截掉。
+# 查詢 Supabase 時先取得總筆數，再以 range() 分頁 (每頁 QUERY_PAGE_SIZE 筆，0 表示不分頁)、
+# QUERY_PAGE_WORKERS 個執行緒並行取回；本機 SQLite 沒有筆數上限，不分頁。
+# 分頁共用同一個執行緒池，不在每次查詢時建立、關閉執行緒
+QUERY_PAGE_SIZE = int(os.getenv("QUERY_PAGE_SIZE", "1000"))
+QUERY_PAGE_WORKERS = int(os.getenv("QUERY_PAGE_WORKERS", "4"))
+
+_page_pool = ThreadPoolExecutor(max_workers=QUERY_PAGE_WORKERS, thread_name_prefix="query-page")
+
+
+def _identity(query):
+    return query
+
+
+def _response_data(resp) -> List[Dict[str, Any]]:
+    return resp.data if resp and hasattr(resp, "data") and resp.data else []
+
+
+class QueryCancelledError(RuntimeError):
+    """
+    呼叫端已放棄 (例如多縣市查詢逾時) 而中止的分頁查詢。
+    """
+
+
+def fetch_frame(
+    table: str,
+    columns: str,
+    apply_filters: Callable = _identity,
+    order_by: Sequence[str] = ("id",),
+    page_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    stop: Optional[threading.Event] = None,
+) -> pd.DataFrame:
+    """
+    取回 table 中符合條件的所有資料列。
+
+    第一頁以 count="exact" 同時取得總筆數，其餘頁依 order_by (需能唯一決定順序) 排序以 range()
+    在共用的分頁執行緒池並行取回 (每次查詢同時最多 workers 頁；workers 為 1 時在目前執行緒逐頁取回)，
+    再依頁序合併成一個 DataFrame。
+    查詢建構器會被 range() 修改，因此每一頁都重新以 apply_filters 建立查詢；任一頁失敗時拋出例外，不回傳不完整的結果。
+    stop 被設定時 (例如呼叫端已逾時) 不再取下一頁，拋出 QueryCancelledError。
+    """
+    if page_size is None:
+        page_size = 0 if isinstance(db, SqliteClient) else QUERY_PAGE_SIZE
+    workers = QUERY_PAGE_WORKERS if workers is None else workers
+    if page_size <= 0:
+        return pd.DataFrame(_response_data(apply_filters(db.table(table).select(columns)).execute()))
+
+    def fetch_page(start: int, size: int, count: Optional[str] = None):
+        if stop is not None and stop.is_set():
+            raise QueryCancelledError(f"{table} 查詢已取消")
+        query = apply_filters(db.table(table).select(columns, count=count) if count else db.table(table).select(columns))
+        for column in order_by:
+            query = query.order(column)
+        return query.range(start, start + size - 1).execute()
+
+    started = time.perf_counter()
+    first = fetch_page(0, page_size, count="exact")
+    rows = list(_response_data(first))
+    total = getattr(first, "count", None)
+
+    if total is None:
+        # 沒有回傳總筆數時只能逐頁取到不足一頁為止
+        while rows and len(rows) % page_size == 0:
+            page = _response_data(fetch_page(len(rows), page_size))
+            if not page:
+                break
+            rows.extend(page)
+        return pd.DataFrame(rows)
+
+    if 0 < len(rows) < min(page_size, total):
+        # 伺服器的 max-rows 比 page_size 小：以實際回傳的筆數作為頁大小
+        page_size = len(rows)
+    starts = list(range(len(rows), total, page_size)) if rows else []
+    if starts and workers <= 1:
+        for start in starts:
+            rows.extend(_response_data(fetch_page(start, page_size)))
+    elif starts:
+        # 依頁序送出，同時進行中的頁數不超過 workers，取回的頁依序合併
+        in_flight = deque()
+        try:
+            for start in starts:
+                in_flight.append(_page_pool.submit(fetch_page, start, page_size))
+                if len(in_flight) >= workers:
+                    rows.extend(_response_data(in_flight.popleft().result()))
+            while in_flight:
+                rows.extend(_response_data(in_flight.popleft().result()))
+        except BaseException:
+            # 任一頁失敗時取消尚未開始的頁，不佔用共用的執行緒池
+            for future in in_flight:
+                future.cancel()
+            raise
+    if starts:
+        log_info(f"[分頁查詢] {table} 共 {total} 筆，{len(starts) + 1} 頁，耗時 {time.perf_counter() - started:.2f} 秒")
+
+    if len(rows) != total:
+        log_warning(f"[分頁查詢] {table} 取回 {len(rows)} 筆，與總筆數 {total} 不符 (查詢期間資料可能有異動)")
+    return pd.DataFrame(rows)
+
+
+# 多縣市查詢時各縣市同時查詢：共用的執行緒池限制同時進行的請求數 (各縣市內的分頁依序取回，
+# 同時進行的請求最多 CITY_QUERY_WORKERS 個)。每個縣市從開始執行起最多 CITY_QUERY_TIMEOUT 秒，
+# 在執行緒池排隊等待的時間不計入；排隊超過 CITY_QUERY_QUEUE_TIMEOUT 秒仍未開始的縣市直接取消
+CITY_QUERY_WORKERS = int(os.getenv("CITY_QUERY_WORKERS", "4"))
+CITY_QUERY_TIMEOUT = float(os.getenv("CITY_QUERY_TIMEOUT", "30"))
+CITY_QUERY_QUEUE_TIMEOUT = float(os.getenv("CITY_QUERY_QUEUE_TIMEOUT", str(CITY_QUERY_TIMEOUT * 2)))
+
+_city_pool = ThreadPoolExecutor(max_workers=CITY_QUERY_WORKERS, thread_name_prefix="city-query")
+
+
+def _fetch_city_frame(
+    city: str,
+    columns: str,
+    apply_filters: Callable,
+    stop: threading.Event,
+    started_at: Dict[str, float],
+    began: threading.Event,
+) -> tuple[pd.DataFrame, float]:
+    # 記錄實際開始執行的時間，逾時由此起算
+    started = started_at[city] = time.perf_counter()
+    began.set()
+    df = fetch_frame(city, columns, apply_filters, workers=1, stop=stop)
+    return df, time.perf_counter() - started
+
+
+def fetch_city_frames(
+    cities: list[str],
+    columns: str,
+    apply_filters: Callable,
+    label: str,
+    timeout: Optional[float] = None,
+    queue_timeout: Optional[float] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    依縣市取回查詢結果：啟用單一事實表時以一次 縣市 IN (...) 查詢取回，否則各縣市資料表同時查詢。
+    apply_filters 接收查詢建構器並回傳加上條件後的查詢；單一縣市查詢失敗或逾時時記錄警告並略過，
+    其餘縣市的結果照常回傳。
+    """
+    if USE_UNIFIED_SCHEMA:
+        try:
+            df = fetch_frame(UNIFIED_VIEW, f"{columns}, 縣市", lambda query: apply_filters(query.in_("縣市", cities)))
+        except Exception as e:
+            log_warning(f"[SQLite] {label}失敗（{', '.join(cities)}）: {e}")
+            return {}
+        if df.empty:
+            return {}
+        groups = {city: group.drop(columns="縣市").reset_index(drop=True) for city, group in df.groupby("縣市")}
+        return {city: groups[city] for city in cities if city in groups}
+
+    timeout = CITY_QUERY_TIMEOUT if timeout is None else timeout
+    queue_timeout = CITY_QUERY_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+    started = time.perf_counter()
+    stops = {city: threading.Event() for city in cities}
+    began = {city: threading.Event() for city in cities}
+    started_at: Dict[str, float] = {}
+    futures = {
+        city: _city_pool.submit(_fetch_city_frame, city, columns, apply_filters, stops[city], started_at, began[city])
+        for city in cities
+    }
+
+    frames, timings = {}, []
+    for city, future in futures.items():
+        try:
+            # 排隊超過 queue_timeout 仍未開始 (執行緒池被其他查詢佔滿) 時取消，不再等待
+            if not began[city].wait(timeout=max(0.0, started + queue_timeout - time.perf_counter())) \
+                    and future.cancel():
+                timings.append(f"{city} 排隊逾時")
+                log_warning(f"[Supabase] {label}逾時（{city}），排隊超過 {queue_timeout:.0f} 秒仍未開始")
+                continue
+            began[city].wait()
+            # 逾時以該縣市實際開始執行的時間計算
+            df, seconds = future.result(timeout=max(0.0, started_at[city] + timeout - time.perf_counter()))
+            timings.append(f"{city} {seconds:.2f} 秒 ({len(df)} 筆)")
+            if not df.empty:
+                frames[city] = df
+        except FutureTimeoutError:
+            # 執行中的縣市在目前這一頁結束後停止，釋出執行緒池給排隊中的縣市
+            stops[city].set()
+            timings.append(f"{city} 逾時")
+            log_warning(f"[Supabase] {label}逾時（{city}），超過 {timeout:.0f} 秒")
+        except Exception as e:
+            timings.append(f"{city} 失敗")
+            log_warning(f"[Supabase] {label}失敗（{city}）: {e}")
+
+    log_info(f"[多縣市查詢] {label}：總耗時 {time.perf_counter() - started:.2f} 秒，" + "、".join(timings))
+    return {city: frames[city] for city in cities if city in frames}
+
+
+# 趨勢圖改查匯入時建立的月彙總表 (price_rollup_monthly / price_rollup_monthly_age)；預設只在 sqlite 後端啟用，
+# 彙總表不存在或查詢失敗時退回原本的逐筆查詢
+USE_PRICE_ROLLUPS = os.getenv("PRICE_ROLLUPS", "1" if DATA_BACKEND == "sqlite" else "0") == "1"
+
+
+def fetch_price_rollups(
+    table: str,
+    cities: list[str],
+    years: list[str] | None,
+    trade_object: str | None,
+    house_type: str | None
+) -> Optional[pd.DataFrame]:
+    columns = ["縣市", "交易年", "交易月", "price_band", "count", "sum", "sketch"]
+    # 彙總表沒有 id，分頁時以彙總的維度排序
+    order_by = ["縣市", "交易年", "交易月", "分類", "交易標的", "屋況", "price_band"]
+    if table == AGE_ROLLUP_TABLE:
+        columns.append("房齡")
+        order_by.append("房齡")
+
+    def apply_filters(query):
+        query = query.in_("縣市", cities)
+        if years:
+            query = query.in_("交易年", years)
+        if trade_object:
+            query = query.eq("交易標的", trade_object)
+        if house_type:
+            query = query.eq("屋況", house_type)
+        return query
+
+    try:
+        return fetch_frame(table, ", ".join(columns), apply_filters, order_by).reindex(columns=columns)
+    except Exception as e:
+        log_warning(f"[Rollup] 查詢月彙總失敗，改用逐筆查詢: {e}")
+        return None
+
+
+def _monthly_average_from_rollups(rollups: pd.DataFrame) -> pd.DataFrame:
+    grouped = rollups.groupby(["交易年", "交易月"], as_index=False)[["count", "sum"]].sum()
+    grouped["交易月"] = grouped["交易月"].astype(int)
+    grouped["avg_price_million"] = (grouped["sum"] / grouped["count"]).round(0)
+    return grouped
+
+
+def _price_with_age_from_rollups(rollups: pd.DataFrame, use_median: bool) -> pd.DataFrame:
+    rollups = rollups.dropna(subset=["房齡"])
+    rollups = rollups[rollups["房齡"] >= 0]
+    if rollups.empty:
+        return pd.DataFrame()
+
+    keys = ["交易月", "房齡"]
+    if use_median:
+        grouped = rollup_quantile(rollups, keys, 0.5).rename(columns={"quantile": "avg_price_million"})
+    else:
+        grouped = rollups.groupby(keys, as_index=False)[["count", "sum"]].sum()
+        grouped["avg_price_million"] = grouped["sum"] / grouped["count"]
+
+    return (
+        grouped[keys + ["avg_price_million"]]
+        .rename(columns={"交易月": "month", "房齡": "house_age"})
+    )
+
+
+# 趨勢圖的月平均在資料所在處計算：Supabase 呼叫 sql/price_trend_monthly.sql 建立的 RPC，
+# 本機 SQLite 執行等價的 GROUP BY；RPC 不存在或失敗時才退回逐筆下載、以 pandas 計算。
+# Supabase 需先建立該 RPC，因此只有 SQLite 後端預設開啟，Supabase 建立後設定 SERVER_AGGREGATES=1
+USE_SERVER_AGGREGATES = os.getenv("SERVER_AGGREGATES", "1" if DATA_BACKEND == "sqlite" else "0") == "1"
+TREND_RPC = "price_trend_monthly"
+
+
+def fetch_monthly_trend(
+    city: str,
+    years: list[str] | None,
+    trade_object: str | None,
+    house_type: str | None
+) -> Optional[pd.DataFrame]:
+    """
+    回傳每個 (year, month) 的 count、avg_price、median_price；失敗時回傳 None 讓呼叫端改用 pandas 計算。
+    """
+    params = {
+        "p_city": city,
+        "p_years": list(years) if years else None,
+        "p_trade_object": trade_object or None,
+        "p_house_type": house_type or None,
+    }
+    columns = ["year", "month", "count", "avg_price", "median_price"]
+    try:
+        df = pd.DataFrame(_response_data(db.rpc(TREND_RPC, params).execute()), columns=columns)
+    except Exception as e:
+        log_warning(f"[RPC] 查詢月彙總 {TREND_RPC} 失敗，改用逐筆查詢: {e}")
+        return None
+    df["year"] = df["year"].astype(str)
+    df["month"] = df["month"].astype(int)
+    return df
+
+
 def query_distribution_data(
     year, 
     city, 
@@ -23,48 +347,33 @@ def query_distribution_data(
     limit_under_100m=False
 ) -> pd.DataFrame:
     
-    # 開始 build 查詢
-    query = supabase.table(city).select("*")
-    
-    # 年份條件
-    if "~" not in year:
-        query = query.eq("交易年", year)
-    else:
-        # 假設你要找 "< year"
-        yr = year.replace("~", "")
-        query = query.lt("交易年", yr)
+    # 開始 build 查詢 (分頁時每一頁都重新套用條件)
+    def apply_filters(query):
+        # 年份條件
+        if "~" not in year:
+            query = query.eq("交易年", year)
+        else:
+            # 假設你要找 "< year"
+            yr = year.replace("~", "")
+            query = query.lt("交易年", yr)
 
-    if building_type:
-        query = query.eq("分類", building_type)
+        if building_type:
+            query = query.eq("分類", building_type)
 
-    if house_status:
-        query = query.eq("屋況", house_status)
+        if house_status:
+            query = query.eq("屋況", house_status)
+        return apply_price_filters(query, remove_zero, limit_under_100m)
 
     try:
-        # 執行查詢
-        resp = query.execute()
-        data = resp.data if resp and hasattr(resp, 'data') else []
-
-        df = pd.DataFrame(data)
+        # 執行查詢 (只取分佈圖用到的欄位)
+        df = fetch_frame(city, DISTRIBUTION_COLUMNS, apply_filters)
         if df.empty:
             return df
 
-        # 處理 price 欄位
-        if "建物總價萬元" in df.columns:
-            df["price"] = pd.to_numeric(df["建物總價萬元"], errors="coerce")
-        else:
-            # fallback 若欄位不同
-            df["price"] = pd.to_numeric(df.get("建物總價萬元", None), errors="coerce")
-
-        # 過濾掉沒有 price
+        # 處理 price 欄位 (沒有價格、0 元與 1 億以上已在查詢時排除)
+        df["price"] = pd.to_numeric(df["建物總價萬元"], errors="coerce")
         df = df.dropna(subset=["price"])
 
-        if remove_zero:
-            df = df[df["price"] > 0]
-
-        if limit_under_100m:
-            df = df[df["price"] < 10000]
-
         if remove_outliers and not df.empty:
             quantile_val = 1 - remove_outliers / 100  # 例如 1% -> 0.99
             upper_bound = df["price"].quantile(quantile_val)
@@ -87,41 +396,28 @@ def query_multi_city_3d_data(
     limit_under_100m=False
 ) -> pd.DataFrame:
 
-    all_data = []
-    
-    for city in cities:
-        try:
-            # 設定要撈的欄位
-            query = (
-                supabase
-                .table(city)
-                .select("建物坪數, 房齡, 鄉鎮市區, 建物型態, 主要用途, 屋況, 建物總價萬元")
-                .eq("交易年", year)
-            )
-
-            if type_value:
-                query = query.eq("分類", type_value)
+    def apply_filters(query):
+        query = query.eq("交易年", year)
+        if type_value:
+            query = query.eq("分類", type_value)
+        if status_value:
+            query = query.eq("屋況", status_value)
+        return apply_price_filters(query, remove_zero, limit_under_100m)
 
-            if status_value:
-                query = query.eq("屋況", status_value)
+    # 設定要撈的欄位
+    frames = fetch_city_frames(
+        cities, "建物坪數, 房齡, 鄉鎮市區, 建物型態, 主要用途, 屋況, 建物總價萬元", apply_filters, "查詢 3D 數據"
+    )
 
-            resp = query.execute()
-            data = resp.data if resp and hasattr(resp, "data") else []
-            if not data:
-                continue
+    all_data = []
 
-            df = pd.DataFrame(data)
+    for city, df in frames.items():
+        try:
             df.rename(columns={"建物總價萬元": "price"}, inplace=True)
 
             df["price"] = pd.to_numeric(df["price"], errors="coerce")
             df = df.dropna(subset=["price"])
 
-            if remove_zero:
-                df = df[df["price"] > 0]
-
-            if limit_under_100m:
-                df = df[df["price"] < 10000]
-
             if remove_outliers and not df.empty:
                 quantile_val = 1 - remove_outliers / 100  # 例如 1% -> 0.99
                 upper_bound = df["price"].quantile(quantile_val)
@@ -146,27 +442,37 @@ def query_avg_price(
     year: str, 
     house_type: str | None
 ) -> pd.DataFrame:
+
+    if USE_PRICE_ROLLUPS:
+        rollups = fetch_price_rollups(ROLLUP_TABLE, [city], [year], trade_object, house_type)
+        if rollups is not None:
+            if rollups.empty:
+                return pd.DataFrame()
+            grouped = _monthly_average_from_rollups(rollups)
+            grouped["ym"] = grouped["交易年"] + "-" + grouped["交易月"].map("{:02d}".format)
+            return grouped[["ym", "avg_price_million"]].sort_values("ym")
+
+    if USE_SERVER_AGGREGATES:
+        trend = fetch_monthly_trend(city, [year], trade_object, house_type)
+        if trend is not None:
+            if trend.empty:
+                return pd.DataFrame()
+            trend["ym"] = trend["year"] + "-" + trend["month"].map("{:02d}".format)
+            trend["avg_price_million"] = trend["avg_price"].round(0)
+            return trend[["ym", "avg_price_million"]].sort_values("ym").reset_index(drop=True)
     
     try:
-        query = (
-            supabase.table(city)
-            .select("交易年月日, 建物總價萬元")
-            .eq("交易年", year)
-        )
-
-        if trade_object:
-            query = query.eq("交易標的", trade_object)
-
-        if house_type:
-            query = query.eq("屋況", house_type)
+        def apply_filters(query):
+            query = query.eq("交易年", year)
 
-        resp = query.execute()
-        data = resp.data if resp and hasattr(resp, "data") else []
+            if trade_object:
+                query = query.eq("交易標的", trade_object)
 
-        if not data:
-            return pd.DataFrame()
+            if house_type:
+                query = query.eq("屋況", house_type)
+            return apply_price_filters(query).not_.is_("交易年月日", "null")
 
-        df = pd.DataFrame(data)
+        df = fetch_frame(city, "交易年月日, 建物總價萬元", apply_filters)
 
         if df.empty or "交易年月日" not in df.columns or "建物總價萬元" not in df.columns:
             return pd.DataFrame()
@@ -209,26 +515,46 @@ def query_multi_year_price(
     years: list[str], 
     house_type: str | None
 ) -> pd.DataFrame:
+
+    if USE_PRICE_ROLLUPS:
+        rollups = fetch_price_rollups(ROLLUP_TABLE, [city], years, trade_object, house_type)
+        if rollups is not None:
+            if rollups.empty:
+                return pd.DataFrame()
+            grouped = (
+                _monthly_average_from_rollups(rollups)
+                .rename(columns={"交易年": "year", "交易月": "month"})
+                .sort_values(["year", "month"], ascending=[False, True])
+            )
+            return grouped[["year", "month", "avg_price_million"]]
+
+    if USE_SERVER_AGGREGATES:
+        trend = fetch_monthly_trend(city, years, trade_object, house_type)
+        if trend is not None:
+            if trend.empty:
+                return pd.DataFrame()
+            trend["avg_price_million"] = trend["avg_price"].round(0)
+            return (
+                trend[["year", "month", "avg_price_million"]]
+                .sort_values(["year", "month"], ascending=[False, True])
+                .reset_index(drop=True)
+            )
     
     try:
-        # 查詢必要欄位
-        query = supabase.table(city).select("交易年月日, 建物總價萬元, 交易年")
-
-        if years:
-            query = query.in_("交易年", years)
-        if trade_object:
-            query = query.eq("交易標的", trade_object)
-        if house_type:
-            query = query.eq("屋況", house_type)
-
-        resp = query.execute()
-        data = resp.data if resp and hasattr(resp, "data") else []
+        def apply_filters(query):
+            if years:
+                query = query.in_("交易年", years)
+            if trade_object:
+                query = query.eq("交易標的", trade_object)
+            if house_type:
+                query = query.eq("屋況", house_type)
+            return apply_price_filters(query).not_.is_("交易年月日", "null")
 
-        if not data:
+        # 查詢必要欄位 (年、月由交易年月日解析)
+        df = fetch_frame(city, "交易年月日, 建物總價萬元", apply_filters)
+        if df.empty:
             return pd.DataFrame()
 
-        df = pd.DataFrame(data)
-
         # 欄位檢查
         if "交易年月日" not in df.columns or "建物總價萬元" not in df.columns:
             return pd.DataFrame()
@@ -273,31 +599,46 @@ def query_multi_city_price_with_age(
     remove_zero=False,
     limit_under_100m=False
 ) -> pd.DataFrame:
-    
-    dfs = []
 
-    for city in cities:
-        try:
-            # 基礎查詢欄位
-            query = supabase.table(city).select("交易年月日, 房齡, 建物總價萬元, 交易標的, 屋況")
-            query = query.eq("交易年", year)
-
-            # 交易標的與屋況條件
-            if trade_object:
-                query = query.eq("交易標的", trade_object)
-            if house_type:
-                query = query.eq("屋況", house_type)
-
-            resp = query.execute()
-            data = resp.data if hasattr(resp, "data") else []
+    # 排除極端值需要逐筆資料計算分位數，只有不排除時才能直接查彙總表
+    if USE_PRICE_ROLLUPS and not remove_outliers:
+        rollups = fetch_price_rollups(AGE_ROLLUP_TABLE, cities, [year], trade_object, house_type)
+        if rollups is not None:
+            if remove_zero:
+                rollups = rollups[rollups["price_band"] != PRICE_BAND_ZERO]
+            if limit_under_100m:
+                rollups = rollups[rollups["price_band"] != PRICE_BAND_OVER_100M]
+
+            dfs = []
+            for city in cities:
+                city_rollups = rollups[rollups["縣市"] == city]
+                if city_rollups.empty:
+                    continue
+                df_grouped = _price_with_age_from_rollups(city_rollups, use_median)
+                if df_grouped.empty:
+                    continue
+                df_grouped["city"] = city
+                dfs.append(df_grouped)
+            return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+    
+    def apply_filters(query):
+        query = query.eq("交易年", year)
+        # 交易標的與屋況條件
+        if trade_object:
+            query = query.eq("交易標的", trade_object)
+        if house_type:
+            query = query.eq("屋況", house_type)
+        # 房齡為空或負數、沒有價格的資料列不會用到
+        query = apply_price_filters(query, remove_zero, limit_under_100m)
+        return query.gte("房齡", 0).not_.is_("交易年月日", "null")
 
-            if not data:
-                continue
+    # 基礎查詢欄位 (交易標的、屋況已是查詢條件，不需傳回)
+    frames = fetch_city_frames(cities, "交易年月日, 房齡, 建物總價萬元", apply_filters, "查詢房齡價格")
 
-            df = pd.DataFrame(data)
-            if df.empty:
-                continue
+    dfs = []
 
+    for city, df in frames.items():
+        try:
             # 清洗與欄位處理
             df["房齡"] = pd.to_numeric(df["房齡"], errors="coerce")
             df["price"] = pd.to_numeric(df["建物總價萬元"], errors="coerce")
@@ -315,13 +656,6 @@ def query_multi_city_price_with_age(
             df["month"] = df["交易年月日"].apply(extract_month)
             df = df.dropna(subset=["month"])
 
-            # 條件過濾
-            if remove_zero:
-                df = df[df["price"] > 0]
-
-            if limit_under_100m:
-                df = df[df["price"] < 10000]
-
             if remove_outliers > 0 and not df.empty:
                 quantile_val = 1 - remove_outliers / 100  # 例如 1% -> 0.99
                 upper_bound = df["price"].quantile(quantile_val)
@@ -349,3 +683,35 @@ def query_multi_city_price_with_age(
     else:
         return pd.DataFrame()
 
+
+# ===== 非同步查詢 API =====
+# 查詢函式都是同步的 (Supabase / SQLite 的阻塞 I/O 與 pandas 處理)，NiceGUI 的事件處理函式以 await aquery_* 呼叫，
+# 查詢交給有上限的執行緒池執行，event loop 不會被單一使用者的查詢卡住
+QUERY_EXECUTOR_WORKERS = int(os.getenv("QUERY_EXECUTOR_WORKERS", "8"))
+
+_query_executor = ThreadPoolExecutor(max_workers=QUERY_EXECUTOR_WORKERS, thread_name_prefix="query")
+
+
+async def run_query(func: Callable[..., pd.DataFrame], *args, **kwargs) -> pd.DataFrame:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_query_executor, functools.partial(func, *args, **kwargs))
+
+
+async def aquery_distribution_data(*args, **kwargs) -> pd.DataFrame:
+    return await run_query(query_distribution_data, *args, **kwargs)
+
+
+async def aquery_multi_city_3d_data(*args, **kwargs) -> pd.DataFrame:
+    return await run_query(query_multi_city_3d_data, *args, **kwargs)
+
+
+async def aquery_avg_price(*args, **kwargs) -> pd.DataFrame:
+    return await run_query(query_avg_price, *args, **kwargs)
+
+
+async def aquery_multi_year_price(*args, **kwargs) -> pd.DataFrame:
+    return await run_query(query_multi_year_price, *args, **kwargs)
+
+
+async def aquery_multi_city_price_with_age(*args, **kwargs) -> pd.DataFrame:
+    return await run_query(query_multi_city_price_with_age, *args, **kwargs)
@@ -0,0 +1,212 @@
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SqliteResponse:
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class SqliteQuery:
+    """
+    對應 Supabase (PostgREST) 查詢建構器中 main_sql 會用到的部分：
+    table(...).select(...).eq/lt/in_(...).order(...).range(...).execute()，讓同一份查詢邏輯可直接查本機 SQLite。
+    """
+    def __init__(self, client: "SqliteClient", table: str):
+        self.client = client
+        self.table = table
+        self.columns = "*"
+        self.count: Optional[str] = None
+        self.filters: List[Tuple[str, str, Any]] = []
+        self.negate_next = False
+        self.order_by: List[Tuple[str, bool]] = []
+        self.offset: Optional[int] = None
+        self.limit: Optional[int] = None
+
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "SqliteQuery":
+        # count="exact" 時回應的 count 為符合條件的總筆數 (不受 range 影響)，與 PostgREST 相同
+        self.columns = columns
+        self.count = count
+        return self
+
+    def _add_filter(self, column: str, op: str, value: Any) -> "SqliteQuery":
+        if self.negate_next:
+            op = f"NOT {op}"
+            self.negate_next = False
+        self.filters.append((column, op, value))
+        return self
+
+    @property
+    def not_(self) -> "SqliteQuery":
+        # 與 PostgREST 相同，not_ 反轉下一個條件，例如 not_.is_("欄位", "null")
+        self.negate_next = True
+        return self
+
+    def eq(self, column: str, value: Any) -> "SqliteQuery":
+        return self._add_filter(column, "=", value)
+
+    def lt(self, column: str, value: Any) -> "SqliteQuery":
+        return self._add_filter(column, "<", value)
+
+    def lte(self, column: str, value: Any) -> "SqliteQuery":
+        return self._add_filter(column, "<=", value)
+
+    def gt(self, column: str, value: Any) -> "SqliteQuery":
+        return self._add_filter(column, ">", value)
+
+    def gte(self, column: str, value: Any) -> "SqliteQuery":
+        return self._add_filter(column, ">=", value)
+
+    def is_(self, column: str, value: Any) -> "SqliteQuery":
+        # PostgREST 以字串 "null" 表示 NULL
+        if value not in (None, "null"):
+            raise ValueError(f"is_ 只支援 null：{value}")
+        return self._add_filter(column, "IS", None)
+
+    def in_(self, column: str, values: List[Any]) -> "SqliteQuery":
+        return self._add_filter(column, "IN", list(values))
+
+    def order(self, column: str, desc: bool = False) -> "SqliteQuery":
+        self.order_by.append((column, desc))
+        return self
+
+    def range(self, start: int, end: int) -> "SqliteQuery":
+        # 與 PostgREST 相同，start、end 皆包含在內
+        self.offset = start
+        self.limit = end - start + 1
+        return self
+
+    def _where(self) -> Tuple[str, List[Any]]:
+        conditions, params = [], []
+        for column, op, value in self.filters:
+            negate, base_op = op.startswith("NOT "), op.replace("NOT ", "")
+            if base_op == "IN":
+                conditions.append(f"{quote_identifier(column)} {op} ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif base_op == "IS":
+                conditions.append(f"{quote_identifier(column)} {'IS NOT' if negate else 'IS'} NULL")
+            elif negate:
+                conditions.append(f"NOT {quote_identifier(column)} {base_op} ?")
+                params.append(value)
+            else:
+                conditions.append(f"{quote_identifier(column)} {op} ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    def build(self) -> Tuple[str, List[Any]]:
+        if self.columns.strip() == "*":
+            columns = "*"
+        else:
+            columns = ", ".join(quote_identifier(col.strip()) for col in self.columns.split(","))
+
+        where, params = self._where()
+        sql = f"SELECT {columns} FROM {quote_identifier(self.table)}{where}"
+        if self.order_by:
+            sql += " ORDER BY " + ", ".join(
+                f"{quote_identifier(column)}{' DESC' if desc else ''}" for column, desc in self.order_by
+            )
+        if self.limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [self.limit, self.offset or 0]
+        return sql, params
+
+    def build_count(self) -> Tuple[str, List[Any]]:
+        where, params = self._where()
+        return f"SELECT COUNT(*) AS count FROM {quote_identifier(self.table)}{where}", params
+
+    def execute(self) -> SqliteResponse:
+        sql, params = self.build()
+        count = None
+        if self.count:
+            count_sql, count_params = self.build_count()
+            count = self.client.run(count_sql, count_params)[0]["count"]
+        return SqliteResponse(self.client.run(sql, params), count)
+
+
+def _price_trend_monthly(params: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    與 sql/price_trend_monthly.sql 相同的月彙總：中位數以視窗函式取排序後中間一筆 (偶數筆取中間兩筆平均)。
+    """
+    conditions = ['"建物總價萬元" IS NOT NULL', 'length("交易年月日") >= 6']
+    values: List[Any] = []
+    if params.get("p_years"):
+        conditions.append(f'"交易年" IN ({", ".join("?" * len(params["p_years"]))})')
+        values.extend(params["p_years"])
+    for column, key in (("交易標的", "p_trade_object"), ("屋況", "p_house_type")):
+        if params.get(key):
+            conditions.append(f"{quote_identifier(column)} = ?")
+            values.append(params[key])
+
+    sql = f'''
+        WITH t AS (
+            SELECT substr("交易年月日", 1, 4) AS year,
+                   CAST(substr("交易年月日", 5, 2) AS INTEGER) AS month,
+                   "建物總價萬元" AS price
+            FROM {quote_identifier(params["p_city"])}
+            WHERE {" AND ".join(conditions)}
+        ), ranked AS (
+            SELECT year, month, price,
+                   ROW_NUMBER() OVER (PARTITION BY year, month ORDER BY price) AS rn,
+                   COUNT(*) OVER (PARTITION BY year, month) AS n
+            FROM t
+        )
+        SELECT year, month, COUNT(*) AS count, AVG(price) AS avg_price,
+               AVG(CASE WHEN rn IN ((n + 1) / 2, (n + 2) / 2) THEN price END) AS median_price
+        FROM ranked
+        GROUP BY year, month
+        ORDER BY year, month
+    '''
+    return sql, values
+
+
+# 對應 Supabase 上以 SQL 建立的 RPC 函式 (sql/*.sql)：函式名稱 -> 產生等價 SQLite 查詢的函式
+SQLITE_FUNCTIONS = {
+    "price_trend_monthly": _price_trend_monthly,
+}
+
+
+class SqliteRpc:
+    def __init__(self, client: "SqliteClient", name: str, params: Dict[str, Any]):
+        if name not in SQLITE_FUNCTIONS:
+            raise ValueError(f"SQLite 後端沒有對應的函式：{name}")
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self) -> SqliteResponse:
+        sql, params = SQLITE_FUNCTIONS[self.name](self.params)
+        return SqliteResponse(self.client.run(sql, params))
+
+
+class SqliteClient:
+    """
+    唯讀查詢本機匯入的 SQLite 資料庫 (DB_PATH)，每次查詢各自開啟連線，可在多執行緒下使用。
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def table(self, name: str) -> SqliteQuery:
+        return SqliteQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> SqliteRpc:
+        return SqliteRpc(self, name, params or {})
+
+    def connect(self) -> sqlite3.Connection:
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"找不到 SQLite 資料庫：{self.db_path}")
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+
+    def run(self, sql: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        conn = self.connect()
+        try:
+            cursor = conn.execute(sql, params or [])
+            names = [col[0] for col in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+        finally:
+            conn.close()
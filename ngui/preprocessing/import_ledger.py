@@ -0,0 +1,88 @@
+import hashlib
+import sqlite3
+from datetime import datetime
+from typing import Dict, Optional
+
+from ngui.preprocessing.zip_ingest import open_csv_source
+
+LEDGER_TABLE = "import_ledger"
+
+# 本期 (latest_notice) 每次發布都是不同期間的資料，並非同一檔案的修訂，
+# 因此以內容 hash 區分，避免新一期的資料覆蓋掉前一期
+LATEST_NOTICE_FOLDER = "latest_notice"
+
+
+def ensure_ledger_table(conn: sqlite3.Connection):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS "{LEDGER_TABLE}" (
+            season TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            city TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            first_id INTEGER,
+            last_id INTEGER,
+            imported_at TEXT NOT NULL,
+            PRIMARY KEY (season, filename)
+        )
+    ''')
+
+
+def calculate_file_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """
+    計算檔案內容的 sha256；file_path 也可以是 zip 成員 (見 zip_ingest)，hash 與解壓後的檔案相同。
+    """
+    sha256 = hashlib.sha256()
+    with open_csv_source(file_path) as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def ledger_season(folder: str, content_hash: str) -> str:
+    if folder == LATEST_NOTICE_FOLDER:
+        return f"{LATEST_NOTICE_FOLDER}:{content_hash[:16]}"
+    return folder
+
+
+def get_ledger_entry(conn: sqlite3.Connection, season: str, filename: str) -> Optional[Dict]:
+    cursor = conn.execute(
+        f'SELECT season, filename, city, content_hash, row_count, first_id, last_id, imported_at '
+        f'FROM "{LEDGER_TABLE}" WHERE season = ? AND filename = ?',
+        (season, filename),
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return dict(zip([col[0] for col in cursor.description], row))
+
+
+def delete_imported_rows(conn: sqlite3.Connection, entry: Dict):
+    """
+    刪除 ledger 紀錄中該檔案上次匯入的資料列 (以 id 區間定位)，需在呼叫端的交易中執行。
+    """
+    if entry["first_id"] is None or entry["last_id"] is None:
+        return
+    conn.execute(
+        f'DELETE FROM "{entry["city"]}" WHERE id BETWEEN ? AND ?',
+        (entry["first_id"], entry["last_id"]),
+    )
+
+
+def record_import(
+    conn: sqlite3.Connection,
+    season: str,
+    filename: str,
+    city: str,
+    content_hash: str,
+    row_count: int,
+    first_id: Optional[int],
+    last_id: Optional[int],
+):
+    conn.execute(
+        f'INSERT OR REPLACE INTO "{LEDGER_TABLE}" '
+        f'(season, filename, city, content_hash, row_count, first_id, last_id, imported_at) '
+        f'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        (season, filename, city, content_hash, row_count, first_id, last_id,
+         datetime.now().isoformat(timespec="seconds")),
+    )
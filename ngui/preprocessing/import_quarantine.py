@@ -0,0 +1,74 @@
+import sqlite3
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+QUARANTINE_TABLE = "import_quarantine"
+
+QUARANTINE_COLUMNS = ["row_index", "column", "raw_value", "reason"]
+
+# format_frame 回報的問題類型
+REASON_NOT_NUMERIC = "無法轉換為數值"
+REASON_BAD_DATE = "日期無法解析"
+
+
+def build_issues(index: pd.Index, column: str, raw_values: pd.Series, failed, reason: str) -> Optional[pd.DataFrame]:
+    """
+    將單一欄位的失敗遮罩轉成隔離紀錄 (row_index 為 CSV 資料列序號，不含兩列標題)；沒有失敗時回傳 None。
+    """
+    if not failed.any():
+        return None
+    return pd.DataFrame({
+        "row_index": index[failed],
+        "column": column,
+        "raw_value": raw_values[failed].astype(str).to_numpy(),
+        "reason": reason,
+    })
+
+
+def ensure_quarantine_table(conn: sqlite3.Connection):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS "{QUARANTINE_TABLE}" (
+            season TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            row_index INTEGER NOT NULL,
+            "column" TEXT NOT NULL,
+            raw_value TEXT,
+            reason TEXT NOT NULL
+        )
+    ''')
+    conn.execute(
+        f'CREATE INDEX IF NOT EXISTS "idx_{QUARANTINE_TABLE}_file" ON "{QUARANTINE_TABLE}" (season, filename)'
+    )
+
+
+def replace_quarantine(conn: sqlite3.Connection, season: str, filename: str, issues: Iterable[pd.DataFrame]) -> int:
+    """
+    以本次匯入的隔離紀錄取代該檔案先前的紀錄，需在呼叫端的交易中執行 (與 record_import 同一筆交易)。
+    """
+    ensure_quarantine_table(conn)
+    conn.execute(f'DELETE FROM "{QUARANTINE_TABLE}" WHERE season = ? AND filename = ?', (season, filename))
+
+    frames = [frame for frame in issues if frame is not None and not frame.empty]
+    if not frames:
+        return 0
+
+    records = pd.concat(frames, ignore_index=True)
+    conn.executemany(
+        f'INSERT INTO "{QUARANTINE_TABLE}" (season, filename, row_index, "column", raw_value, reason) '
+        f'VALUES (?, ?, ?, ?, ?, ?)',
+        ((season, filename, int(row_index), column, raw_value, reason)
+         for row_index, column, raw_value, reason in records[QUARANTINE_COLUMNS].itertuples(index=False, name=None)),
+    )
+    return len(records)
+
+
+def summarize_issues(issues: List[pd.DataFrame]) -> str:
+    """
+    彙整成單行計數，例如「總價元 無法轉換為數值 3 筆、交易年月日 日期無法解析 1 筆」。
+    """
+    frames = [frame for frame in issues if frame is not None and not frame.empty]
+    if not frames:
+        return ""
+    counts = pd.concat(frames, ignore_index=True).groupby(["column", "reason"], sort=False).size()
+    return "、".join(f"{column} {reason} {count} 筆" for (column, reason), count in counts.items())
@@ -0,0 +1,298 @@
+import json
+import math
+import sqlite3
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.paths import DB_PATH
+from utils.logger import log_info
+
+ROLLUP_TABLE = "price_rollup_monthly"
+AGE_ROLLUP_TABLE = "price_rollup_monthly_age"
+# 匯入時記錄資料有異動的 (縣市, 交易年, 交易月)，收尾時只重算這些月份的彙總列
+ROLLUP_PENDING_TABLE = "price_rollup_pending"
+
+# 彙總鍵：縣市 × 交易年 × 交易月 × 分類 × 交易標的 × 屋況 × 價格區間，
+# 房齡版本再細分到房齡 (format_frame 已取到 0.1 年)，供房齡價格圖使用
+ROLLUP_KEYS = ["縣市", "交易年", "交易月", "分類", "交易標的", "屋況", "price_band"]
+ROLLUP_TABLES = {
+    ROLLUP_TABLE: ROLLUP_KEYS,
+    AGE_ROLLUP_TABLE: ROLLUP_KEYS + ["房齡"],
+}
+BUCKET_KEYS = ROLLUP_KEYS + ["房齡", "bucket"]
+
+# 價格區間讓「排除 0 元」與「限 1 億以下」兩個篩選條件可直接在彙總表上套用
+PRICE_BAND_ZERO = 0
+PRICE_BAND_UNDER_100M = 1
+PRICE_BAND_OVER_100M = 2
+PRICE_LIMIT_100M = 10000  # 萬元
+
+# 中位數 sketch：對數間距的直方圖 (相對誤差約 1%)，各列可直接相加合併
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+
+ROLLUP_CHUNK_SIZE = 200000
+
+
+def sketch_bucket(prices: np.ndarray) -> np.ndarray:
+    """
+    價格 (> 0) 對應的 sketch 桶號；0 元資料列歸在 PRICE_BAND_ZERO，不進 sketch。
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        buckets = np.ceil(np.log(prices) / math.log(SKETCH_GAMMA))
+    return np.where(prices > 0, buckets, 0).astype("int64")
+
+
+def bucket_value(buckets: np.ndarray) -> np.ndarray:
+    with np.errstate(over="ignore"):
+        return 2 * np.power(SKETCH_GAMMA, buckets) / (SKETCH_GAMMA + 1)
+
+
+def rollup_quantile(rollups: pd.DataFrame, keys: List[str], q: float = 0.5) -> pd.DataFrame:
+    """
+    依 keys 合併彙總列的 sketch 後估計分位數 (預設為中位數)，回傳 keys + quantile 欄位；
+    與 pandas 相同，落在兩筆之間時取兩者平均。0 元區間的筆數視為價格 0。
+    """
+    rows = []
+    for key_values, band, count, sketch in zip(
+        rollups[keys].itertuples(index=False, name=None), rollups["price_band"], rollups["count"], rollups["sketch"]
+    ):
+        if band == PRICE_BAND_ZERO:
+            rows.append((*key_values, -np.inf, count))
+        else:
+            rows.extend((*key_values, float(bucket), n) for bucket, n in json.loads(sketch).items())
+
+    buckets = (
+        pd.DataFrame(rows, columns=keys + ["bucket", "count"])
+        .groupby(keys + ["bucket"], as_index=False, dropna=False)["count"].sum()
+    )
+    groups = buckets.groupby(keys, dropna=False)["count"]
+    upper = groups.cumsum()
+    lower = upper - buckets["count"]
+    rank = q * (groups.transform("sum") - 1)
+
+    value = np.where(np.isneginf(buckets["bucket"]), 0.0, bucket_value(buckets["bucket"].to_numpy()))
+    for name, target in (("low", np.floor(rank)), ("high", np.ceil(rank))):
+        buckets[name] = np.where((lower <= target) & (target < upper), value, np.nan)
+
+    result = buckets.groupby(keys, as_index=False, dropna=False)[["low", "high"]].max()
+    result["quantile"] = (result["low"] + result["high"]) / 2
+    return result.drop(columns=["low", "high"])
+
+
+def ensure_rollup_tables(conn: sqlite3.Connection):
+    for table, keys in ROLLUP_TABLES.items():
+        age_column = '"房齡" REAL,' if "房齡" in keys else ""
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS "{table}" (
+                "縣市" TEXT NOT NULL,
+                "交易年" TEXT NOT NULL,
+                "交易月" INTEGER NOT NULL,
+                "分類" TEXT,
+                "交易標的" TEXT,
+                "屋況" TEXT,
+                {age_column}
+                price_band INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                sum REAL NOT NULL,
+                min REAL,
+                max REAL,
+                sketch TEXT NOT NULL
+            )
+        ''')
+        conn.execute(
+            f'CREATE INDEX IF NOT EXISTS "idx_{table}_city_year" ON "{table}" ("縣市", "交易年", "交易標的", "屋況")'
+        )
+
+
+def ensure_pending_table(conn: sqlite3.Connection):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS "{ROLLUP_PENDING_TABLE}" (
+            "縣市" TEXT NOT NULL,
+            "交易年" TEXT NOT NULL,
+            "交易月" INTEGER NOT NULL,
+            PRIMARY KEY ("縣市", "交易年", "交易月")
+        ) WITHOUT ROWID
+    ''')
+
+
+def mark_rollup_months(conn: sqlite3.Connection, city: str, first_id: Optional[int], last_id: Optional[int]):
+    """
+    把縣市資料表中 id 區間 (匯入紀錄的 first_id ~ last_id) 內資料列的交易年月記為待更新 (需在呼叫端的交易中執行)。
+    寫入新資料後、刪除上次匯入的資料前各呼叫一次，修訂後不再出現的月份也會重算。
+    """
+    if first_id is None or last_id is None:
+        return
+    ensure_pending_table(conn)
+    conn.execute(
+        f'INSERT OR IGNORE INTO "{ROLLUP_PENDING_TABLE}" ("縣市", "交易年", "交易月") '
+        f'SELECT DISTINCT ?, "交易年", CAST("交易月" AS INTEGER) FROM "{city}" '
+        f'WHERE id BETWEEN ? AND ? AND "交易年" != \'\' AND "交易月" != \'\'',
+        (city, first_id, last_id),
+    )
+
+
+def _aggregate_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    先彙總到 (彙總鍵, sketch 桶) 層級；count/sum/min/max 皆可再次合併，因此可逐塊處理整張縣市資料表。
+    """
+    price = df["建物總價萬元"].to_numpy(dtype="float64")
+    df = df.assign(
+        交易月=df["交易月"].astype(int),
+        price_band=np.select([price <= 0, price < PRICE_LIMIT_100M], [PRICE_BAND_ZERO, PRICE_BAND_UNDER_100M],
+                             default=PRICE_BAND_OVER_100M),
+        bucket=sketch_bucket(price),
+    )
+    return (
+        df.groupby(BUCKET_KEYS, dropna=False)["建物總價萬元"]
+        .agg(["count", "sum", "min", "max"])
+        .reset_index()
+    )
+
+
+def _rollup(buckets: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    buckets = (
+        buckets.groupby(keys + ["bucket"], dropna=False)
+        .agg(count=("count", "sum"), sum=("sum", "sum"), min=("min", "min"), max=("max", "max"))
+        .reset_index()
+    )
+
+    # sketch 以 JSON 物件 {"桶號": 筆數} 存放；0 元區間不需要 sketch
+    buckets["sketch"] = '"' + buckets["bucket"].astype(str) + '":' + buckets["count"].astype(str)
+    rollups = (
+        buckets.groupby(keys, dropna=False)
+        .agg(count=("count", "sum"), sum=("sum", "sum"), min=("min", "min"), max=("max", "max"),
+             sketch=("sketch", ",".join))
+        .reset_index()
+    )
+    rollups["sketch"] = "{" + rollups["sketch"] + "}"
+    rollups.loc[rollups["price_band"] == PRICE_BAND_ZERO, "sketch"] = "{}"
+    return rollups
+
+
+def compute_city_rollups(
+    conn: sqlite3.Connection,
+    city: str,
+    months: Optional[Dict[str, List[int]]] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    以縣市資料表計算彙總列；傳入 months ({交易年: [交易月]}) 時只讀取這些月份的資料 (以交易年的索引過濾)。
+    """
+    sql = (
+        f'SELECT ? AS "縣市", "交易年", "交易月", "分類", "交易標的", "屋況", "房齡", "建物總價萬元" '
+        f'FROM "{city}" WHERE "交易年" != \'\' AND "交易月" != \'\' AND "建物總價萬元" IS NOT NULL'
+    )
+    if months is None:
+        queries = [(sql, (city,))]
+    else:
+        queries = [
+            (f'{sql} AND "交易年" = ? AND CAST("交易月" AS INTEGER) IN ({", ".join("?" * len(month_list))})',
+             (city, year, *month_list))
+            for year, month_list in months.items()
+        ]
+    parts = [
+        _aggregate_chunk(chunk)
+        for query, params in queries
+        for chunk in pd.read_sql_query(query, conn, params=params, chunksize=ROLLUP_CHUNK_SIZE)
+    ]
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return {}
+
+    buckets = pd.concat(parts, ignore_index=True)
+    return {table: _rollup(buckets, keys) for table, keys in ROLLUP_TABLES.items()}
+
+
+def rebuild_city_rollups(conn: sqlite3.Connection, city: str, months: Optional[Dict[str, List[int]]] = None) -> int:
+    """
+    以縣市資料表重建該縣市 (傳入 months 時只重建這些月份) 的彙總列 (需在呼叫端的交易中執行)。
+    """
+    rollups = compute_city_rollups(conn, city, months)
+    total = 0
+    for table, keys in ROLLUP_TABLES.items():
+        if months is None:
+            conn.execute(f'DELETE FROM "{table}" WHERE "縣市" = ?', (city,))
+        for year, month_list in (months or {}).items():
+            conn.execute(
+                f'DELETE FROM "{table}" WHERE "縣市" = ? AND "交易年" = ? '
+                f'AND "交易月" IN ({", ".join("?" * len(month_list))})',
+                (city, year, *month_list),
+            )
+        if table not in rollups:
+            continue
+
+        columns = keys + ["count", "sum", "min", "max", "sketch"]
+        frame = rollups[table][columns].astype(object)
+        frame = frame.where(frame.notna(), None)
+        quoted = ", ".join(f'"{col}"' for col in columns)
+        conn.executemany(
+            f'INSERT INTO "{table}" ({quoted}) VALUES ({", ".join("?" * len(columns))})',
+            frame.itertuples(index=False, name=None),
+        )
+        total += len(frame)
+    return total
+
+
+def _pending_months(conn: sqlite3.Connection) -> Dict[str, Dict[str, List[int]]]:
+    pending: Dict[str, Dict[str, List[int]]] = {}
+    for city, year, month in conn.execute(
+        f'SELECT "縣市", "交易年", "交易月" FROM "{ROLLUP_PENDING_TABLE}" ORDER BY "縣市", "交易年", "交易月"'
+    ):
+        pending.setdefault(city, {}).setdefault(year, []).append(month)
+    return pending
+
+
+def refresh_price_rollups(conn: sqlite3.Connection, all_cities: List[str]) -> int:
+    """
+    只重算匯入時記為待更新 (mark_rollup_months) 的 (縣市, 交易年, 交易月) 彙總列；
+    彙總表第一次建立時改為重建全部縣市。
+    """
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    ensure_rollup_tables(conn)
+    ensure_pending_table(conn)
+    conn.commit()
+
+    if set(ROLLUP_TABLES) <= existing:
+        pending = _pending_months(conn)
+        targets = {city: pending[city] for city in all_cities if city in pending}
+    else:
+        targets = {city: None for city in all_cities}
+    total = 0
+    for city, months in targets.items():
+        try:
+            total += rebuild_city_rollups(conn, city, months)
+            conn.execute(f'DELETE FROM "{ROLLUP_PENDING_TABLE}" WHERE "縣市" = ?', (city,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    # 資料表已不存在的縣市不需要彙總
+    conn.execute(f'DELETE FROM "{ROLLUP_PENDING_TABLE}"')
+    conn.commit()
+
+    if targets:
+        months = sum(len(month_list) for year_months in targets.values() if year_months
+                     for month_list in year_months.values())
+        scope = f"{months} 個月份" if months else "全部月份"
+        log_info(f"☑️[月彙總] 更新 {len(targets)} 個縣市的 {scope}，共 {total} 列")
+    return total
+
+
+def rebuild_all(db_path: str = DB_PATH) -> int:
+    from ngui.preprocessing.process_real_estate_and_import import list_city_tables
+
+    conn = sqlite3.connect(db_path)
+    try:
+        for table in ROLLUP_TABLES:
+            conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+        conn.commit()
+        city_tables = list_city_tables(conn)
+        return refresh_price_rollups(conn, city_tables)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    print(rebuild_all())
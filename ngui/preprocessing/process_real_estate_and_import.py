@@ -4,9 +4,29 @@ import shutil
 import sqlite3
 import re
 import csv
+import time
+import queue
+import threading
+import zipfile
+import numpy as np
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from utils.logger import log_warning, log_info
 from config.paths import RAW_DATA_DIR, OLD_DATA_DIR, DB_PATH
+from ngui.preprocessing.import_ledger import (
+    calculate_file_hash, delete_imported_rows, ensure_ledger_table,
+    get_ledger_entry, ledger_season, record_import,
+)
+from ngui.preprocessing.import_quarantine import (
+    REASON_BAD_DATE, REASON_NOT_NUMERIC, build_issues, replace_quarantine, summarize_issues,
+)
+from ngui.preprocessing.sqlite_bulk_load import INSERT_BATCH_SIZE, bulk_load_session
+from ngui.preprocessing.price_rollups import mark_rollup_months, refresh_price_rollups
+from ngui.preprocessing.season_ledger import mark_seasons_imported
+from ngui.preprocessing.unified_schema import UNIFIED_SCHEMA_ENABLED, sync_unified_schema
+from ngui.preprocessing.zip_ingest import ZIP_INGEST_ENABLED, is_zip_member, list_relevant_members, open_csv_source
 
 def get_house_type(diff_year):
     if diff_year <= 3:
@@ -157,6 +177,167 @@ def format_row(row, filename, idx=None, folder=None):
                     parking_space, elevator, trade_date, trade_year, trade_month, trade_day, 
                     build_date, house_age, house_type])
 
+FORMATTED_COLUMNS = [
+    '交易標的', '建物型態', '建物坪數', '建物總價萬元', '建物每坪單價萬元',
+    '車位坪數', '車位總價萬元', '分類', '停車位', '電梯', '交易年月日',
+    '交易年', '交易月', '交易日', '建築完成年月', '房齡', '屋況',
+]
+
+SQUARE_METER_PER_PING = 3.305785
+
+def _round_like_python(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    np.round 以 x * 10^n 取整，與 Python round() 只有在剛好落在 .5 附近時可能差一位，
+    僅針對這些少數值改用 Python round() 校正，確保與 format_row 結果一致。
+    """
+    rounded = np.round(values, ndigits)
+    scaled = values * (10 ** ndigits)
+    frac = np.abs(scaled - np.trunc(scaled))
+    with np.errstate(invalid='ignore'):
+        near_half = np.abs(frac - 0.5) < (1e-6 + np.abs(scaled) * 1e-12)
+    for i in np.flatnonzero(near_half & np.isfinite(values)):
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+def _to_float(series: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    對應 format_row 中的 float()：回傳 (數值, 轉換失敗遮罩)。
+    原始值為空 (NaN) 時 float() 不會失敗，因此只有「有值但無法轉換」才算失敗。
+    全形數字 ("０１２")、含底線 ("1_000") 等 to_numeric 不接受但 float() 接受的值，逐筆改用 float() 轉換。
+    """
+    values = np.array(pd.to_numeric(series, errors='coerce'), dtype='float64')
+    failed = series.notna().to_numpy() & np.isnan(values)
+    for i in np.flatnonzero(failed):
+        try:
+            values[i] = float(series.iat[i])
+        except (TypeError, ValueError):
+            continue
+        failed[i] = False
+    return values, failed
+
+def _positive_rounded(values: np.ndarray, divisor: float, ndigits: int) -> np.ndarray:
+    with np.errstate(invalid='ignore'):
+        positive = values > 0.0
+    result = np.zeros(len(values), dtype='float64')
+    result[positive] = _round_like_python(values[positive] / divisor, ndigits)
+    return result
+
+def _roc_date_parts(series: pd.Series) -> Tuple[pd.Series, pd.Series, pd.Series, pd.Series]:
+    """
+    將民國年月日欄位 (如 1120315) 整欄轉為西元字串，回傳 (YYYYMMDD, 年, 月, 日)；
+    無法解析者皆為空字串，規則與 format_row 相同。
+    """
+    digits = series.astype(str).str.strip().str.extract(r"^(\d+)", expand=False)
+    valid = series.notna() & digits.notna() & (digits.str.len() >= 6)
+
+    empty = pd.Series("", index=series.index, dtype=object)
+    date, year, month, day = empty.copy(), empty.copy(), empty.copy(), empty.copy()
+    if not valid.any():
+        return date, year, month, day
+
+    digits = digits[valid]
+    roc_year = digits.str[:-4]
+    # 民國年位數異常時避免 int64 溢位，改以 Python int 處理
+    short = roc_year.str.len() <= 15
+    ad_year = pd.Series(index=roc_year.index, dtype=object)
+    ad_year[short] = (roc_year[short].astype('int64') + 1911).astype(str)
+    ad_year[~short] = roc_year[~short].map(lambda v: str(int(v) + 1911))
+
+    year[valid] = ad_year
+    month[valid] = digits.str[-4:-2]
+    day[valid] = digits.str[-2:]
+    date[valid] = year[valid] + month[valid] + day[valid]
+    return date, year, month, day
+
+def format_frame(df: pd.DataFrame, filename: str, issues: Optional[List[pd.DataFrame]] = None) -> pd.DataFrame:
+    """
+    format_row 的整欄 (向量化) 版本，產出相同的 17 個衍生欄位 (FORMATTED_COLUMNS)。
+    房齡以浮點數回傳 (無法計算為 NaN)，經 coerce_numeric_columns 後與 format_row 結果相同。
+
+    :param issues: 傳入時，無法轉換而被設為 0 / 空值的原始值以隔離紀錄 (見 import_quarantine) 附加到此 list，
+                   不逐筆寫 log；未傳入時每個 chunk 記錄一行計數
+    """
+    trade_object = df['交易標的'].astype(str)
+    building_type = df['建物型態'].astype(str)
+
+    square_feet, square_feet_failed = _to_float(df['建物移轉總面積平方公尺'])
+    total_price, total_price_failed = _to_float(df['總價元'])
+    car_price, car_price_failed = _to_float(df['車位總價元'])
+    car_square_feet, car_square_feet_failed = _to_float(df['車位移轉總面積平方公尺'])
+
+    # 建物坪數與每坪單價：面積或總價任一無法轉換時皆為 0
+    ping_failed = square_feet_failed | total_price_failed
+    ping = _positive_rounded(np.where(ping_failed, 0.0, square_feet), SQUARE_METER_PER_PING, 2)
+    unit_ping_thousand_price = np.zeros(len(df), dtype='float64')
+    has_ping = ping > 0
+    unit_ping_thousand_price[has_ping] = _round_like_python(
+        total_price[has_ping] / ping[has_ping] / 10000, 1)
+
+    total_thousand_price = _positive_rounded(total_price, 10000, 1)
+    car_thousand_price = _positive_rounded(car_price, 10000, 1)
+    car_ping = _positive_rounded(car_square_feet, SQUARE_METER_PER_PING, 2)
+
+    has_house = trade_object.str.contains('房', regex=False)
+    has_land = trade_object.str.contains('土', regex=False)
+    has_car = trade_object.str.contains('車', regex=False)
+    category = np.select([has_house, has_land, has_car], ["房地", "土地", "車位"], default="其他")
+
+    trade_date, trade_year, trade_month, trade_day = _roc_date_parts(df['交易年月日'])
+    build_date = _roc_date_parts(df['建築完成年月'])[0]
+
+    # 房齡與屋況：預售屋 (b.csv) 或無法計算者一律為預售屋
+    house_age = np.full(len(df), np.nan)
+    house_type = np.full(len(df), "預售屋", dtype=object)
+    if not filename.endswith('b.csv'):
+        trade_dt = pd.to_datetime(trade_date, format='%Y%m%d', errors='coerce')
+        build_dt = pd.to_datetime(build_date, format='%Y%m%d', errors='coerce')
+        diff_days = (trade_dt - build_dt).dt.days.to_numpy(dtype='float64')
+        with np.errstate(invalid='ignore'):
+            aged = (build_date != "").to_numpy() & (diff_days >= 0)
+        house_age[aged] = _round_like_python(diff_days[aged] / 365.25, 1)
+        house_type[aged] = np.select(
+            [house_age[aged] <= 3, house_age[aged] <= 10, house_age[aged] <= 20],
+            ["新屋", "新古屋", "中古屋"], default="老屋")
+
+    trade_date_failed = df['交易年月日'].notna().to_numpy() & (trade_date == "").to_numpy()
+    build_date_failed = df['建築完成年月'].notna().to_numpy() & (build_date == "").to_numpy()
+    found = [
+        build_issues(df.index, column, df[column], failed, reason)
+        for column, failed, reason in (
+            ('建物移轉總面積平方公尺', square_feet_failed, REASON_NOT_NUMERIC),
+            ('總價元', total_price_failed, REASON_NOT_NUMERIC),
+            ('車位總價元', car_price_failed, REASON_NOT_NUMERIC),
+            ('車位移轉總面積平方公尺', car_square_feet_failed, REASON_NOT_NUMERIC),
+            ('交易年月日', trade_date_failed, REASON_BAD_DATE),
+            ('建築完成年月', build_date_failed, REASON_BAD_DATE),
+        )
+    ]
+    found = [frame for frame in found if frame is not None]
+    if issues is not None:
+        issues.extend(found)
+    elif found:
+        log_warning(f"{filename} {summarize_issues(found)}")
+
+    return pd.DataFrame({
+        '交易標的': trade_object.str.split('(', n=1).str[0],
+        '建物型態': building_type.str.split('(', n=1).str[0],
+        '建物坪數': ping,
+        '建物總價萬元': total_thousand_price,
+        '建物每坪單價萬元': unit_ping_thousand_price,
+        '車位坪數': car_ping,
+        '車位總價萬元': car_thousand_price,
+        '分類': category,
+        '停車位': np.where(has_car, "有", "無"),
+        '電梯': np.where(building_type.str.contains('有電梯', regex=False), "有", "無"),
+        '交易年月日': trade_date,
+        '交易年': trade_year,
+        '交易月': trade_month,
+        '交易日': trade_day,
+        '建築完成年月': build_date,
+        '房齡': house_age,
+        '屋況': house_type,
+    }, index=df.index)
+
 CITY_CODE_MAP = {
     "c": "基隆", "a": "臺北", "f": "新北", "h": "桃園", "o": "新竹", 
     "j": "新竹", "k": "苗栗", "b": "臺中", "m": "南投", "n": "彰化", 
@@ -177,84 +358,280 @@ def map_dtype_to_sql(dtype):
     else:
         return "TEXT"
 
-def clean_and_import_file(file_path: str, season_folder: str, conn: sqlite3.Connection):
+FLOAT_COLUMNS = [
+    "建物坪數", "建物總價萬元", "建物每坪單價萬元",
+    "車位坪數", "車位總價萬元", "房齡",
+    "建物移轉總面積平方公尺", "車位移轉總面積平方公尺"
+]
+INT_COLUMNS = ["總價元", "車位總價元"]
+
+def coerce_numeric_columns(df: pd.DataFrame) -> None:
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    for col in INT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce", downcast="integer")
+
+COLUMNS_TO_KEEP = [
+    '鄉鎮市區', '交易標的', '交易年月日', '建物型態', '主要用途',
+    '建築完成年月', '建物移轉總面積平方公尺', '總價元',
+    '車位移轉總面積平方公尺', '車位總價元',
+]
+
+# 部分年份的 CSV 欄名為「車位移轉總面積(平方公尺)」
+COLUMN_ALIASES = {'車位移轉總面積(平方公尺)': '車位移轉總面積平方公尺'}
+
+# 讀檔時一律以字串讀入，數值轉換交由 format_frame / coerce_numeric_columns 處理，
+# 避免單一髒值讓整個 chunk 的型別推斷失敗
+CSV_DTYPES = {col: str for col in COLUMNS_TO_KEEP + list(COLUMN_ALIASES)}
+
+IMPORT_CHUNK_SIZE = 50000
+
+def iter_lvr_land_csv(source, chunksize: int = IMPORT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    以 C engine 分塊讀取 lvr_land CSV，只讀取 COLUMNS_TO_KEEP 需要的欄位。
+    每次 yield 一個最多 chunksize 筆的 DataFrame，記憶體用量與檔案大小無關。
+
+    :param source: 檔案路徑或已開啟的二進位檔案物件
+    """
+    reader = pd.read_csv(
+        source,
+        encoding='utf-8',
+        skiprows=[1],
+        on_bad_lines='skip',
+        quoting=csv.QUOTE_NONE,
+        engine='c',
+        quotechar='"',
+        usecols=lambda col: col in CSV_DTYPES,
+        dtype=CSV_DTYPES,
+        chunksize=chunksize,
+    )
+
+    with reader:
+        for chunk in reader:
+            chunk = chunk.rename(columns=COLUMN_ALIASES)
+            missing = [col for col in COLUMNS_TO_KEEP if col not in chunk.columns]
+            if missing:
+                raise KeyError(f"缺少必要欄位：{missing}")
+            yield chunk.loc[:, COLUMNS_TO_KEEP]
+
+def clean_chunk(
+    df: pd.DataFrame,
+    file_path: str,
+    city: str,
+    issues: Optional[List[pd.DataFrame]] = None,
+) -> pd.DataFrame:
+    df_cleaned = df.copy()
+    df_cleaned[FORMATTED_COLUMNS] = format_frame(df_cleaned, filename=file_path, issues=issues)
+
+    df_cleaned.insert(0, "縣市", city)
+    coerce_numeric_columns(df_cleaned)
+    return df_cleaned
+
+def create_city_table(conn: sqlite3.Connection, city: str, df_cleaned: pd.DataFrame):
+    columns_def = ", ".join([f'"{col}" {map_dtype_to_sql(dtype)}' for col, dtype in df_cleaned.dtypes.items()])
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS "{city}" (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            {columns_def}
+        )
+    ''')
+
+# 對應 ngui/components/main_sql.py 的查詢條件：交易年 (= / < / IN) 搭配 分類 或 交易標的，再加上 屋況
+CITY_TABLE_INDEXES = {
+    "year_category_status": ("交易年", "分類", "屋況"),
+    "year_trade_object_status": ("交易年", "交易標的", "屋況"),
+}
+
+def ensure_city_indexes(conn: sqlite3.Connection, city: str):
+    for suffix, columns in CITY_TABLE_INDEXES.items():
+        columns_def = ", ".join(f'"{col}"' for col in columns)
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{city}_{suffix}" ON "{city}" ({columns_def})')
+
+def list_city_tables(conn: sqlite3.Connection) -> List[str]:
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return sorted(tables & set(CITY_CODE_MAP.values()))
+
+def iter_raw_chunks(file_path: str) -> Iterator[pd.DataFrame]:
+    """
+    逐塊讀取 CSV (一般檔案或 zip 成員)，尚未清洗。
+    """
+    with open_csv_source(file_path) as f:
+        yield from iter_lvr_land_csv(f, IMPORT_CHUNK_SIZE)
+
+def count_csv_rows(file_path: str) -> int:
+    """
+    估計 CSV 的資料列數 (換行數扣掉中、英文兩列表頭)，用來判斷是否值得延後建立索引。
+    """
+    lines = 0
+    with open_csv_source(file_path) as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+    return max(0, lines - 2)
+
+def iter_cleaned_chunks(
+    file_path: str,
+    city: str,
+    issues: Optional[List[pd.DataFrame]] = None,
+) -> Iterator[pd.DataFrame]:
+    for chunk in iter_raw_chunks(file_path):
+        yield clean_chunk(chunk, file_path, city, issues)
+
+def clean_chunk_job(chunk: pd.DataFrame, file_path: str, city: str) -> Tuple[pd.DataFrame, List[pd.DataFrame]]:
+    """
+    在子行程清洗單一 chunk，回傳 (清洗後的 chunk, 隔離紀錄)；一次只有一個 chunk 在行程之間傳遞。
+    """
+    issues = []
+    return clean_chunk(chunk, file_path, city, issues), issues
+
+def insert_frame(conn: sqlite3.Connection, table: str, df: pd.DataFrame, batch_size: int = INSERT_BATCH_SIZE):
+    columns = ", ".join(f'"{col}"' for col in df.columns)
+    placeholders = ", ".join("?" * len(df.columns))
+    sql = f'INSERT INTO "{table}" ({columns}) VALUES ({placeholders})'
+    # tolist() 直接轉成 Python 原生型別；NaN 綁定到 SQLite 時會存成 NULL
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start:start + batch_size]
+        conn.executemany(sql, zip(*(batch[col].tolist() for col in batch.columns)))
+
+def write_city_chunks(conn: sqlite3.Connection, city: str, chunks: Iterable[pd.DataFrame]) -> int:
+    total_rows = 0
+    for df_cleaned in chunks:
+        if total_rows == 0:
+            create_city_table(conn, city, df_cleaned)
+
+        insert_frame(conn, city, df_cleaned)
+        total_rows += len(df_cleaned)
+    return total_rows
+
+def _max_id(conn: sqlite3.Connection, table: str) -> int:
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    if not exists:
+        return 0
+    return conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM "{table}"').fetchone()[0]
+
+def check_import_needed(
+    conn: sqlite3.Connection,
+    season_folder: str,
+    file_path: str,
+    content_hash: Optional[str] = None,
+) -> Optional[Tuple[str, str, Optional[Dict]]]:
+    """
+    比對匯入紀錄 (import_ledger)，判斷檔案是否需要匯入。
+
+    :param content_hash: 已在其他執行緒算好的內容 hash (見 calculate_file_hash)，省略時在此計算
+    :return: 需要匯入時回傳 (ledger 期別, 內容 hash, 上次匯入紀錄或 None)；已匯入且內容未變更時回傳 None
+    """
+    filename = os.path.basename(file_path)
+    ensure_ledger_table(conn)
+    content_hash = content_hash or calculate_file_hash(file_path)
+    season = ledger_season(season_folder, content_hash)
+    entry = get_ledger_entry(conn, season, filename)
+
+    if entry and entry["content_hash"] == content_hash:
+        print(f"☑️ 已匯入過 {season_folder}/{filename}，內容未變更，略過")
+        return None
+    return season, content_hash, entry
+
+def write_file_transaction(
+    conn: sqlite3.Connection,
+    pending: Tuple[str, str, Optional[Dict]],
+    filename: str,
+    city: str,
+    chunks: Iterable[pd.DataFrame],
+    issues: Optional[List[pd.DataFrame]] = None,
+) -> int:
+    """
+    在單一交易中：刪除該檔案上次匯入的資料 (若有)、寫入新資料並更新匯入紀錄與隔離紀錄。
+    任何一步失敗都會 rollback，資料表維持匯入前的狀態。
+
+    :param issues: 清洗時收集的隔離紀錄 list；chunks 為 generator 時會在寫入過程中陸續填入
+    """
+    season, content_hash, entry = pending
+    try:
+        if entry:
+            # 上次匯入的資料所在的月份也要重算彙總
+            mark_rollup_months(conn, entry["city"], entry["first_id"], entry["last_id"])
+            delete_imported_rows(conn, entry)
+
+        prior_max_id = _max_id(conn, city)
+        rows = write_city_chunks(conn, city, chunks)
+        first_id, last_id = None, None
+        if rows:
+            first_id, last_id = conn.execute(
+                f'SELECT MIN(id), MAX(id) FROM "{city}" WHERE id > ?', (prior_max_id,)).fetchone()
+            mark_rollup_months(conn, city, first_id, last_id)
+
+        record_import(conn, season, filename, city, content_hash, rows, first_id, last_id)
+        if issues is not None:
+            quarantined = replace_quarantine(conn, season, filename, issues)
+        conn.commit()
+
+        if issues:
+            msg = f"⚠️[資料隔離] {season}/{filename} 共 {quarantined} 個值無法轉換：{summarize_issues(issues)}"
+            log_warning(msg)
+            print(msg)
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+
+def clean_and_import_file(
+    file_path: str,
+    season_folder: str,
+    conn: sqlite3.Connection,
+    pending: Optional[Tuple[str, str, Optional[Dict]]] = None,
+) -> int:
     filename = os.path.basename(file_path)
     city = get_city_name(filename)
     if city == "未知縣市":
         print(f"❌ 無法判斷縣市：{filename}")
-        return
+        return 0
 
     try:
-        df = pd.read_csv(
-            file_path,
-            encoding='utf-8',
-            skiprows=[1],
-            on_bad_lines='skip',
-            quoting=csv.QUOTE_NONE,
-            engine='python',
-            quotechar='"',
-        )
+        pending = pending or check_import_needed(conn, season_folder, file_path)
+        if pending is None:
+            return 0
 
-        if '車位移轉總面積(平方公尺)' in df.columns:
-            df = df.rename(columns={'車位移轉總面積(平方公尺)': '車位移轉總面積平方公尺'})
-
-        columns_to_keep = [
-            '鄉鎮市區', '交易標的', '交易年月日', '建物型態', '主要用途',
-            '建築完成年月', '建物移轉總面積平方公尺', '總價元',
-            '車位移轉總面積平方公尺', '車位總價元',
-        ]
-        df_cleaned = df.loc[:, columns_to_keep].copy()
-
-        df_cleaned[['交易標的', '建物型態', '建物坪數', '建物總價萬元', '建物每坪單價萬元',
-                    '車位坪數', '車位總價萬元', '分類', '停車位', '電梯', '交易年月日',
-                    '交易年', '交易月', '交易日', '建築完成年月', '房齡', '屋況']] = \
-            df_cleaned.apply(
-                lambda row, filename=file_path, folder=filename: \
-                            format_row(row, filename=filename, idx=row.name, folder=folder),
-                axis=1
-            )
-
-        df_cleaned.insert(0, "縣市", city)
-
-        float_columns = [
-            "建物坪數", "建物總價萬元", "建物每坪單價萬元",
-            "車位坪數", "車位總價萬元", "房齡",
-            "建物移轉總面積平方公尺", "車位移轉總面積平方公尺"
-        ]
-        int_columns = ["總價元", "車位總價元"]
-
-        for col in float_columns:
-            if col in df_cleaned.columns:
-                df_cleaned[col] = pd.to_numeric(df_cleaned[col], errors="coerce")
-
-        for col in int_columns:
-            if col in df_cleaned.columns:
-                df_cleaned[col] = pd.to_numeric(df_cleaned[col], errors="coerce", downcast="integer")
-
-        columns_def = ", ".join([f'"{col}" {map_dtype_to_sql(dtype)}' for col, dtype in df_cleaned.dtypes.items()])
-        conn.execute(f'''
-            CREATE TABLE IF NOT EXISTS "{city}" (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                {columns_def}
-            )
-        ''')
-
-        df_cleaned.to_sql(city, conn, if_exists="append", index=False)
-        print(f"✅ 已匯入 {season_folder}/{filename} -> 表 {city} 共 {len(df_cleaned)} 筆")
+        issues = []
+        total_rows = write_file_transaction(
+            conn, pending, filename, city, iter_cleaned_chunks(file_path, city, issues), issues)
+        action = "重新匯入" if pending[2] else "已匯入"
+        print(f"✅ {action} {season_folder}/{filename} -> 表 {city} 共 {total_rows} 筆")
+        return total_rows
 
     except Exception as e:
         msg = f"❌ 清洗或匯入失敗 {season_folder}/{filename}，錯誤：{e}"
         log_warning(msg)
         print(msg)
+        return 0
+
+def clean_file(file_path: str) -> Tuple[str, List[pd.DataFrame], List[pd.DataFrame]]:
+    """
+    讀檔並清洗整個檔案，不碰資料庫 (benchmarks 用來分開量測清洗與寫入)。
+    回傳 (縣市, 清洗後的 chunk 列表, 隔離紀錄)；整個檔案的結果都在記憶體中，匯入流程改用逐塊串流的 clean_chunk_job。
+    """
+    city = get_city_name(os.path.basename(file_path))
+    if city == "未知縣市":
+        raise ValueError(f"無法判斷縣市：{os.path.basename(file_path)}")
+    issues = []
+    return city, list(iter_cleaned_chunks(file_path, city, issues)), issues
 
-def apply_clean_and_import_file():
-    # 確保 RAW 與 OLD 資料夾存在
-    os.makedirs(RAW_DATA_DIR, exist_ok=True)
-    os.makedirs(OLD_DATA_DIR, exist_ok=True)
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+# (期別資料夾, CSV 路徑, check_import_needed 的結果)
+ImportTask = Tuple[str, str, Tuple[str, str, Optional[Dict]]]
 
-    conn = sqlite3.connect(DB_PATH)
+# 平行清洗的子行程數，1 表示沿用單行程逐塊匯入
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "1"))
+
+# 平行匯入時每個清洗 worker 最多暫存 (清洗中或等待寫入) 的 chunk 數；管線匯入時為每個檔案的上限
+STREAM_QUEUE_CHUNKS = int(os.getenv("STREAM_QUEUE_CHUNKS", "2"))
 
+def _collect_import_tasks() -> List[Tuple[str, str]]:
+    """
+    掃描 RAW_DATA_DIR 底下各期別資料夾，回傳待匯入的 (期別資料夾, CSV 路徑)；空資料夾直接刪除。
+    """
+    tasks = []
     for folder in os.listdir(RAW_DATA_DIR):
         folder_path = os.path.join(RAW_DATA_DIR, folder)
         if not os.path.isdir(folder_path):
@@ -265,26 +642,278 @@ def apply_clean_and_import_file():
             os.rmdir(folder_path)
             continue
 
-        old_folder_path = os.path.join(OLD_DATA_DIR, folder)
-        os.makedirs(old_folder_path, exist_ok=True)
+        os.makedirs(os.path.join(OLD_DATA_DIR, folder), exist_ok=True)
 
         for file in os.listdir(folder_path):
             if file.endswith(".csv"):
-                try:
-                    clean_and_import_file(os.path.join(folder_path, file), folder, conn)
-                    shutil.move(os.path.join(folder_path, file), os.path.join(old_folder_path, file))
-                    print(f"✅ 檔案 {file} 處理完成，已移動到 {old_folder_path}")
-                except Exception as e:
-                    print(f"❌ 處理檔案 {file} 時出錯，錯誤：{e}")
-                    continue
+                tasks.append((folder, os.path.join(folder_path, file)))
+    return tasks
+
+def _collect_zip_tasks() -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    掃描 RAW_DATA_DIR 底下尚未解壓縮的期別壓縮檔 (ZIP_INGEST 模式)，回傳 (待匯入的 (期別, zip 成員路徑), 可讀取的壓縮檔)。
+    只列出需要分析的 CSV 成員，匯入時直接從 zip 串流讀取；未啟用 ZIP_INGEST 時不處理壓縮檔 (由解壓縮流程負責)。
+    """
+    tasks, season_zips = [], []
+    if not ZIP_INGEST_ENABLED:
+        return tasks, season_zips
+    for file in sorted(os.listdir(RAW_DATA_DIR)):
+        zip_path = os.path.join(RAW_DATA_DIR, file)
+        if not file.lower().endswith(".zip") or not os.path.isfile(zip_path):
+            continue
 
-        if not os.listdir(folder_path):
+        folder = os.path.splitext(file)[0]
+        try:
+            members = list_relevant_members(zip_path)
+        except zipfile.BadZipFile as e:
+            msg = f"❌ 壓縮檔損毀，略過匯入 {file}，錯誤：{e}"
+            log_warning(msg)
+            print(msg)
+            continue
+
+        os.makedirs(os.path.join(OLD_DATA_DIR, folder), exist_ok=True)
+        tasks.extend((folder, member) for member in members)
+        season_zips.append(zip_path)
+    return tasks, season_zips
+
+def _archive_season_zips(season_zips: Iterable[str]):
+    """
+    zip 內的 CSV 全部處理完後，把整個壓縮檔移到 OLD_DATA_DIR 對應的期別資料夾。
+    """
+    for zip_path in season_zips:
+        file = os.path.basename(zip_path)
+        old_folder_path = os.path.join(OLD_DATA_DIR, os.path.splitext(file)[0])
+        try:
+            shutil.move(zip_path, os.path.join(old_folder_path, file))
+            print(f"✅ 壓縮檔 {file} 處理完成，已移動到 {old_folder_path}")
+        except Exception as e:
+            print(f"❌ 處理壓縮檔 {file} 時出錯，錯誤：{e}")
+
+def _move_to_old(folder: str, file_path: str):
+    # zip 成員隨整個壓縮檔一起移動 (見 _archive_season_zips)
+    if is_zip_member(file_path):
+        return
+
+    file = os.path.basename(file_path)
+    old_folder_path = os.path.join(OLD_DATA_DIR, folder)
+    try:
+        shutil.move(file_path, os.path.join(old_folder_path, file))
+        print(f"✅ 檔案 {file} 處理完成，已移動到 {old_folder_path}")
+    except Exception as e:
+        print(f"❌ 處理檔案 {file} 時出錯，錯誤：{e}")
+
+def _remove_empty_season_folders(folders: Iterable[str]):
+    for folder in folders:
+        folder_path = os.path.join(RAW_DATA_DIR, folder)
+        if os.path.isdir(folder_path) and not os.listdir(folder_path):
             print(f"資料夾 {folder_path} 內已無檔案，將被刪除")
             os.rmdir(folder_path)
 
+def _filter_imported_tasks(conn: sqlite3.Connection, tasks: List[Tuple[str, str]]) -> List[ImportTask]:
+    """
+    依匯入紀錄排除已匯入且內容未變更的檔案 (直接移到 OLD_DATA_DIR)，回傳仍需匯入的工作。
+    """
+    pending_tasks = []
+    for folder, file_path in tasks:
+        try:
+            pending = check_import_needed(conn, folder, file_path)
+        except Exception as e:
+            msg = f"❌ 檢查匯入紀錄失敗 {folder}/{os.path.basename(file_path)}，錯誤：{e}"
+            log_warning(msg)
+            print(msg)
+            continue
+
+        if pending is None:
+            _move_to_old(folder, file_path)
+        else:
+            pending_tasks.append((folder, file_path, pending))
+    return pending_tasks
+
+def _import_sequential(conn: sqlite3.Connection, tasks: List[ImportTask]) -> int:
+    total_rows = 0
+    for folder, file_path, pending in tasks:
+        total_rows += clean_and_import_file(file_path, folder, conn, pending)
+        _move_to_old(folder, file_path)
+    return total_rows
+
+def _read_chunks_for_pool(
+    tasks: List[ImportTask],
+    executor: ProcessPoolExecutor,
+    chunk_queue: "queue.Queue",
+    stop: threading.Event,
+):
+    """
+    平行匯入模式的讀檔執行緒：依工作順序逐塊讀取 CSV，每個 chunk 交給 process pool 清洗 (clean_chunk_job)，
+    把 future 依序放入 chunk_queue 給 writer。子行程直接回傳清洗結果，每個 chunk 只在行程之間傳遞一次。
+    每個檔案依序放入 ("chunk", future)…，最後放入 ("done", None) 或 ("error", 例外)。
+    """
+    def put(message) -> bool:
+        # 佇列容量有限：writer 尚未寫入時在此等待；writer 結束後 (stop) 不再送出
+        while not stop.is_set():
+            try:
+                chunk_queue.put(message, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    for _, file_path, _ in tasks:
+        try:
+            city = get_city_name(os.path.basename(file_path))
+            if city == "未知縣市":
+                raise ValueError(f"無法判斷縣市：{os.path.basename(file_path)}")
+            for chunk in iter_raw_chunks(file_path):
+                if not put(("chunk", executor.submit(clean_chunk_job, chunk, file_path, city))):
+                    return
+            message = ("done", None)
+        except Exception as e:
+            message = ("error", e)
+        if not put(message):
+            return
+
+def _receive_chunks(chunk_queue: "queue.Queue", issues: List[pd.DataFrame], received: Dict) -> Iterator[pd.DataFrame]:
+    """
+    writer 端依序取得目前檔案清洗好的 chunk，並把隔離紀錄加入 issues；讀檔或清洗失敗時拋出例外。
+    """
+    while True:
+        kind, payload = chunk_queue.get()
+        if kind != "chunk":
+            received["finished"] = True
+            if kind == "error":
+                raise payload
+            return
+        cleaned, chunk_issues = payload.result()
+        issues.extend(chunk_issues)
+        yield cleaned
+
+def _import_in_parallel(conn: sqlite3.Connection, tasks: List[ImportTask], workers: int) -> int:
+    """
+    讀檔執行緒依序讀取 chunk、以 process pool 平行清洗 (一個 chunk 一個工作，結果直接回傳)，
+    主行程作為唯一 writer 依工作順序逐檔寫入各縣市資料表 (一個檔案一個交易)。
+    同時在清洗或等待寫入的 chunk 最多 workers × STREAM_QUEUE_CHUNKS 個，不會把整個檔案留在記憶體。
+    """
+    total_rows = 0
+    chunk_queue = queue.Queue(maxsize=max(1, workers * STREAM_QUEUE_CHUNKS))
+    stop = threading.Event()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        reader = threading.Thread(target=_read_chunks_for_pool, args=(tasks, executor, chunk_queue, stop),
+                                  name="import-read", daemon=True)
+        reader.start()
+        try:
+            for folder, file_path, pending in tasks:
+                filename = os.path.basename(file_path)
+                city = get_city_name(filename)
+                issues = []
+                received = {"finished": False}
+                try:
+                    rows = write_file_transaction(
+                        conn, pending, filename, city, _receive_chunks(chunk_queue, issues, received), issues)
+                    total_rows += rows
+                    action = "重新匯入" if pending[2] else "已匯入"
+                    print(f"✅ {action} {folder}/{filename} -> 表 {city} 共 {rows} 筆")
+                except Exception as e:
+                    # 讀完這個檔案剩下的 chunk，下一個檔案從佇列中自己的第一個 chunk 開始
+                    while not received["finished"]:
+                        kind, payload = chunk_queue.get()
+                        if kind == "chunk":
+                            payload.cancel()
+                        else:
+                            received["finished"] = True
+                    msg = f"❌ 清洗或匯入失敗 {folder}/{filename}，錯誤：{e}"
+                    log_warning(msg)
+                    print(msg)
+
+                _move_to_old(folder, file_path)
+        finally:
+            stop.set()
+            reader.join()
+
+    return total_rows
+
+def completed_folders(
+    conn: sqlite3.Connection,
+    folders: Iterable[str],
+    pending_tasks: List[ImportTask],
+) -> Set[str]:
+    """
+    回傳所有 CSV 都已寫入 (匯入紀錄的 hash 與本次相同) 或先前已匯入的期別資料夾，供期別 ledger 標記為 imported。
+    """
+    completed = set(folders)
+    for folder, file_path, (season, content_hash, _) in pending_tasks:
+        filename = os.path.basename(file_path)
+        if get_city_name(filename) == "未知縣市":
+            continue
+        entry = get_ledger_entry(conn, season, filename)
+        if not entry or entry["content_hash"] != content_hash:
+            completed.discard(folder)
+    return completed
+
+
+def finalize_import(conn: sqlite3.Connection, folders: Iterable[str], season_zips: Iterable[str]):
+    """
+    匯入完成後的收尾：建立索引、更新彙總表與統一資料表、PRAGMA optimize，再清理 RAW 資料夾並封存壓縮檔。
+    """
+    # 索引在資料寫入完成後才建立 (已存在者略過)，再讓 SQLite 視需要更新查詢統計
+    city_tables = list_city_tables(conn)
+    for city in city_tables:
+        ensure_city_indexes(conn, city)
+    # 趨勢圖使用的月彙總只重算匯入時有資料異動的 (縣市, 交易年, 交易月)
+    refresh_price_rollups(conn, city_tables)
+    if UNIFIED_SCHEMA_ENABLED:
+        sync_unified_schema(conn, city_tables)
+    conn.execute("PRAGMA optimize")
+
+    _remove_empty_season_folders(folders)
+    _archive_season_zips(season_zips)
     conn.commit()
+
+def apply_clean_and_import_file(workers: int = IMPORT_WORKERS, bulk_load: bool = True) -> Dict[str, float]:
+    """
+    匯入 RAW_DATA_DIR 底下所有期別的 CSV。
+
+    :param workers: 平行清洗的子行程數，大於 1 時啟用平行匯入模式
+    :param bulk_load: 是否啟用大量匯入模式 (WAL、放寬同步、延後建立索引，結束後還原)
+    :return: 匯入統計 (檔案數、筆數、耗時秒數)
+    """
+    # 確保 RAW 與 OLD 資料夾存在
+    os.makedirs(RAW_DATA_DIR, exist_ok=True)
+    os.makedirs(OLD_DATA_DIR, exist_ok=True)
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+
+    conn = sqlite3.connect(DB_PATH)
+    started = time.perf_counter()
+
+    zip_tasks, season_zips = _collect_zip_tasks()
+    tasks = _collect_import_tasks() + zip_tasks
+    pending_tasks = _filter_imported_tasks(conn, tasks)
+    cities = {get_city_name(os.path.basename(file_path)) for _, file_path, _ in pending_tasks}
+
+    def expected_rows(city: str) -> int:
+        return sum(count_csv_rows(file_path) for _, file_path, _ in pending_tasks
+                   if get_city_name(os.path.basename(file_path)) == city)
+
+    with bulk_load_session(conn, cities, expected_rows=expected_rows) if bulk_load and pending_tasks else nullcontext():
+        if workers > 1 and len(pending_tasks) > 1:
+            total_rows = _import_in_parallel(conn, pending_tasks, workers)
+        else:
+            total_rows = _import_sequential(conn, pending_tasks)
+
+    folders = {folder for folder, _ in tasks} | {os.path.splitext(os.path.basename(path))[0] for path in season_zips}
+    finalize_import(conn, folders, season_zips)
+    mark_seasons_imported(conn, completed_folders(conn, folders, pending_tasks))
     conn.close()
 
+    elapsed = time.perf_counter() - started
+    files = len(pending_tasks)
+    skipped = len(tasks) - files
+    stats = {"files": files, "skipped": skipped, "rows": total_rows, "seconds": round(elapsed, 2)}
+    msg = (f"📊[匯入統計] 匯入 {files} 個檔案 (略過 {skipped} 個已匯入)、{total_rows} 筆，耗時 {elapsed:.1f} 秒 "
+           f"({total_rows / elapsed if elapsed else 0:.0f} 筆/秒，"
+           f"{files / elapsed if elapsed else 0:.2f} 檔/秒，workers={workers})")
+    print(msg)
+    log_info(msg)
+
     print("✅ 所有檔案處理完成")
     log_info("✅ 所有檔案處理完成")
-    
\ No newline at end of file
+    return stats
@@ -5,43 +5,44 @@ import re
 from typing import Callable
 from config.paths import RAW_DATA_DIR  # 引入 config.paths 中的 RAW_DATA_DIR 定義
 
-def remove_irrelevant_csv_files(directory: str):
+def is_relevant_csv(filename: str) -> bool:
     """
-    從指定資料夾中刪除不符合條件的 CSV 檔案：
+    判斷實價登錄檔案是否需要分析，以下檔案不需要：
     - 檔名不含 lvr_land
     - 交易類別為 c
     - 交易物件類別為 build, land, park
     """
-    removed_files = []
+    filename_lower = os.path.basename(filename).lower()
 
-    for filename in os.listdir(directory):
+    # 不含 "lvr_land"
+    if "lvr_land" not in filename_lower:
+        return False
 
-        filepath = os.path.join(directory, filename)
-        filename_lower = filename.lower()
+    parts = filename_lower.split("_")
 
-        # 不含 "lvr_land"
-        if "lvr_land" not in filename_lower:
-            os.remove(filepath)
-            removed_files.append(filename)
-            continue
+    # 交易類別為 c
+    if len(parts) > 3:
+        type_code = parts[3].replace(".csv", "")
+        if type_code == "c":
+            return False
+
+    if len(parts) <= 4:
+        return True
 
-        parts = filename_lower.split("_")
+    # 交易物件類別為 build, land, park
+    object_code = parts[4].replace(".csv", "")
+    return object_code not in {"build", "land", "park"}
 
-        # 交易類別為 c
-        if len(parts) > 3:
-            type_code = parts[3].replace(".csv", "")
-            if type_code == "c":
-                os.remove(filepath)
-                removed_files.append(filename)
-                continue
 
-        if len(parts) <= 4:
-            continue
+def remove_irrelevant_csv_files(directory: str):
+    """
+    從指定資料夾中刪除不需要分析的檔案 (判斷規則見 is_relevant_csv)
+    """
+    removed_files = []
 
-        # 交易物件類別為 build, land, park
-        object_code = parts[4].replace(".csv", "")
-        if object_code in {"build", "land", "park"}:
-            os.remove(filepath)
+    for filename in os.listdir(directory):
+        if not is_relevant_csv(filename):
+            os.remove(os.path.join(directory, filename))
             removed_files.append(filename)
 
     # 結果輸出
@@ -0,0 +1,105 @@
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+# 每個歷史期別的處理進度：listed (選單中出現) → downloaded → extracted → imported。
+# 更新時只處理尚未 imported 的期別，並從中斷的階段繼續；ZIP_INGEST 模式不需要解壓縮，直接由 downloaded 匯入
+SEASON_LEDGER_TABLE = "season_ledger"
+
+STATE_LISTED = "listed"
+STATE_DOWNLOADED = "downloaded"
+STATE_EXTRACTED = "extracted"
+STATE_IMPORTED = "imported"
+SEASON_STATES = (STATE_LISTED, STATE_DOWNLOADED, STATE_EXTRACTED, STATE_IMPORTED)
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def ensure_season_ledger(conn: sqlite3.Connection):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS "{SEASON_LEDGER_TABLE}" (
+            season TEXT PRIMARY KEY,
+            label TEXT,
+            state TEXT NOT NULL,
+            zip_sha256 TEXT,
+            zip_bytes INTEGER,
+            listed_at TEXT NOT NULL,
+            downloaded_at TEXT,
+            extracted_at TEXT,
+            imported_at TEXT,
+            updated_at TEXT NOT NULL
+        )
+    ''')
+
+
+def record_listed(conn: sqlite3.Connection, seasons: Dict[str, str]) -> List[str]:
+    """
+    紀錄歷史期別選單 {期別: 顯示文字}，回傳第一次出現的期別 (狀態為 listed)；已存在的期別維持原狀態。
+    """
+    ensure_season_ledger(conn)
+    known = {row[0] for row in conn.execute(f'SELECT season FROM "{SEASON_LEDGER_TABLE}"')}
+    new_seasons = [season for season in seasons if season not in known]
+    now = _now()
+    conn.executemany(
+        f'INSERT INTO "{SEASON_LEDGER_TABLE}" (season, label, state, listed_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+        [(season, seasons[season], STATE_LISTED, now, now) for season in new_seasons],
+    )
+    conn.commit()
+    return new_seasons
+
+
+def advance_season(
+    conn: sqlite3.Connection,
+    season: str,
+    state: str,
+    zip_sha256: Optional[str] = None,
+    zip_bytes: Optional[int] = None,
+):
+    """
+    把期別推進到 state 並記錄時間；下載時一併記錄壓縮檔的 sha256 與大小。
+    回到 listed (例如壓縮檔遺失) 時清除後續階段的時間。
+    """
+    if state not in SEASON_STATES:
+        raise ValueError(f"未知的期別狀態：{state}")
+    ensure_season_ledger(conn)
+    now = _now()
+    if state == STATE_LISTED:
+        conn.execute(
+            f'UPDATE "{SEASON_LEDGER_TABLE}" SET state = ?, downloaded_at = NULL, extracted_at = NULL, '
+            f'imported_at = NULL, updated_at = ? WHERE season = ?',
+            (state, now, season),
+        )
+    else:
+        conn.execute(
+            f'UPDATE "{SEASON_LEDGER_TABLE}" SET state = ?, "{state}_at" = ?, updated_at = ?, '
+            f'zip_sha256 = COALESCE(?, zip_sha256), zip_bytes = COALESCE(?, zip_bytes) WHERE season = ?',
+            (state, now, now, zip_sha256, zip_bytes, season),
+        )
+    conn.commit()
+
+
+def mark_seasons_imported(conn: sqlite3.Connection, seasons: Iterable[str]):
+    """
+    匯入完成的期別標記為 imported；不在 ledger 中的資料夾 (如 latest_notice) 不受影響。
+    """
+    for season in seasons:
+        advance_season(conn, season, STATE_IMPORTED)
+
+
+def get_season_states(conn: sqlite3.Connection) -> Dict[str, Dict]:
+    ensure_season_ledger(conn)
+    cursor = conn.execute(f'SELECT * FROM "{SEASON_LEDGER_TABLE}" ORDER BY season')
+    columns = [col[0] for col in cursor.description]
+    return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+
+def pending_seasons(conn: sqlite3.Connection) -> Dict[str, str]:
+    """
+    尚未匯入完成的期別 {期別: 目前狀態}。
+    """
+    ensure_season_ledger(conn)
+    return dict(conn.execute(
+        f'SELECT season, state FROM "{SEASON_LEDGER_TABLE}" WHERE state != ? ORDER BY season', (STATE_IMPORTED,)
+    ).fetchall())
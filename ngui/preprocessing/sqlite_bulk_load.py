@@ -0,0 +1,127 @@
+import os
+import sqlite3
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from utils.logger import log_info
+
+# 匯入期間使用的 PRAGMA：WAL 日誌、放寬同步 (WAL + NORMAL 當機時不會損毀資料庫，只可能遺失最後一筆交易)、
+# 加大 page cache (負值單位為 KiB，約 256MB)、暫存表放在記憶體
+BULK_LOAD_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -262144,
+    "temp_store": "MEMORY",
+}
+
+INSERT_BATCH_SIZE = 10000
+
+# 本次匯入筆數達到資料表現有筆數的這個比例時才延後建立索引；增量匯入 (例如新的一季) 保留索引直接寫入，
+# 避免每次更新都要重建整張表的索引，匯入期間儀表板查詢也不會失去索引
+INDEX_DEFER_RATIO = float(os.getenv("INDEX_DEFER_RATIO", "0.25"))
+
+
+def _read_pragma(conn: sqlite3.Connection, name: str):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def existing_rows(conn: sqlite3.Connection, table: str) -> int:
+    """
+    資料表目前的筆數估計 (MAX(rowid)，不掃描整張表)；資料表不存在時為 0。
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is None:
+        return 0
+    return conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+
+
+def should_defer_indexes(conn: sqlite3.Connection, table: str, expected_rows: Callable[[str], int]) -> bool:
+    """
+    新的 (或空的) 資料表，或本次匯入量相對現有資料夠大時才延後建立索引。
+    expected_rows 只在資料表已有資料時才呼叫 (估計匯入筆數需要讀檔)。
+    """
+    existing = existing_rows(conn, table)
+    if existing == 0:
+        return True
+    incoming = expected_rows(table)
+    if incoming >= existing * INDEX_DEFER_RATIO:
+        return True
+    log_info(f"☑️[大量匯入] {table} 現有約 {existing} 筆、本次約 {incoming} 筆，保留索引直接寫入")
+    return False
+
+
+def drop_secondary_indexes(conn: sqlite3.Connection, tables: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    刪除指定資料表上的次要索引 (不含主鍵等自動索引)，回傳原本的 CREATE INDEX 語法供之後重建。
+    """
+    rows = conn.execute(
+        "SELECT name, tbl_name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+    ).fetchall()
+    table_set = set(tables) if tables is not None else None
+
+    dropped = []
+    for name, table, sql in rows:
+        if table_set is not None and table not in table_set:
+            continue
+        conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+        dropped.append(sql)
+    conn.commit()
+    return dropped
+
+
+def recreate_indexes(conn: sqlite3.Connection, index_sqls: Iterable[str]):
+    for sql in index_sqls:
+        conn.execute(sql)
+    conn.commit()
+
+
+@contextmanager
+def deferred_indexes(
+    conn: sqlite3.Connection,
+    tables: Optional[Iterable[str]] = None,
+    expected_rows: Optional[Callable[[str], int]] = None,
+) -> Iterator[List[str]]:
+    """
+    刪除 tables 上的次要索引，離開時 (含發生例外) 再一次重建。
+
+    :param expected_rows: 傳入時依 should_defer_indexes 只延後匯入量夠大的資料表，其餘保留索引
+    """
+    if tables is not None and expected_rows is not None:
+        tables = [table for table in tables if should_defer_indexes(conn, table, expected_rows)]
+    dropped_indexes = drop_secondary_indexes(conn, tables)
+    try:
+        yield dropped_indexes
+    finally:
+        conn.commit()
+        if dropped_indexes:
+            recreate_indexes(conn, dropped_indexes)
+            log_info(f"☑️[大量匯入] 已重建 {len(dropped_indexes)} 個索引")
+
+
+@contextmanager
+def bulk_load_session(
+    conn: sqlite3.Connection,
+    tables: Optional[Iterable[str]] = None,
+    defer_indexes: bool = True,
+    expected_rows: Optional[Callable[[str], int]] = None,
+) -> Iterator[sqlite3.Connection]:
+    """
+    大量匯入模式：
+    - 套用 BULK_LOAD_PRAGMAS (WAL、放寬同步、大 page cache)
+    - defer_indexes 時先刪除 tables 上的次要索引，匯入完成後再一次重建；
+      傳入 expected_rows (資料表 -> 預計匯入筆數) 時，只延後新資料表或匯入量夠大的資料表 (見 should_defer_indexes)
+    - 結束時 (含發生例外) 重建索引、checkpoint WAL 並把 PRAGMA 還原為匯入前的值
+    每個檔案的交易仍由呼叫端自行 commit / rollback。
+    """
+    conn.commit()
+    saved = {name: _read_pragma(conn, name) for name in BULK_LOAD_PRAGMAS}
+    for name, value in BULK_LOAD_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+    try:
+        with deferred_indexes(conn, tables, expected_rows) if defer_indexes else nullcontext():
+            yield conn
+    finally:
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        for name, value in saved.items():
+            conn.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,191 @@
+import os
+import sqlite3
+from typing import Dict, List
+
+from config.paths import DB_PATH
+from utils.logger import log_info
+
+# 選用的單一事實表結構：設定 UNIFIED_SCHEMA=1 時，匯入後會把各縣市資料表同步到 transactions，
+# 文字維度 (縣市、鄉鎮市區、建物型態…) 以整數代碼存放在小型 dim_* 表
+UNIFIED_SCHEMA_ENABLED = os.getenv("UNIFIED_SCHEMA", "0") == "1"
+
+FACT_TABLE = "transactions"
+UNIFIED_VIEW = "transactions_view"
+CITY_DIMENSION = "dim_city"
+
+# 事實表欄位 -> (維度表, 各縣市資料表中的原始欄位)
+DIMENSIONS = {
+    "district_id": ("dim_district", "鄉鎮市區"),
+    "trade_object_id": ("dim_trade_object", "交易標的"),
+    "building_type_id": ("dim_building_type", "建物型態"),
+    "main_use_id": ("dim_main_use", "主要用途"),
+    "category_id": ("dim_category", "分類"),
+    "house_status_id": ("dim_house_status", "屋況"),
+}
+
+# 直接沿用的欄位 -> 事實表中的型別
+MEASURES = {
+    "交易年月日": "TEXT",
+    "建築完成年月": "TEXT",
+    "建物移轉總面積平方公尺": "REAL",
+    "總價元": "REAL",
+    "車位移轉總面積平方公尺": "REAL",
+    "車位總價元": "REAL",
+    "建物坪數": "REAL",
+    "建物總價萬元": "REAL",
+    "建物每坪單價萬元": "REAL",
+    "車位坪數": "REAL",
+    "車位總價萬元": "REAL",
+    "房齡": "REAL",
+}
+
+# 原本存成文字的年/月/日改存整數
+INTEGER_PARTS = ("交易年", "交易月", "交易日")
+
+# 有/無 旗標改存 1/0
+FLAGS = ("停車位", "電梯")
+
+# 與各縣市資料表相同欄位順序的檢視表欄位
+VIEW_COLUMNS = [
+    "縣市", "鄉鎮市區", "交易標的", "交易年月日", "建物型態", "主要用途", "建築完成年月",
+    "建物移轉總面積平方公尺", "總價元", "車位移轉總面積平方公尺", "車位總價元", "建物坪數",
+    "建物總價萬元", "建物每坪單價萬元", "車位坪數", "車位總價萬元", "分類", "停車位", "電梯",
+    "交易年", "交易月", "交易日", "房齡", "屋況",
+]
+
+# 多縣市查詢以 city_id IN (...) 多點探查索引，對應各縣市資料表上的 CITY_TABLE_INDEXES
+FACT_INDEXES = {
+    "idx_transactions_city_year_category_status": ("city_id", "交易年", "category_id", "house_status_id"),
+    "idx_transactions_city_year_trade_object_status": ("city_id", "交易年", "trade_object_id", "house_status_id"),
+}
+
+
+def _dimension_tables() -> List[str]:
+    return [CITY_DIMENSION] + [table for table, _ in DIMENSIONS.values()]
+
+
+def ensure_unified_schema(conn: sqlite3.Connection):
+    for table in _dimension_tables():
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)')
+
+    columns = ["id INTEGER PRIMARY KEY", "city_id INTEGER NOT NULL", "source_id INTEGER NOT NULL"]
+    columns += [f"{column} INTEGER" for column in DIMENSIONS]
+    columns += [f'"{column}" {sql_type}' for column, sql_type in MEASURES.items()]
+    columns += [f'"{column}" INTEGER' for column in INTEGER_PARTS + FLAGS]
+    columns.append("UNIQUE (city_id, source_id)")
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{FACT_TABLE}" ({", ".join(columns)})')
+
+    for name, index_columns in FACT_INDEXES.items():
+        quoted = ", ".join(f'"{col}"' for col in index_columns)
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{FACT_TABLE}" ({quoted})')
+
+    selects = {"縣市": "city.name"}
+    joins = [f'JOIN "{CITY_DIMENSION}" city ON city.id = t.city_id']
+    for fact_column, (table, source_column) in DIMENSIONS.items():
+        alias = table.replace("dim_", "")
+        selects[source_column] = f"{alias}.name"
+        joins.append(f'LEFT JOIN "{table}" {alias} ON {alias}.id = t.{fact_column}')
+    for column in FLAGS:
+        selects[column] = f"CASE t.\"{column}\" WHEN 1 THEN '有' WHEN 0 THEN '無' END"
+
+    for column in VIEW_COLUMNS:
+        selects.setdefault(column, f't."{column}"')
+    view_columns = ", ".join(f'{selects[column]} AS "{column}"' for column in VIEW_COLUMNS)
+    conn.execute(
+        f'CREATE VIEW IF NOT EXISTS "{UNIFIED_VIEW}" AS '
+        f'SELECT t.id AS id, {view_columns} FROM "{FACT_TABLE}" t {" ".join(joins)}'
+    )
+
+
+def _city_id(conn: sqlite3.Connection, city: str) -> int:
+    conn.execute(f'INSERT OR IGNORE INTO "{CITY_DIMENSION}" (name) VALUES (?)', (city,))
+    return conn.execute(f'SELECT id FROM "{CITY_DIMENSION}" WHERE name = ?', (city,)).fetchone()[0]
+
+
+def sync_city(conn: sqlite3.Connection, city: str) -> Dict[str, int]:
+    """
+    把單一縣市資料表同步到事實表 (需在呼叫端的交易中執行)：
+    - 刪除來源已不存在的資料列 (例如 ledger 重新匯入時被替換的舊檔案)
+    - 新增 id 大於上次同步位置的資料列，並補齊新出現的維度值
+    """
+    city_id = _city_id(conn, city)
+    deleted = conn.execute(
+        f'DELETE FROM "{FACT_TABLE}" WHERE city_id = ? '
+        f'AND NOT EXISTS (SELECT 1 FROM "{city}" c WHERE c.id = "{FACT_TABLE}".source_id)',
+        (city_id,),
+    ).rowcount
+
+    last_source_id = conn.execute(
+        f'SELECT COALESCE(MAX(source_id), 0) FROM "{FACT_TABLE}" WHERE city_id = ?', (city_id,)
+    ).fetchone()[0]
+
+    for table, source_column in DIMENSIONS.values():
+        conn.execute(
+            f'INSERT OR IGNORE INTO "{table}" (name) '
+            f'SELECT DISTINCT "{source_column}" FROM "{city}" '
+            f'WHERE id > ? AND "{source_column}" IS NOT NULL',
+            (last_source_id,),
+        )
+
+    insert_columns = ["city_id", "source_id"] + list(DIMENSIONS) + list(MEASURES) + list(INTEGER_PARTS + FLAGS)
+    select_values = ["?", "c.id"]
+    joins = []
+    for fact_column, (table, source_column) in DIMENSIONS.items():
+        alias = table.replace("dim_", "")
+        select_values.append(f"{alias}.id")
+        joins.append(f'LEFT JOIN "{table}" {alias} ON {alias}.name = c."{source_column}"')
+    select_values += [f'c."{column}"' for column in MEASURES]
+    select_values += [f"CAST(NULLIF(c.\"{column}\", '') AS INTEGER)" for column in INTEGER_PARTS]
+    select_values += [f"CASE c.\"{column}\" WHEN '有' THEN 1 WHEN '無' THEN 0 END" for column in FLAGS]
+
+    quoted_columns = ", ".join(f'"{col}"' for col in insert_columns)
+    inserted = conn.execute(
+        f'INSERT INTO "{FACT_TABLE}" ({quoted_columns}) '
+        f'SELECT {", ".join(select_values)} FROM "{city}" c {" ".join(joins)} '
+        f'WHERE c.id > ? ORDER BY c.id',
+        (city_id, last_source_id),
+    ).rowcount
+
+    return {"inserted": inserted, "deleted": deleted}
+
+
+def sync_unified_schema(conn: sqlite3.Connection, cities: List[str]) -> Dict[str, int]:
+    """
+    由各縣市資料表遷移 / 增量同步到單一事實表，每個縣市各自一筆交易；重複執行只會處理新增或被替換的資料。
+    """
+    ensure_unified_schema(conn)
+    conn.commit()
+
+    totals = {"inserted": 0, "deleted": 0}
+    for city in cities:
+        try:
+            result = sync_city(conn, city)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        totals["inserted"] += result["inserted"]
+        totals["deleted"] += result["deleted"]
+
+    log_info(f"☑️[單一事實表] 同步 {len(cities)} 個縣市：新增 {totals['inserted']} 筆，刪除 {totals['deleted']} 筆")
+    return totals
+
+
+def migrate(db_path: str = DB_PATH) -> Dict[str, int]:
+    """
+    把既有的各縣市資料表遷移到單一事實表。
+    """
+    from ngui.preprocessing.process_real_estate_and_import import list_city_tables
+
+    conn = sqlite3.connect(db_path)
+    try:
+        totals = sync_unified_schema(conn, list_city_tables(conn))
+        conn.execute(f'ANALYZE "{FACT_TABLE}"')
+        conn.commit()
+        return totals
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    print(migrate())
@@ -0,0 +1,97 @@
+import os
+import shutil
+import zipfile
+import zlib
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from ngui.preprocessing.real_estate_cleaner import is_relevant_csv
+
+# 設定 ZIP_INGEST=1 時，下載的期別壓縮檔不再解壓縮到磁碟，匯入時直接從 zip 串流讀取需要的 CSV
+ZIP_INGEST_ENABLED = os.getenv("ZIP_INGEST", "0") == "1"
+
+# zip 內的 CSV 以「壓縮檔路徑/成員名稱」表示 (如 raw/113S1.zip/a_lvr_land_a.csv)，
+# 與一般檔案路徑一樣可用 os.path.basename 取得檔名
+ZIP_SUFFIX = ".zip"
+
+
+def zip_member_path(zip_path: str, member: str) -> str:
+    return f"{zip_path}/{member}"
+
+
+def split_zip_member(path: str) -> Optional[Tuple[str, str]]:
+    """
+    拆出 (壓縮檔路徑, 成員名稱)；一般檔案路徑回傳 None。
+    """
+    for separator in ("/", "\\"):
+        index = path.lower().rfind(ZIP_SUFFIX + separator)
+        if index >= 0:
+            split_at = index + len(ZIP_SUFFIX)
+            return path[:split_at], path[split_at + 1:]
+    return None
+
+
+@contextmanager
+def open_csv_source(path: str) -> Iterator[BinaryIO]:
+    """
+    以二進位模式開啟 CSV：一般檔案直接開啟，zip 成員則邊解壓邊讀，不寫入磁碟。
+    """
+    member = split_zip_member(path)
+    if member is None:
+        with open(path, "rb") as f:
+            yield f
+        return
+
+    zip_path, name = member
+    with zipfile.ZipFile(zip_path) as archive, archive.open(name) as f:
+        yield f
+
+
+def _relevant_infos(archive: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    # 與 remove_irrelevant_csv_files 相同的判斷規則 (is_relevant_csv)
+    return [
+        info for info in archive.infolist()
+        if not info.is_dir() and info.filename.lower().endswith(".csv") and is_relevant_csv(info.filename)
+    ]
+
+
+def list_relevant_members(zip_path: str) -> List[str]:
+    """
+    列出壓縮檔中需要匯入的 *_lvr_land_[ab].csv 成員 (不需要的 build/land/park/c 檔案不會被讀取)。
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        return [zip_member_path(zip_path, info.filename) for info in _relevant_infos(archive)]
+
+
+def extract_relevant_members(zip_path: str, dest_dir: str) -> List[str]:
+    """
+    只解壓縮需要匯入的成員到 dest_dir，回傳解壓縮後的檔案路徑。
+
+    成員讀取到結尾時 zipfile 會比對 CRC-32，先解壓縮到暫存資料夾，全部通過後才移入 dest_dir；
+    壓縮檔不完整或 CRC 不符時拋出 zipfile.BadZipFile，dest_dir 不會留下損毀的檔案。
+    不需要的成員不會被解壓縮，也就不會讀取這些位元組。
+    """
+    tmp_dir = dest_dir + ".extracting"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            members = [info.filename for info in _relevant_infos(archive)]
+            for name in members:
+                archive.extract(name, tmp_dir)
+    except (zipfile.BadZipFile, zlib.error, EOFError) as e:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise zipfile.BadZipFile(f"壓縮檔損毀：{zip_path} ({e})") from e
+
+    os.makedirs(dest_dir, exist_ok=True)
+    paths = []
+    for name in members:
+        path = os.path.join(dest_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(os.path.join(tmp_dir, name), path)
+        paths.append(path)
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return paths
+
+
+def is_zip_member(path: str) -> bool:
+    return split_zip_member(path) is not None
@@ -1,46 +1,108 @@
 import os
 import json
 import shutil
+import sqlite3
 import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
 from datetime import datetime
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from api.routes.real_estate import fetch_options_route, fetch_latest_notice_route, download_zip_route
+from service.ingest_pipeline import INGEST_PIPELINE_ENABLED, run_ingest_pipeline
+from service.season_downloader import DOWNLOAD_CONCURRENCY, DOWNLOAD_RETRY_LIMIT, download_seasons
 from ngui.preprocessing.real_estate_cleaner import *
-from utils.fetch_manager import check_data
+from ngui.preprocessing.season_ledger import (
+    STATE_DOWNLOADED, STATE_EXTRACTED, STATE_IMPORTED, STATE_LISTED, advance_season, get_season_states,
+    pending_seasons, record_listed,
+)
+from ngui.preprocessing.zip_ingest import ZIP_INGEST_ENABLED, extract_relevant_members
+from utils.download_validators import load_validators, save_validators
+from utils.fetch_manager import check_data, write_current_hash
 from utils.logger import log_info, log_warning
-from config.paths import RAW_DATA_DIR  # <-- 引入統一路徑設定
+from utils.open_data_page import open_data_session
+from config.open_data import LATEST_NOTICE_ZIP_URL
+from config.paths import DB_PATH, RAW_DATA_DIR  # <-- 引入統一路徑設定
 
 
-def file_unzip(base_path: str, file_name: str):
+# 解壓縮的執行緒數：zlib 解壓縮時會釋放 GIL，多期別可同時解壓縮
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def file_unzip(base_path: str, file_name: str) -> Dict:
+    """
+    解壓縮 base_path/<file_name>.zip 中需要分析的 CSV 到 base_path/<file_name>/，解壓縮時一併檢查 CRC。
+
+    :return: {"name", "success", "corrupt", "files", "bytes", "seconds", "error"}；
+             corrupt 為 True 表示壓縮檔不完整或 CRC 不符，已刪除等待重新下載
+    """
     extract_dir_path = os.path.join(base_path, file_name)
     zip_path_name = os.path.join(base_path, f"{file_name}.zip")
+    result = {"name": file_name, "success": False, "corrupt": False, "files": 0, "bytes": 0,
+              "seconds": 0.0, "error": None}
 
     if not os.path.exists(zip_path_name):
-        msg = f"❌[解壓縮失敗] 該系統路徑下找不到壓縮檔: {zip_path_name}"
+        result["error"] = f"該系統路徑下找不到壓縮檔: {zip_path_name}"
+        msg = f"❌[解壓縮失敗] {result['error']}"
         print(msg)
         log_info(msg)
-        return
-    
-    # 建立目標資料夾
-    os.makedirs(extract_dir_path, exist_ok=True)
+        return result
+
+    started = time.perf_counter()
+    try:
+        paths = extract_relevant_members(zip_path_name, extract_dir_path)
+    except zipfile.BadZipFile as e:
+        # 不完整的下載不留到匯入時才以 pandas 解析錯誤的形式出現：直接刪除，下次更新重新下載
+        os.remove(zip_path_name)
+        result.update(corrupt=True, error=str(e), seconds=round(time.perf_counter() - started, 3))
+        msg = f"❌[解壓縮失敗] {e}，已刪除壓縮檔等待重新下載"
+        print(msg)
+        log_warning(msg)
+        return result
+
+    result.update(success=True, files=len(paths), bytes=sum(os.path.getsize(path) for path in paths),
+                  seconds=round(time.perf_counter() - started, 3))
+    msg = (f"✅[解壓縮完成] {len(paths)} 個需要分析的檔案已存入 {extract_dir_path} 資料夾底下，"
+           f"耗時 {result['seconds']:.2f} 秒")
+    print(msg)
+    log_info(msg)
+    return result
 
-    # 解壓縮所有檔案至資料夾中
-    with zipfile.ZipFile(zip_path_name, 'r') as zip_ref:
-        zip_ref.extractall(extract_dir_path)
 
-    msg = f"✅[解壓縮完成] 所有檔案已存入 {extract_dir_path} 資料夾底下"
+def extract_zips(base_path: str, names: List[str], workers: int = EXTRACT_WORKERS) -> Dict[str, Dict]:
+    """
+    以執行緒池同時解壓縮多個壓縮檔，回傳 {名稱: file_unzip 的結果}，並輸出各期別耗時。
+    """
+    if not names:
+        return {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(names))), thread_name_prefix="unzip") as pool:
+        results = dict(zip(names, pool.map(lambda name: file_unzip(base_path, name), names)))
+
+    corrupt = [name for name, result in results.items() if result["corrupt"]]
+    per_season = "、".join(f"{name} {result['seconds']:.2f}" for name, result in results.items() if result["success"])
+    msg = (f"📊[解壓縮統計] {len(names)} 個壓縮檔、workers={workers}，總耗時 {time.perf_counter() - started:.2f} 秒"
+           f" ({per_season or '無'})")
+    if corrupt:
+        msg += f"，損毀 {len(corrupt)} 個：{'、'.join(corrupt)}"
     print(msg)
     log_info(msg)
+    return results
 
 
-def unzip_all_season_zips(base_path):
+def unzip_all_season_zips(base_path, seasons: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """
+    解壓縮歷史期別壓縮檔；seasons 為 None 時處理 fetch_options_route.json 中的所有期別。
+    """
+    if seasons is not None:
+        return extract_zips(base_path, seasons)
+
     json_path = os.path.join(RAW_DATA_DIR, "fetch_options_route.json")
 
     if not os.path.exists(json_path):
         print(f"❌ 找不到設定檔: {json_path}")
-        return
+        return {}
 
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
@@ -48,10 +110,9 @@ def unzip_all_season_zips(base_path):
     history_seasons = data.get("historySeason_id", {})
     if not history_seasons:
         print("❌ 找不到 historySeason_id 資料")
-        return
+        return {}
 
-    for season in history_seasons.keys():
-        file_unzip(base_path, season)
+    return extract_zips(base_path, list(history_seasons.keys()))
     
     
 def delete_path_recursive(base_path: str, name: str) -> Tuple[bool, str]:
@@ -157,14 +218,34 @@ def move_all_season_folders(dest_dir: str):
         print(message)
 
 
-def batch_download_zip_from_json(
+def _season_artifact_exists(season: str, state: str) -> bool:
+    """
+    期別在目前狀態應有的檔案是否還在：downloaded 需要壓縮檔，extracted 需要解壓縮後的資料夾。
+    """
+    if state == STATE_DOWNLOADED:
+        return os.path.exists(download_zip_route.season_zip_path(season))
+    if state == STATE_EXTRACTED:
+        folder_path = os.path.join(RAW_DATA_DIR, season)
+        return os.path.isdir(folder_path) and bool(os.listdir(folder_path))
+    return False
+
+
+async def batch_download_zip_from_json(
     json_path: str,
-    retry_limit: int = 1,
-    sleep_interval: float = 1.0
-) -> None:
+    retry_limit: int = DOWNLOAD_RETRY_LIMIT,
+    concurrency: int = DOWNLOAD_CONCURRENCY,
+) -> List[str]:
+    """
+    依期別 ledger (season_ledger) 處理歷史期別：選單中的期別先記為 listed，
+    下載尚未匯入、且目前階段的檔案已不存在的期別；已下載 / 已解壓縮的期別從中斷處繼續。
+    已匯入的期別以條件式請求檢查是否被修訂：伺服器回 304，或下載內容的大小與 sha256 與 ledger 紀錄相同時略過，
+    內容不同時退回 listed 後重新記為 downloaded，由後續的解壓縮與匯入更新資料。
+
+    :return: 尚未匯入 (含內容已變更)、需要後續解壓縮或匯入的期別
+    """
     if not os.path.exists(json_path):
         print(f"❌檔案不存在：{json_path}")
-        return
+        return []
 
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
@@ -172,101 +253,226 @@ def batch_download_zip_from_json(
     season_dict = data.get("historySeason_id")
     if not season_dict:
         print("❌找不到 historySeason_id 欄位")
-        return
+        return []
 
-    failed_keys: List[str] = []
-
-    for season in season_dict:
-        attempt = 0
-        success = False
-        while attempt <= retry_limit:
-            print(f"⏳ 嘗試下載 {season}（第 {attempt+1} 次）...")
-            success, msg, _ = download_zip_route.download_season_zip(season)
-            if success:
-                print(f"✅成功下載：{season}")
-                break
-            else:
-                print(f"⚠️下載失敗：{msg}")
-                attempt += 1
-                time.sleep(sleep_interval)
-        if not success:
-            failed_keys.append(season)
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        new_seasons = record_listed(conn, season_dict)
+        pending = pending_seasons(conn)
+        states = get_season_states(conn)
+        to_download = [season for season, state in pending.items() if not _season_artifact_exists(season, state)]
+        to_check = [season for season in season_dict if states[season]["state"] == STATE_IMPORTED]
+        msg = (f"☑️[歷史資料] 選單共 {len(season_dict)} 期 (新增 {len(new_seasons)} 期)，"
+               f"未完成 {len(pending)} 期，需下載 {len(to_download)} 期，檢查已匯入 {len(to_check)} 期")
+        print(msg)
+        log_info(msg)
+        if not to_download and not to_check:
+            return list(pending)
+
+        # 尚未匯入的期別一定要取得壓縮檔，不使用條件式請求 (下載後重新記錄驗證資訊)；
+        # 已匯入的期別保留驗證資訊，內容未變更時伺服器回 304
+        validators = load_validators()
+        for season in to_download:
+            validators.pop(download_zip_route.season_zip_url(season), None)
+        report = await download_seasons(to_download + to_check, concurrency=concurrency, retry_limit=retry_limit,
+                                        validators=validators)
+        save_validators(validators)
+
+        revised = []
+        for result in report["results"]:
+            season = result["season"]
+            if not result["success"] or (season in to_check and not result["changed"]):
+                continue
+            entry = validators.get(download_zip_route.season_zip_url(season), {})
+            if season in to_check:
+                if (entry.get("sha256"), entry.get("content_length")) == \
+                        (states[season]["zip_sha256"], states[season]["zip_bytes"]):
+                    # 驗證資訊遺失時會重新下載，內容與 ledger 紀錄相同則不需重新匯入
+                    os.remove(download_zip_route.season_zip_path(season))
+                    continue
+                advance_season(conn, season, STATE_LISTED)
+                revised.append(season)
+            advance_season(conn, season, STATE_DOWNLOADED, entry.get("sha256"), entry.get("content_length"))
+    finally:
+        conn.close()
+
+    if revised:
+        msg = f"☑️[歷史資料] 已匯入的期別內容有修訂，重新匯入：{', '.join(revised)}"
+        print(msg)
+        log_info(msg)
 
+    failed_keys: List[str] = list(report["failed"])
     if failed_keys:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         fail_path = os.path.join(RAW_DATA_DIR, f"download_failed_{timestamp}.json")
         with open(fail_path, "w", encoding="utf-8") as f:
-            json.dump({"failed": failed_keys}, f, ensure_ascii=False, indent=2)
+            json.dump({"failed": failed_keys, "errors": report["failed"]}, f, ensure_ascii=False, indent=2)
         print(f"❗ 失敗紀錄已儲存：{fail_path}")
     else:
         print("🎉 所有壓縮檔皆成功下載")
 
+    return [season for season in pending if season not in report["failed"]] + revised
+
+
+async def ingest_history_seasons(json_path: str) -> Optional[Dict]:
+    """
+    以管線 (service/ingest_pipeline) 處理選單中的所有期別：下載、解壓縮、清洗、匯入同時進行，
+    已匯入的期別以條件式請求檢查是否被修訂。
+
+    :return: run_ingest_pipeline 的統計；選單檔案不存在或沒有期別時回傳 None
+    """
+    if not os.path.exists(json_path):
+        print(f"❌檔案不存在：{json_path}")
+        return None
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        season_dict = json.load(f).get("historySeason_id")
+    if not season_dict:
+        print("❌找不到 historySeason_id 欄位")
+        return None
+    return await run_ingest_pipeline(list(season_dict))
 
-async def fetch_data() -> Tuple[bool, bool]:
+
+def extract_downloaded_seasons(seasons: List[str]):
+    """
+    平行解壓縮狀態為 downloaded 的期別，成功後推進為 extracted (已解壓縮的期別略過)；
+    壓縮檔損毀的期別退回 listed，下次更新重新下載。
+    """
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        states = pending_seasons(conn)
+        results = extract_zips(RAW_DATA_DIR, [season for season in seasons if states.get(season) == STATE_DOWNLOADED])
+        for season, result in results.items():
+            if result["corrupt"]:
+                advance_season(conn, season, STATE_LISTED)
+            elif result["success"] and _season_artifact_exists(season, STATE_EXTRACTED):
+                advance_season(conn, season, STATE_EXTRACTED)
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], step: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[step] = round(time.perf_counter() - started, 3)
+
+
+async def fetch_data(timings: Optional[Dict[str, float]] = None) -> Tuple[bool, bool]:
     """
     抓取最新資料內容字串
+    :param timings: 傳入 dict 時填入各步驟耗時 (秒)，供 benchmark 使用
     :return: Tuple[成功, 需要資料庫處理]
     """
+    timings = {} if timings is None else timings
+    try:
+        # 本期公告與歷史期別選單共用同一次頁面載入 (靜態 HTML 或 Playwright 分頁)，結束時關閉瀏覽器
+        async with open_data_session():
+            return await _fetch_data(timings)
+    finally:
+        if timings:
+            msg = "📊[更新統計] " + "、".join(f"{step} {seconds:.2f} 秒" for step, seconds in timings.items())
+            print(msg)
+            log_info(msg)
+
+
+async def _fetch_data(timings: Dict[str, float]) -> Tuple[bool, bool]:
     # 抓取最新資料內容字串
-    news = await fetch_latest_notice_route.info_json()
+    with _timed(timings, "本期公告"):
+        news = await fetch_latest_notice_route.info_json()
     if not news['success']:
         msg = f"❌[失敗][本期下載-資料內容字串] 暫停此次更新。錯誤原因: {news['error']}"
         print(msg)
         log_warning(msg)
         return False, False
 
-    # 檢查是否有需要更新
-    need_to_fetch_latest_data, need_to_get_history_data, message = check_data(news['content'])
-    if not need_to_fetch_latest_data:
+    # 檢查是否有需要更新；公告未變更但有期別尚未匯入完成 (上次中斷) 時，從中斷的階段繼續
+    need_to_fetch_latest_data, _, message = check_data(news['content'])
+    with closing(sqlite3.connect(DB_PATH)) as conn:
+        unfinished = pending_seasons(conn)
+    if not need_to_fetch_latest_data and not unfinished:
         msg = f"✅[本期下載-資料內容字串] {message}"
         print(msg)
         log_info(msg)
         return True, False
-    
-    msg = f"☑️[本期下載-資料內容字串][正在進行處理] {message}"
-    print(msg)
-    log_info(msg)
 
-    # 抓取最新資料 zip
-    msg = "☑️[抓取最新資料內容字串] 開始下載最新資料壓縮檔..."
-    print(msg)
-    log_info(msg)
-    resp = fetch_latest_notice_route.latest_notice_zip()
-    if not resp['success']:
-        msg = f"❌[下載失敗][本期下載 zip] 錯誤原因: {resp['error']}"
+    latest_changed = False
+    history_json = os.path.join(RAW_DATA_DIR, 'fetch_options_route.json')
+    if need_to_fetch_latest_data:
+        msg = f"☑️[本期下載-資料內容字串][正在進行處理] {message}"
         print(msg)
-        log_warning(msg)
-        return False, False
-    
-    # 解壓縮新資料
-    file_unzip(RAW_DATA_DIR, 'latest_notice')
+        log_info(msg)
 
-    # 抓取歷史資料發布日期 option 字串
-    if need_to_get_history_data:
-        opts = await fetch_options_route.get_history_data_and_save()
+        # 抓取最新資料 zip
+        msg = "☑️[抓取最新資料內容字串] 開始下載最新資料壓縮檔..."
+        print(msg)
+        log_info(msg)
+        with _timed(timings, "本期下載"):
+            resp = fetch_latest_notice_route.latest_notice_zip()
+        if not resp['success']:
+            msg = f"❌[下載失敗][本期下載 zip] 錯誤原因: {resp['error']}"
+            print(msg)
+            log_warning(msg)
+            return False, False
+
+        # 壓縮檔內容未變更 (304 或大小、sha256 相同) 時不需解壓縮、匯入
+        latest_changed = resp['updated']
+
+        # 解壓縮新資料 (ZIP_INGEST 模式保留壓縮檔，匯入時直接從 zip 讀取)
+        if latest_changed and not ZIP_INGEST_ENABLED:
+            with _timed(timings, "本期解壓縮"):
+                unzipped = file_unzip(RAW_DATA_DIR, 'latest_notice')
+            if unzipped["corrupt"]:
+                # 清除公告 hash 與驗證資訊，下次更新時重新下載本期壓縮檔
+                write_current_hash("")
+                validators = load_validators()
+                validators.pop(LATEST_NOTICE_ZIP_URL, None)
+                save_validators(validators)
+                latest_changed = False
+
+        # 公告更新時一併檢查歷史期別選單 (與公告同一頁面，不需額外請求)，新的一季只會新增一個 listed 期別
+        with _timed(timings, "歷史選單"):
+            opts = await fetch_options_route.get_history_data_and_save()
         if not opts['success']:
             msg = f"❌[更新歷史資料失敗] 暫停此次更新。錯誤原因: {opts['error']}"
             print(msg)
             log_warning(msg)
             return False, False
-        
-        need_to_update_history = opts['updated']
-        if not need_to_update_history:
-            msg = f"✅[無須更新歷史資料] 共取得 {len(opts['data'])} 筆"
-            print(msg)
-            log_info(msg)
-        else:
-            msg = "☑️[歷史資料] 開始下載..."
-            print(msg)
-            log_info(msg)
+    else:
+        msg = f"☑️[歷史資料] 公告未變更，繼續處理上次未完成的 {len(unfinished)} 期"
+        print(msg)
+        log_info(msg)
+
+    if INGEST_PIPELINE_ENABLED:
+        # 歷史期別在管線中直接匯入；寫入失敗留在 RAW_DATA_DIR 的檔案由後續的匯入步驟再處理一次
+        with _timed(timings, "歷史管線"):
+            report = await ingest_history_seasons(history_json)
+        history_changed = bool(report and report["files"])
+    else:
+        with _timed(timings, "歷史下載"):
+            history_pending = await batch_download_zip_from_json(history_json)
+        if history_pending and not ZIP_INGEST_ENABLED:
+            with _timed(timings, "歷史解壓縮"):
+                extract_downloaded_seasons(history_pending)
+        history_changed = bool(history_pending)
+
+    if not latest_changed and not history_changed:
+        msg = "✅[無須更新] 壓縮檔內容與上次下載相同，略過解壓縮與匯入"
+        print(msg)
+        log_info(msg)
+        return True, False
 
-            batch_download_zip_from_json(os.path.join(RAW_DATA_DIR, 'fetch_options_route.json'))
-            unzip_all_season_zips(RAW_DATA_DIR)
+    if ZIP_INGEST_ENABLED:
+        # 壓縮檔由匯入流程直接讀取，匯入後再移到 OLD_DATA_DIR
+        return True, True
 
-    # 把壓縮檔移除
-    delete_all_real_estate_raw_zip()
+    with _timed(timings, "清理"):
+        # 把壓縮檔移除
+        delete_all_real_estate_raw_zip()
 
-    # 移除最新、歷史資料中不需要分析的檔案
-    apply_function_to_real_estate_dirs(remove_irrelevant_csv_files)
+        # 移除最新、歷史資料中不需要分析的檔案
+        apply_function_to_real_estate_dirs(remove_irrelevant_csv_files)
 
     return True, True
@@ -0,0 +1,401 @@
+"""
+下載 → 解壓縮 → 清洗 → 匯入 的管線式匯入流程。
+
+各階段以有容量上限的佇列串接、各自有獨立的 worker 數，第 N 期在匯入時第 N+1 期可以同時解壓縮、
+第 N+2 期同時下載，整體耗時接近最慢的階段而不是各階段相加。佇列滿時上游會等待 (backpressure)，
+清洗完成但尚未寫入的資料最多只有 queue_size + 清洗 worker 數個檔案。
+
+排程更新 (service/fetch_service.fetch_data) 預設以此管線處理歷史期別 (INGEST_PIPELINE_ENABLED)，也可單獨執行：
+
+    python -m service.ingest_pipeline              # 下載並匯入 fetch_options_route.json 中的所有期別
+    python -m service.ingest_pipeline --no-download  # 只匯入 RAW_DATA_DIR 中已下載的期別壓縮檔
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from api.routes.real_estate.download_zip_route import season_zip_path, season_zip_url
+from config.paths import DB_PATH, OLD_DATA_DIR, RAW_DATA_DIR
+from ngui.preprocessing.import_ledger import calculate_file_hash
+from ngui.preprocessing.process_real_estate_and_import import (
+    IMPORT_WORKERS, STREAM_QUEUE_CHUNKS, _move_to_old, check_import_needed, clean_chunk_job,
+    completed_folders, count_csv_rows, finalize_import, get_city_name, iter_raw_chunks, write_file_transaction,
+)
+from ngui.preprocessing.season_ledger import (
+    STATE_DOWNLOADED, STATE_EXTRACTED, STATE_LISTED, advance_season, mark_seasons_imported, pending_seasons,
+    record_listed,
+)
+from ngui.preprocessing.sqlite_bulk_load import bulk_load_session, deferred_indexes
+from ngui.preprocessing.zip_ingest import ZIP_INGEST_ENABLED, extract_relevant_members, list_relevant_members
+from service.season_downloader import (
+    DOWNLOAD_CONCURRENCY, DOWNLOAD_RETRY_LIMIT, HTTP_TIMEOUT, SEASON_TIMEOUT, download_season,
+)
+from utils.download_validators import load_validators, save_validators
+from utils.logger import log_info, log_warning
+
+# 排程更新 (fetch_data) 以管線下載並匯入歷史期別；設為 0 時改用分階段的 下載全部 → 解壓縮全部 → 匯入全部
+INGEST_PIPELINE_ENABLED = os.getenv("INGEST_PIPELINE_ENABLED", "1") == "1"
+
+# 各階段的 worker 數與階段之間佇列的容量
+PIPELINE_DOWNLOAD_WORKERS = int(os.getenv("PIPELINE_DOWNLOAD_WORKERS", str(DOWNLOAD_CONCURRENCY)))
+PIPELINE_EXTRACT_WORKERS = int(os.getenv("PIPELINE_EXTRACT_WORKERS", "2"))
+PIPELINE_CLEAN_WORKERS = int(os.getenv("PIPELINE_CLEAN_WORKERS", str(max(IMPORT_WORKERS, 1))))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+
+STAGES = ("download", "extract", "clean", "import")
+STAGE_LABELS = {"download": "下載", "extract": "解壓縮", "clean": "清洗", "import": "匯入"}
+
+# 佇列結束標記：worker 取到後放回佇列讓同階段其他 worker 也能結束
+_DONE = object()
+
+
+def _new_metrics(workers: int) -> Dict:
+    # busy：實際處理的時間加總；blocked：等待下游佇列有空位的時間；wall：第一個工作開始到最後一個結束
+    return {"workers": workers, "items": 0, "failed": 0, "busy": 0.0, "blocked": 0.0,
+            "started": None, "finished": None}
+
+
+async def _run_stage(
+    name: str,
+    inbox: asyncio.Queue,
+    outbox: Optional[asyncio.Queue],
+    metrics: Dict,
+    handle: Callable[[object], Awaitable[List]],
+):
+    """
+    以 metrics["workers"] 個 worker 處理 inbox 的工作，handle 回傳的結果依序放入 outbox。
+    單一工作失敗只記錄錯誤，不影響其他工作。
+    """
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                await inbox.put(_DONE)
+                return
+
+            started = time.perf_counter()
+            if metrics["started"] is None:
+                metrics["started"] = started
+            try:
+                outputs = await handle(item)
+                metrics["items"] += 1
+            except Exception as e:
+                outputs = []
+                metrics["failed"] += 1
+                msg = f"❌[管線][{STAGE_LABELS[name]}] {_describe(item)} 失敗，錯誤：{e}"
+                log_warning(msg)
+                print(msg)
+            finished = time.perf_counter()
+            metrics["busy"] += finished - started
+
+            for output in outputs:
+                await outbox.put(output)
+            metrics["blocked"] += time.perf_counter() - finished
+            metrics["finished"] = time.perf_counter()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, metrics["workers"]))))
+    if outbox is not None:
+        await outbox.put(_DONE)
+
+
+def _describe(item) -> str:
+    if isinstance(item, str):
+        return item
+    folder, file_path = item[0], item[1]
+    return f"{folder}/{os.path.basename(file_path)}"
+
+
+def extract_season(season: str) -> List[str]:
+    """
+    取出期別壓縮檔中需要匯入的 CSV：ZIP_INGEST 模式只列出 zip 成員 (匯入時直接串流讀取)，
+    否則只解壓縮需要的成員到 RAW_DATA_DIR/<期別>/ 並刪除壓縮檔。
+    """
+    zip_path = season_zip_path(season)
+    os.makedirs(os.path.join(OLD_DATA_DIR, season), exist_ok=True)
+    if ZIP_INGEST_ENABLED:
+        return list_relevant_members(zip_path)
+
+    # 解壓縮時檢查 CRC；壓縮檔損毀時刪除，下次重新下載
+    try:
+        paths = extract_relevant_members(zip_path, os.path.join(RAW_DATA_DIR, season))
+    except zipfile.BadZipFile:
+        os.remove(zip_path)
+        raise
+    os.remove(zip_path)
+    return paths
+
+
+def _format_report(report: Dict) -> str:
+    lines = [f"📊[管線統計] {report['seasons']} 期、匯入 {report['files']} 個檔案 (略過 {report['skipped']} 個已匯入)、"
+             f"{report['rows']} 筆，耗時 {report['seconds']:.1f} 秒"]
+    for name in STAGES:
+        stage = report["stages"][name]
+        lines.append(f"  {STAGE_LABELS[name]}：workers={stage['workers']} 完成 {stage['items']} 失敗 {stage['failed']}，"
+                     f"處理 {stage['busy']:.1f} 秒、等待下游 {stage['blocked']:.1f} 秒、經過 {stage['wall']:.1f} 秒")
+    lines.append(f"  瓶頸階段：{STAGE_LABELS[report['bottleneck']]}")
+    return "\n".join(lines)
+
+
+async def run_ingest_pipeline(
+    seasons: List[str],
+    download: bool = True,
+    download_workers: int = PIPELINE_DOWNLOAD_WORKERS,
+    extract_workers: int = PIPELINE_EXTRACT_WORKERS,
+    clean_workers: int = PIPELINE_CLEAN_WORKERS,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    bulk_load: bool = True,
+    retry_limit: int = DOWNLOAD_RETRY_LIMIT,
+    season_timeout: float = SEASON_TIMEOUT,
+) -> Dict:
+    """
+    以管線方式下載並匯入多個期別。
+
+    :param download: False 時不下載，直接處理 RAW_DATA_DIR 中已存在的期別壓縮檔
+    :return: 統計 {"seasons", "files", "skipped", "rows", "seconds", "stages", "bottleneck"}，
+             stages 為各階段的 {"workers", "items", "failed", "busy", "blocked", "wall"}
+    """
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    metrics = {
+        "download": _new_metrics(download_workers),
+        "extract": _new_metrics(extract_workers),
+        "clean": _new_metrics(clean_workers),
+        "import": _new_metrics(1),
+    }
+    totals = {"files": 0, "skipped": 0, "rows": 0}
+    folders, season_zips = set(), []
+    # 本次需要匯入的檔案 (期別資料夾, 路徑, check_import_needed 的結果)，收尾時判斷哪些期別已全部寫入
+    pending_tasks = []
+    validators = load_validators() if download else None
+
+    # SQLite 連線只在單一 writer 執行緒使用 (匯入紀錄查詢、寫入、收尾)
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-writer")
+    extractor = ThreadPoolExecutor(max_workers=max(1, extract_workers), thread_name_prefix="ingest-extract")
+    cleaner: Executor = (ProcessPoolExecutor(max_workers=clean_workers) if clean_workers > 1
+                         else ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-clean"))
+    # 每個清洗 worker 一個讀檔執行緒：CSV 在此逐塊讀取，只把單一 chunk 交給 cleaner 清洗
+    reader = ThreadPoolExecutor(max_workers=max(1, clean_workers), thread_name_prefix="ingest-read")
+
+    def on_writer(func, *args):
+        return loop.run_in_executor(writer, func, *args)
+
+    os.makedirs(RAW_DATA_DIR, exist_ok=True)
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = await on_writer(lambda: sqlite3.connect(DB_PATH, check_same_thread=False))
+    # 期別 ledger：尚未匯入的期別一定要取得壓縮檔，不使用條件式請求
+    await on_writer(record_listed, conn, {season: season for season in seasons})
+    unfinished = await on_writer(pending_seasons, conn)
+    if validators is not None:
+        for season in seasons:
+            if season in unfinished:
+                validators.pop(season_zip_url(season), None)
+    bulk_stack = ExitStack()
+    if bulk_load:
+        # 開始時還不知道會寫入哪些縣市：這裡只套用 PRAGMA，索引在第一次寫入該縣市時才延後 (見 defer_city_indexes)
+        await on_writer(bulk_stack.enter_context, bulk_load_session(conn, defer_indexes=False))
+    indexed_cities = set()
+
+    def defer_city_indexes(city: str, file_path: str):
+        # 在 writer 執行緒執行；重建由 bulk_stack 在匯入結束時 (finalize 之前、PRAGMA 還原之前) 處理。
+        # 已有資料的縣市以第一個檔案的筆數判斷是否延後 (增量匯入保留索引)
+        if bulk_load and city not in indexed_cities:
+            indexed_cities.add(city)
+            bulk_stack.enter_context(deferred_indexes(conn, [city], lambda _: count_csv_rows(file_path)))
+
+    seasons_queue: asyncio.Queue = asyncio.Queue()
+    zips_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    files_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    cleaned_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    for season in seasons:
+        seasons_queue.put_nowait(season)
+    seasons_queue.put_nowait(_DONE)
+
+    client = httpx.AsyncClient(timeout=HTTP_TIMEOUT, follow_redirects=True)
+    semaphore = asyncio.Semaphore(max(1, download_workers))
+
+    async def download_stage(season: str) -> List:
+        if not download:
+            if os.path.exists(season_zip_path(season)):
+                await on_writer(advance_season, conn, season, STATE_DOWNLOADED)
+                return [season]
+            print(f"☑️ 找不到 {season} 的壓縮檔，略過")
+            return []
+        result = await download_season(client, season, semaphore, retry_limit, season_timeout, validators)
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+        # 內容與上次相同的期別 (已匯入) 不需要解壓縮、匯入
+        if not result["changed"]:
+            return []
+        entry = validators.get(season_zip_url(season), {})
+        await on_writer(advance_season, conn, season, STATE_DOWNLOADED, entry.get("sha256"),
+                        entry.get("content_length"))
+        return [season]
+
+    async def extract_stage(season: str) -> List:
+        try:
+            file_paths = await loop.run_in_executor(extractor, extract_season, season)
+        except zipfile.BadZipFile:
+            # 損毀的壓縮檔已刪除，清掉驗證資訊讓下次下載不會因 304 被略過
+            if validators is not None:
+                validators.pop(season_zip_url(season), None)
+            await on_writer(advance_season, conn, season, STATE_LISTED)
+            raise
+        if not ZIP_INGEST_ENABLED:
+            await on_writer(advance_season, conn, season, STATE_EXTRACTED)
+        folders.add(season)
+        if ZIP_INGEST_ENABLED:
+            season_zips.append(season_zip_path(season))
+        # 內容 hash 也在解壓縮的執行緒計算，writer 只需查詢匯入紀錄
+        hashes = await asyncio.gather(*(
+            loop.run_in_executor(extractor, calculate_file_hash, file_path) for file_path in file_paths
+        ))
+        return [(season, file_path, content_hash) for file_path, content_hash in zip(file_paths, hashes)]
+
+    async def put_waiting(queue: asyncio.Queue, item):
+        # 等待下游佇列空位的時間算在清洗階段的 blocked，而不是處理時間
+        waiting = time.perf_counter()
+        await queue.put(item)
+        waited = time.perf_counter() - waiting
+        metrics["clean"]["busy"] -= waited
+        metrics["clean"]["blocked"] += waited
+
+    async def clean_stage(item) -> List:
+        folder, file_path, content_hash = item
+        pending = await on_writer(check_import_needed, conn, folder, file_path, content_hash)
+        if pending is None:
+            totals["skipped"] += 1
+            _move_to_old(folder, file_path)
+            return []
+        pending_tasks.append((folder, file_path, pending))
+        city = get_city_name(os.path.basename(file_path))
+        if city == "未知縣市":
+            raise ValueError(f"無法判斷縣市：{os.path.basename(file_path)}")
+
+        # 先交給匯入階段再開始清洗：writer 依序讀取 chunk_queue，清洗好的 chunk 隨即寫入，
+        # 每個檔案在記憶體中最多 STREAM_QUEUE_CHUNKS 個 chunk
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+        issues = []
+        await put_waiting(cleaned_queue, (folder, file_path, pending, city, chunk_queue, issues))
+        raw_chunks = iter_raw_chunks(file_path)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(reader, next, raw_chunks, None)
+                if chunk is None:
+                    break
+                cleaned, chunk_issues = await loop.run_in_executor(cleaner, clean_chunk_job, chunk, file_path, city)
+                issues.extend(chunk_issues)
+                await put_waiting(chunk_queue, cleaned)
+        except Exception as e:
+            await chunk_queue.put(e)
+            raise
+        finally:
+            await loop.run_in_executor(reader, raw_chunks.close)
+        await chunk_queue.put(_DONE)
+        return []
+
+    async def import_stage(item) -> List:
+        folder, file_path, pending, city, chunk_queue, issues = item
+        filename = os.path.basename(file_path)
+        received = {"finished": False}
+
+        def receive_chunks():
+            # 在 writer 執行緒讀取 event loop 上的 chunk_queue
+            while True:
+                chunk = asyncio.run_coroutine_threadsafe(chunk_queue.get(), loop).result()
+                if chunk is _DONE or isinstance(chunk, Exception):
+                    received["finished"] = True
+                    if chunk is _DONE:
+                        return
+                    raise chunk
+                yield chunk
+
+        # 寫入失敗時 (交易已 rollback) 檔案留在 RAW_DATA_DIR，下次更新重新匯入
+        try:
+            await on_writer(defer_city_indexes, city, file_path)
+            rows = await on_writer(write_file_transaction, conn, pending, filename, city, receive_chunks(), issues)
+        except Exception:
+            # 讀完剩下的 chunk，讓等待佇列空位的清洗 worker 能結束
+            while not received["finished"]:
+                chunk = await chunk_queue.get()
+                received["finished"] = chunk is _DONE or isinstance(chunk, Exception)
+            raise
+        totals["files"] += 1
+        totals["rows"] += rows
+        action = "重新匯入" if pending[2] else "已匯入"
+        print(f"✅ {action} {folder}/{filename} -> 表 {city} 共 {rows} 筆")
+        _move_to_old(folder, file_path)
+        return []
+
+    try:
+        await asyncio.gather(
+            _run_stage("download", seasons_queue, zips_queue, metrics["download"], download_stage),
+            _run_stage("extract", zips_queue, files_queue, metrics["extract"], extract_stage),
+            _run_stage("clean", files_queue, cleaned_queue, metrics["clean"], clean_stage),
+            _run_stage("import", cleaned_queue, None, metrics["import"], import_stage),
+        )
+    finally:
+        await client.aclose()
+        if validators is not None:
+            save_validators(validators)
+        await on_writer(bulk_stack.close)
+        await on_writer(finalize_import, conn, folders, season_zips)
+        # 所有 CSV 都寫入成功的期別才標記為 imported，其餘維持原狀態由下次更新接續
+        await on_writer(lambda: mark_seasons_imported(conn, completed_folders(conn, folders, pending_tasks)))
+        await on_writer(conn.close)
+        for executor in (writer, extractor, cleaner, reader):
+            executor.shutdown()
+
+    stages = {}
+    for name in STAGES:
+        stage = metrics[name]
+        wall = stage["finished"] - stage["started"] if stage["started"] is not None else 0.0
+        stages[name] = {"workers": stage["workers"], "items": stage["items"], "failed": stage["failed"],
+                        "busy": round(stage["busy"], 2), "blocked": round(stage["blocked"], 2),
+                        "wall": round(wall, 2)}
+    report = {
+        "seasons": len(seasons),
+        **totals,
+        "seconds": round(time.perf_counter() - started, 2),
+        "stages": stages,
+        # 平均每個 worker 處理時間最長的階段決定整體耗時
+        "bottleneck": max(STAGES, key=lambda name: stages[name]["busy"] / max(1, stages[name]["workers"])),
+    }
+    msg = _format_report(report)
+    print(msg)
+    log_info(msg)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--no-download", action="store_true", help="只匯入已下載的壓縮檔")
+    parser.add_argument("--download-workers", type=int, default=PIPELINE_DOWNLOAD_WORKERS)
+    parser.add_argument("--extract-workers", type=int, default=PIPELINE_EXTRACT_WORKERS)
+    parser.add_argument("--clean-workers", type=int, default=PIPELINE_CLEAN_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=PIPELINE_QUEUE_SIZE)
+    args = parser.parse_args()
+
+    with open(os.path.join(RAW_DATA_DIR, "fetch_options_route.json"), "r", encoding="utf-8") as f:
+        seasons = list(json.load(f).get("historySeason_id", {}))
+
+    asyncio.run(run_ingest_pipeline(
+        seasons,
+        download=not args.no_download,
+        download_workers=args.download_workers,
+        extract_workers=args.extract_workers,
+        clean_workers=args.clean_workers,
+        queue_size=args.queue_size,
+    ))
+
+
+if __name__ == "__main__":
+    main()
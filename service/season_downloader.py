@@ -0,0 +1,128 @@
+import asyncio
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from api.routes.real_estate.download_zip_route import season_zip_path, season_zip_url
+from utils.download_validators import conditional_headers, update_validator
+from utils.http_download import adownload_file
+from utils.logger import log_info, log_warning
+
+# 同時下載的期別數
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", "4"))
+# 失敗後的重試次數 (不含第一次)
+DOWNLOAD_RETRY_LIMIT = int(os.getenv("DOWNLOAD_RETRY_LIMIT", "3"))
+# 單一期別每次嘗試的逾時秒數 (含完整下載時間)
+SEASON_TIMEOUT = float(os.getenv("SEASON_DOWNLOAD_TIMEOUT", "600"))
+
+# 指數退避：第 n 次重試前等待 0 ~ min(BACKOFF_MAX, BACKOFF_BASE * 2^n) 秒 (full jitter)
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+# 連線 / 單次讀取的逾時
+HTTP_TIMEOUT = httpx.Timeout(30.0)
+
+# 伺服器暫時性錯誤才重試，其他狀態碼 (如 404) 直接視為失敗
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt: int) -> float:
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+async def download_season(
+    client: httpx.AsyncClient,
+    season: str,
+    semaphore: asyncio.Semaphore,
+    retry_limit: int = DOWNLOAD_RETRY_LIMIT,
+    timeout: float = SEASON_TIMEOUT,
+    validators: Optional[Dict[str, Dict]] = None,
+) -> Dict:
+    """
+    下載單一期別壓縮檔，失敗時以指數退避 + jitter 重試；等待重試期間不佔用並行名額。
+    有 validators 時送出條件式請求：伺服器回 304，或下載內容的大小與 sha256 與上次相同時，
+    不保留壓縮檔並回傳 changed=False。
+
+    :return: {"season", "success", "changed", "bytes", "seconds", "attempts", "error"}
+    """
+    started = time.perf_counter()
+    error = None
+    url, path = season_zip_url(season), season_zip_path(season)
+    headers = conditional_headers(validators, url) if validators is not None else None
+
+    for attempt in range(retry_limit + 1):
+        try:
+            # 逾時或斷線時 .part 會保留，下一次嘗試以 Range 從中斷處續傳
+            async with semaphore:
+                result = await asyncio.wait_for(adownload_file(client, url, path, headers), timeout)
+
+            changed = not result["not_modified"]
+            if changed and validators is not None:
+                changed = await asyncio.to_thread(
+                    update_validator, validators, url, path, result["etag"], result["last_modified"])
+                if not changed:
+                    os.remove(path)
+            return {"season": season, "success": True, "changed": changed, "bytes": result["bytes"],
+                    "seconds": round(time.perf_counter() - started, 2), "attempts": attempt + 1, "error": None}
+
+        except asyncio.TimeoutError:
+            error = f"逾時 ({timeout:.0f} 秒)"
+        except httpx.HTTPStatusError as e:
+            error = f"HTTP {e.response.status_code}"
+            if e.response.status_code not in RETRYABLE_STATUS:
+                break
+        except httpx.HTTPError as e:
+            error = f"{type(e).__name__}: {e}"
+
+        if attempt < retry_limit:
+            delay = backoff_delay(attempt)
+            print(f"⚠️下載失敗：{season}（第 {attempt + 1} 次，{error}），{delay:.1f} 秒後重試")
+            await asyncio.sleep(delay)
+
+    return {"season": season, "success": False, "changed": False, "bytes": 0,
+            "seconds": round(time.perf_counter() - started, 2), "attempts": attempt + 1, "error": error}
+
+
+async def download_seasons(
+    seasons: List[str],
+    concurrency: int = DOWNLOAD_CONCURRENCY,
+    retry_limit: int = DOWNLOAD_RETRY_LIMIT,
+    season_timeout: float = SEASON_TIMEOUT,
+    validators: Optional[Dict[str, Dict]] = None,
+) -> Dict:
+    """
+    以最多 concurrency 個並行連線下載多個期別壓縮檔。
+    validators 為 utils.download_validators 的快取 (會就地更新)，由呼叫端負責存檔。
+
+    :return: 下載報告 {"results", "succeeded", "unchanged", "failed", "bytes", "seconds"}
+    """
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT, follow_redirects=True) as client:
+        results = await asyncio.gather(*(
+            download_season(client, season, semaphore, retry_limit, season_timeout, validators) for season in seasons
+        ))
+
+    elapsed = time.perf_counter() - started
+    total_bytes = sum(result["bytes"] for result in results)
+    report = {
+        "results": results,
+        "succeeded": [result["season"] for result in results if result["success"]],
+        "unchanged": [result["season"] for result in results if result["success"] and not result["changed"]],
+        "failed": {result["season"]: result["error"] for result in results if not result["success"]},
+        "bytes": total_bytes,
+        "seconds": round(elapsed, 2),
+    }
+
+    mb = total_bytes / (1 << 20)
+    msg = (f"📊[下載統計] 成功 {len(report['succeeded'])}/{len(seasons)} 期 (未變更 {len(report['unchanged'])} 期)，共 {mb:.1f} MB，耗時 {elapsed:.1f} 秒 "
+           f"({mb / elapsed if elapsed else 0:.1f} MB/秒，concurrency={concurrency})")
+    print(msg)
+    log_info(msg)
+    for season, error in report["failed"].items():
+        log_warning(f"❌[下載失敗] {season}：{error}")
+    return report
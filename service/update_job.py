@@ -0,0 +1,182 @@
+"""
+排程更新工作：在獨立的子行程執行完整的 抓取 → 下載 → 解壓縮 → 匯入 流程。
+
+- 觸發端 (APScheduler、管理頁面) 只負責啟動子行程並立即返回；清洗、匯入等 CPU 密集的工作不會佔用 API 行程的 GIL，
+  FastAPI / NiceGUI 的 event loop 與查詢不受影響
+- 以檔案鎖 (UPDATE_LOCK_FILE) 避免多個行程 (例如同時啟動的多個 worker) 重複執行
+- 執行中的進度寫入 UPDATE_PROGRESS_FILE、上次執行結果寫入 UPDATE_STATUS_FILE，API 行程只讀取這兩個檔案回應 /api/update/status
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import time
+from datetime import datetime
+from multiprocessing.process import BaseProcess
+from typing import Dict, Optional
+
+from config.paths import RAW_DATA_DIR
+from ngui.preprocessing.process_real_estate_and_import import apply_clean_and_import_file
+from service.fetch_service import fetch_data
+from utils.file_lock import LockBusyError, file_lock, is_locked
+from utils.logger import log_info, log_warning
+
+UPDATE_LOCK_FILE = os.getenv("UPDATE_LOCK_FILE", os.path.join(RAW_DATA_DIR, ".update.lock"))
+UPDATE_STATUS_FILE = os.path.join(RAW_DATA_DIR, "update_status.json")
+UPDATE_PROGRESS_FILE = os.path.join(RAW_DATA_DIR, "update_progress.json")
+# 更新子行程的啟動方式：spawn 不會複製 API 行程的執行緒與連線 (在多執行緒的行程中 fork 並不安全)
+UPDATE_START_METHOD = os.getenv("UPDATE_START_METHOD", "spawn")
+
+STATE_IDLE = "idle"
+STATE_RUNNING = "running"
+
+# 執行結果：成功、成功但無新資料、失敗、因其他行程執行中而略過
+RESULT_UPDATED = "updated"
+RESULT_UNCHANGED = "unchanged"
+RESULT_FAILED = "failed"
+RESULT_SKIPPED = "skipped"
+
+_worker_lock = threading.Lock()
+_worker: Optional[BaseProcess] = None
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _load_last_run() -> Optional[Dict]:
+    return _read_json(UPDATE_STATUS_FILE)
+
+
+def _save_last_run(last_run: Dict):
+    _write_json(UPDATE_STATUS_FILE, last_run)
+
+
+class _ProgressSteps(dict):
+    """
+    各步驟耗時：fetch_data 每完成一個步驟就寫入 (timings[step] = 秒數)，同時更新進度檔讓 API 行程看到目前進度。
+    """
+
+    def __init__(self, progress: Dict):
+        super().__init__()
+        self._progress = progress
+
+    def __setitem__(self, step: str, seconds: float):
+        super().__setitem__(step, seconds)
+        _write_json(UPDATE_PROGRESS_FILE, self._progress)
+
+
+def _worker_alive() -> bool:
+    with _worker_lock:
+        return _worker is not None and _worker.is_alive()
+
+
+def get_update_status() -> Dict:
+    """
+    目前的更新狀態：state (idle / running)、phase (抓取 / 匯入)、已完成步驟的耗時、上次執行結果，
+    以及 locked (是否有行程正在更新)。更新在子行程 (或其他行程) 執行，這裡只讀取鎖與狀態檔。
+    """
+    locked = is_locked(UPDATE_LOCK_FILE)
+    running = locked or _worker_alive()
+    # 進度檔只在持有更新鎖的行程執行中有效，行程中斷後留下的舊進度不採用
+    progress = _read_json(UPDATE_PROGRESS_FILE) if locked else None
+    status = progress or {"state": STATE_IDLE, "trigger": None, "phase": None, "started_at": None, "steps": {}}
+    status["state"] = STATE_RUNNING if running else STATE_IDLE
+    status["last_run"] = _load_last_run()
+    status["locked"] = running
+    return status
+
+
+def run_update(trigger: str = "manual") -> Dict:
+    """
+    在目前的行程同步執行一次完整更新 (以新的 event loop 執行 fetch_data)，回傳本次執行結果。
+    start_update 在子行程呼叫；其他行程持有更新鎖時直接略過。
+    """
+    started = time.perf_counter()
+    last_run = {"trigger": trigger, "started_at": _now(), "finished_at": None, "result": None,
+                "seconds": None, "steps": {}, "import": None, "error": None}
+    try:
+        with file_lock(UPDATE_LOCK_FILE):
+            progress = {"state": STATE_RUNNING, "trigger": trigger, "phase": "抓取",
+                        "started_at": last_run["started_at"]}
+            steps = progress["steps"] = _ProgressSteps(progress)
+            _write_json(UPDATE_PROGRESS_FILE, progress)
+            msg = f"☑️[排程更新] 開始更新 (觸發來源：{trigger})"
+            print(msg)
+            log_info(msg)
+
+            # fetch_data 完成每個步驟時寫入 steps，狀態查詢可看到目前進度
+            success, need_db = asyncio.run(fetch_data(steps))
+            if not success:
+                last_run["result"] = RESULT_FAILED
+                last_run["error"] = "抓取或下載失敗，詳見日誌"
+            elif need_db:
+                progress["phase"] = "匯入"
+                _write_json(UPDATE_PROGRESS_FILE, progress)
+                import_started = time.perf_counter()
+                last_run["import"] = apply_clean_and_import_file()
+                steps["匯入"] = round(time.perf_counter() - import_started, 3)
+                last_run["result"] = RESULT_UPDATED
+            else:
+                last_run["result"] = RESULT_UNCHANGED
+            last_run["steps"] = dict(steps)
+    except LockBusyError:
+        last_run["result"] = RESULT_SKIPPED
+        last_run["error"] = "其他行程正在更新"
+    except Exception as e:
+        last_run["result"] = RESULT_FAILED
+        last_run["error"] = str(e)
+    finally:
+        last_run["finished_at"] = _now()
+        last_run["seconds"] = round(time.perf_counter() - started, 3)
+
+    if last_run["result"] == RESULT_SKIPPED:
+        msg = f"⚠️[排程更新] 其他行程正在更新，略過此次 (觸發來源：{trigger})"
+    elif last_run["result"] == RESULT_FAILED:
+        msg = f"❌[排程更新] 更新失敗，耗時 {last_run['seconds']:.2f} 秒。錯誤原因: {last_run['error']}"
+    else:
+        msg = f"✅[排程更新] 更新完成 ({last_run['result']})，耗時 {last_run['seconds']:.2f} 秒"
+    print(msg)
+    if last_run["result"] in (RESULT_SKIPPED, RESULT_FAILED):
+        log_warning(msg)
+    else:
+        log_info(msg)
+
+    if last_run["result"] != RESULT_SKIPPED:
+        # 略過的紀錄不覆蓋實際執行更新的行程留下的結果
+        _save_last_run(last_run)
+    return last_run
+
+
+def start_update(trigger: str = "manual") -> bool:
+    """
+    在子行程啟動更新並立即返回；已有更新在執行 (本行程啟動的子行程或其他行程持有更新鎖) 時回傳 False。
+    """
+    global _worker
+    with _worker_lock:
+        if (_worker is not None and _worker.is_alive()) or is_locked(UPDATE_LOCK_FILE):
+            return False
+        # 非 daemon：匯入會建立 process pool (daemon 行程不能再有子行程)；
+        # 伺服器關閉時更新繼續執行到結束，被中斷的期別由 season ledger 於下次接續
+        context = multiprocessing.get_context(UPDATE_START_METHOD)
+        _worker = context.Process(target=run_update, args=(trigger,), name="land-update")
+        _worker.start()
+    return True
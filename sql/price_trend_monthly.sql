@@ -0,0 +1,40 @@
+-- 趨勢圖的月彙總 (ngui/components/main_sql.py 以 supabase.rpc("price_trend_monthly", ...) 呼叫)
+-- 在 Supabase SQL Editor 執行一次即可；本機 SQLite 後端的等價查詢見 ngui/components/sqlite_client.py
+--
+-- 各縣市一個資料表 (與 Supabase 上的表名相同)，"交易年月日" 為 YYYYMMDD 字串、"建物總價萬元" 為數值欄位。
+-- 回傳每個 (年, 月) 一列：筆數、平均與中位數總價 (萬元)；10 年的趨勢約 120 列。
+create or replace function public.price_trend_monthly(
+    p_city text,
+    p_years text[] default null,
+    p_trade_object text default null,
+    p_house_type text default null
+)
+returns table (year text, month integer, count bigint, avg_price double precision, median_price double precision)
+language plpgsql
+stable
+security invoker
+as $$
+begin
+    return query execute format(
+        $q$
+        select substr(t."交易年月日", 1, 4) as year,
+               substr(t."交易年月日", 5, 2)::integer as month,
+               count(*) as count,
+               avg(t."建物總價萬元")::double precision as avg_price,
+               percentile_cont(0.5) within group (order by t."建物總價萬元")::double precision as median_price
+        from public.%I t
+        where t."建物總價萬元" is not null
+          and length(t."交易年月日") >= 6
+          and ($1 is null or t."交易年" = any($1))
+          and ($2 is null or t."交易標的" = $2)
+          and ($3 is null or t."屋況" = $3)
+        group by 1, 2
+        order by 1, 2
+        $q$,
+        p_city
+    )
+    using p_years, p_trade_object, p_house_type;
+end;
+$$;
+
+grant execute on function public.price_trend_monthly(text, text[], text, text) to anon, authenticated;
@@ -1,2 +1,4 @@
 from ngui.preprocessing.process_real_estate_and_import import apply_clean_and_import_file
-apply_clean_and_import_file()
+
+if __name__ == "__main__":
+    apply_clean_and_import_file()
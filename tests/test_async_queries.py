@@ -0,0 +1,74 @@
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from benchmarks.synthetic_lvr_land import write_lvr_land_csv
+from ngui.components import main_sql
+from ngui.preprocessing.process_real_estate_and_import import clean_and_import_file
+from tests.test_multi_city_queries import SlowSqliteClient
+
+
+class TestAsyncQueries(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.db_path = os.path.join(cls.tmp_dir, "real_estate.sqlite")
+        conn = sqlite3.connect(cls.db_path)
+        file_path = os.path.join(cls.tmp_dir, "a_lvr_land_a.csv")
+        write_lvr_land_csv(file_path, 1000, seed=5)
+        clean_and_import_file(file_path, "113S1", conn)
+        conn.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def setUp(self):
+        # 每次查詢延遲 0.3 秒，模擬一次 Supabase 往返
+        for name, value in (("db", SlowSqliteClient(self.db_path, {"臺北": 0.3})), ("USE_PRICE_ROLLUPS", False)):
+            patcher = patch.object(main_sql, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_event_loop_stays_responsive(self):
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.02)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            df = await main_sql.aquery_distribution_data("2020", "臺北")
+            task.cancel()
+            return df, ticks
+
+        df, ticks = asyncio.run(scenario())
+        self.assertFalse(df.empty)
+        # 查詢期間 (約 0.3 秒) event loop 仍持續執行其他工作
+        self.assertGreaterEqual(ticks, 5)
+
+    def test_concurrent_users_do_not_serialize(self):
+        async def scenario():
+            return await asyncio.gather(*(
+                main_sql.aquery_avg_price("臺北", None, "2020", None) for _ in range(4)
+            ))
+
+        started = time.perf_counter()
+        results = asyncio.run(scenario())
+        elapsed = time.perf_counter() - started
+
+        self.assertTrue(all(not df.empty for df in results))
+        # 依序執行需要 1.2 秒
+        self.assertLess(elapsed, 0.9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from benchmarks.synthetic_lvr_land import write_lvr_land_csv
+from ngui.components import main_sql
+from ngui.components.sqlite_client import SqliteClient
+from ngui.preprocessing.process_real_estate_and_import import clean_and_import_file, ensure_city_indexes
+
+
+class RecordingSqliteClient(SqliteClient):
+    def __init__(self, db_path: str):
+        super().__init__(db_path)
+        self.queries = []
+
+    def run(self, sql, params=None):
+        self.queries.append((sql, params or []))
+        return super().run(sql, params)
+
+
+class TestCityIndexes(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.db_path = os.path.join(cls.tmp_dir, "real_estate.sqlite")
+        conn = sqlite3.connect(cls.db_path)
+        for code, city in (("a", "臺北"), ("f", "新北")):
+            file_path = os.path.join(cls.tmp_dir, f"{code}_lvr_land_a.csv")
+            write_lvr_land_csv(file_path, 3000, seed=len(city))
+            clean_and_import_file(file_path, "113S1", conn)
+            ensure_city_indexes(conn, city)
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def setUp(self):
+        self.client = RecordingSqliteClient(self.db_path)
+        for name, value in (("db", self.client), ("USE_SERVER_AGGREGATES", False)):
+            patcher = patch.object(main_sql, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _assert_queries_use_index(self):
+        self.assertTrue(self.client.queries, "沒有執行任何查詢")
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for sql, params in self.client.queries:
+                plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+                self.assertTrue(any("USING INDEX" in step or "USING COVERING INDEX" in step for step in plan),
+                                f"未使用索引：{sql} -> {plan}")
+                self.assertFalse(any(step.startswith("SCAN") for step in plan), f"全表掃描：{sql} -> {plan}")
+        finally:
+            conn.close()
+
+    def test_distribution_query_uses_index(self):
+        df = main_sql.query_distribution_data("2020", "臺北", "房地", "中古屋")
+        main_sql.query_distribution_data("~2015", "臺北", None, "老屋")
+        self.assertFalse(df.empty)
+        self._assert_queries_use_index()
+
+    def test_multi_city_3d_query_uses_index(self):
+        df = main_sql.query_multi_city_3d_data(["臺北", "新北"], "2020", "房地", None)
+        self.assertFalse(df.empty)
+        self._assert_queries_use_index()
+
+    def test_trend_queries_use_index(self):
+        self.assertFalse(main_sql.query_avg_price("臺北", "房地", "2020", None).empty)
+        self.assertFalse(main_sql.query_multi_year_price("臺北", None, ["2019", "2020"], "中古屋").empty)
+        self._assert_queries_use_index()
+
+    def test_server_trend_aggregate_uses_index(self):
+        # 月彙總的 CTE / 子查詢掃描的是已過濾的中間結果，縣市資料表本身仍須以索引查找
+        with patch.object(main_sql, "USE_SERVER_AGGREGATES", True):
+            self.assertFalse(main_sql.query_avg_price("臺北", "房地", "2020", None).empty)
+            self.assertFalse(main_sql.query_multi_year_price("臺北", None, ["2019", "2020"], "中古屋").empty)
+        self.assertTrue(self.client.queries, "沒有執行任何查詢")
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for sql, params in self.client.queries:
+                plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+                self.assertTrue(any(step.startswith("SEARCH 臺北 USING INDEX idx_臺北_year_trade_object_status")
+                                    for step in plan), f"未使用索引：{sql} -> {plan}")
+                self.assertNotIn("SCAN 臺北", plan, f"全表掃描：{sql} -> {plan}")
+        finally:
+            conn.close()
+
+    def test_price_with_age_query_uses_index(self):
+        df = main_sql.query_multi_city_price_with_age(["臺北", "新北"], "2020", "房地", None)
+        self.assertFalse(df.empty)
+        self._assert_queries_use_index()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from ngui.preprocessing.process_real_estate_and_import import (
+    FORMATTED_COLUMNS, coerce_numeric_columns, format_frame, format_row,
+)
+
+
+def build_sample_frame(rows: int = 3000, seed: int = 7) -> pd.DataFrame:
+    """
+    產生模擬 lvr_land 的欄位資料，包含空值、無法轉換的數值、異常日期等情況。
+    """
+    rng = np.random.default_rng(seed)
+    trade_objects = ["房地(土地+建物)", "房地(土地+建物)+車位", "土地", "建物", "車位", np.nan]
+    building_types = ["住宅大樓(11層含以上有電梯)", "華廈(10層含以下有電梯)",
+                      "公寓(5樓含以下無電梯)", "透天厝", "其他", np.nan]
+    trade = rng.integers(100, 114, rows) * 10000 + rng.integers(1, 13, rows) * 100 + rng.integers(1, 29, rows)
+    build = trade - rng.integers(-2, 40, rows) * 10000 - rng.integers(0, 2, rows) * 100
+    trade_dates = [str(d) for d in trade]
+    build_dates = [f"0{d}" if d < 1000000 else str(d) for d in build]
+
+    df = pd.DataFrame({
+        '鄉鎮市區': rng.choice(["大安區", "中正區", "板橋區"], rows),
+        '交易標的': rng.choice(np.array(trade_objects, dtype=object), rows),
+        '交易年月日': trade_dates,
+        '建物型態': rng.choice(np.array(building_types, dtype=object), rows),
+        '主要用途': "住家用",
+        '建築完成年月': build_dates,
+        '建物移轉總面積平方公尺': np.round(rng.uniform(0, 400, rows), 2).astype(str),
+        '總價元': rng.integers(0, 80_000_000, rows).astype(str),
+        '車位移轉總面積平方公尺': np.round(rng.uniform(0, 40, rows), 2).astype(str),
+        '車位總價元': rng.integers(0, 3_000_000, rows).astype(str),
+    })
+
+    df.loc[::37, '建物移轉總面積平方公尺'] = "abc"
+    df.loc[::41, '總價元'] = np.nan
+    df.loc[::43, '車位總價元'] = "--"
+    df.loc[::47, '車位移轉總面積平方公尺'] = np.nan
+    df.loc[::53, '交易年月日'] = np.nan
+    df.loc[::59, '建築完成年月'] = np.nan
+    df.loc[::61, '建築完成年月'] = "0750000"
+    df.loc[::67, '建築完成年月'] = "1130229"
+    df.loc[::71, '交易年月日'] = "12345"
+    df.loc[::73, '建築完成年月'] = "1141231"
+    df.loc[::79, '交易年月日'] = " 1120315 號"
+    df.loc[::83, '總價元'] = "0"
+    return df
+
+
+def format_with_rows(df: pd.DataFrame, filename: str) -> pd.DataFrame:
+    result = df.copy()
+    result[FORMATTED_COLUMNS] = result.apply(
+        lambda row: format_row(row, filename=filename, idx=row.name), axis=1)
+    coerce_numeric_columns(result)
+    return result
+
+
+def format_with_frame(df: pd.DataFrame, filename: str) -> pd.DataFrame:
+    result = df.copy()
+    result[FORMATTED_COLUMNS] = format_frame(result, filename=filename)
+    coerce_numeric_columns(result)
+    return result
+
+
+class TestFormatFrame(unittest.TestCase):
+    def test_parity_with_format_row(self):
+        df = build_sample_frame()
+        expected = format_with_rows(df, "a_lvr_land_a.csv")
+        actual = format_with_frame(df, "a_lvr_land_a.csv")
+        pd.testing.assert_frame_equal(actual, expected)
+
+    def test_parity_for_presale_file(self):
+        df = build_sample_frame(rows=500, seed=11)
+        expected = format_with_rows(df, "f_lvr_land_b.csv")
+        actual = format_with_frame(df, "f_lvr_land_b.csv")
+        pd.testing.assert_frame_equal(actual, expected)
+        self.assertTrue((actual['屋況'] == "預售屋").all())
+
+    def test_parity_with_inferred_numeric_dtypes(self):
+        df = build_sample_frame(rows=500, seed=13).dropna()
+        df = df[~df.isin(["abc", "--", "0750000", "1130229", "12345", " 1120315 號"]).any(axis=1)]
+        numeric_columns = ['交易年月日', '建築完成年月', '建物移轉總面積平方公尺', '總價元',
+                           '車位移轉總面積平方公尺', '車位總價元']
+        df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric)
+        expected = format_with_rows(df, "a_lvr_land_a.csv")
+        actual = format_with_frame(df, "a_lvr_land_a.csv")
+        pd.testing.assert_frame_equal(actual, expected)
+
+    def test_parity_for_values_only_float_accepts(self):
+        # 全形數字、含底線的數字：pd.to_numeric 不接受，但 format_row 的 float() 可以轉換
+        df = build_sample_frame(rows=4, seed=17)
+        df['交易標的'] = "房地(土地+建物)"
+        df['建物移轉總面積平方公尺'] = ["０１２", "1_000", "12", "abc"]
+        df['總價元'] = ["3300000", "1_000_000", "９０００００", "100"]
+        df['車位總價元'] = "0"
+        expected = format_with_rows(df, "a_lvr_land_a.csv")
+        actual = format_with_frame(df, "a_lvr_land_a.csv")
+        pd.testing.assert_frame_equal(actual, expected)
+        self.assertEqual(actual['建物坪數'].tolist(), [3.63, 302.5, 3.63, 0.0])
+        self.assertEqual(actual['建物每坪單價萬元'].tolist(), [90.9, 0.3, 24.8, 0.0])
+
+    def test_empty_frame(self):
+        df = build_sample_frame(rows=10).iloc[0:0]
+        result = format_frame(df, filename="a_lvr_land_a.csv")
+        self.assertEqual(list(result.columns), FORMATTED_COLUMNS)
+        self.assertTrue(result.empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+import httpx
+
+from benchmarks.fake_moi_server import FakeMoiServer
+from utils.http_download import IncompleteDownloadError, download_file, part_path_for
+
+BODY = bytes(range(256)) * 40
+
+
+class TestDownloadFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "113S1.zip")
+        self.server = FakeMoiServer({"113S1": BODY}).start()
+        self.client = httpx.Client()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def _download(self):
+        return download_file(self.client, self.server.season_url("113S1"), self.path)
+
+    def _write_part(self, data: bytes):
+        with open(part_path_for(self.path), "wb") as f:
+            f.write(data)
+
+    def _assert_complete(self):
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), BODY)
+        self.assertFalse(os.path.exists(part_path_for(self.path)))
+
+    def test_truncated_download_keeps_part_file(self):
+        self.server.truncate_at = {"113S1": 4000}
+        with self.assertRaises(httpx.TransportError):
+            self._download()
+
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(os.path.getsize(part_path_for(self.path)), 4000)
+
+        result = self._download()
+        self.assertEqual((result["bytes"], result["size"], result["resumed_from"]), (len(BODY) - 4000, len(BODY), 4000))
+        self._assert_complete()
+
+    def test_resume_sends_if_range_with_part_validator(self):
+        self.server.truncate_at = {"113S1": 4000}
+        with self.assertRaises(httpx.TransportError):
+            self._download()
+        self._download()
+
+        resumed = self.server.requests[-1]["headers"]
+        self.assertEqual(resumed["Range"], "bytes=4000-")
+        self.assertEqual(resumed["If-Range"], f'"{hashlib.sha1(BODY).hexdigest()}"')
+        self.assertFalse(os.path.exists(part_path_for(self.path) + ".validator"))
+
+    def test_changed_file_restarts_instead_of_resuming(self):
+        self.server.truncate_at = {"113S1": 4000}
+        with self.assertRaises(httpx.TransportError):
+            self._download()
+
+        # 中斷期間伺服器上的檔案已更新：If-Range 不符，回 200 完整的新內容
+        new_body = BODY[::-1]
+        self.server.seasons["113S1"] = new_body
+        result = self._download()
+        self.assertEqual((result["bytes"], result["resumed_from"]), (len(new_body), 0))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), new_body)
+
+    def test_part_without_validator_is_not_resumed(self):
+        self._write_part(BODY[:100])
+
+        result = self._download()
+        self.assertEqual(result["resumed_from"], 0)
+        self.assertNotIn("Range", self.server.requests[0]["headers"])
+        self._assert_complete()
+
+    def test_content_encoding_is_not_decoded(self):
+        encoded = gzip.compress(BODY)
+        transport = httpx.MockTransport(lambda request: httpx.Response(
+            200, headers={"Content-Encoding": "gzip", "Content-Length": str(len(encoded))},
+            stream=httpx.ByteStream(encoded)))
+        with httpx.Client(transport=transport) as client:
+            result = download_file(client, "http://test/113S1.zip", self.path)
+
+        self.assertEqual(result["size"], len(encoded))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), encoded)
+
+    def test_server_without_range_restarts_from_scratch(self):
+        self.server.supports_range = False
+        self._write_part(b"x" * 100)
+
+        result = self._download()
+        self.assertEqual(result["resumed_from"], 0)
+        self._assert_complete()
+
+    def test_stale_part_larger_than_file_is_discarded(self):
+        self._write_part(b"x" * (len(BODY) + 10))
+
+        result = self._download()
+        self.assertEqual(result["bytes"], len(BODY))
+        self._assert_complete()
+
+    def test_http_error_leaves_no_file(self):
+        with self.assertRaises(httpx.HTTPStatusError):
+            download_file(self.client, self.server.season_url("099S1"), self.path)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(part_path_for(self.path)))
+
+    def test_incomplete_download_error_is_transport_error(self):
+        self.assertTrue(issubclass(IncompleteDownloadError, httpx.TransportError))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from ngui.preprocessing.import_ledger import LEDGER_TABLE
+from ngui.preprocessing.process_real_estate_and_import import clean_and_import_file
+
+HEADER = ("鄉鎮市區,交易標的,交易年月日,建物型態,主要用途,建築完成年月,"
+          "建物移轉總面積平方公尺,總價元,車位移轉總面積(平方公尺),車位總價元")
+ENGLISH_HEADER = ("district,transaction sign,transaction year month and day,building state,main use,"
+                  "construction to complete the years,building shifting total area,total price NTD,"
+                  "berth shifting total area square meter,the berth total price NTD")
+
+
+def write_csv(path: str, rows: int, price: int = 12000000):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER + "\n" + ENGLISH_HEADER + "\n")
+        for i in range(rows):
+            f.write(f"大安區,房地(土地+建物),1120{i % 9 + 1}15,住宅大樓(11層含以上有電梯),住家用,"
+                    f"0990101,{80 + i},{price + i},0,0\n")
+
+
+class TestImportLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, "a_lvr_land_a.csv")
+        self.conn = sqlite3.connect(":memory:")
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def _count(self, sql: str) -> int:
+        return self.conn.execute(sql).fetchone()[0]
+
+    def test_reimport_same_file_is_skipped(self):
+        write_csv(self.file_path, 20)
+        self.assertEqual(clean_and_import_file(self.file_path, "113S1", self.conn), 20)
+        self.assertEqual(clean_and_import_file(self.file_path, "113S1", self.conn), 0)
+
+        self.assertEqual(self._count('SELECT COUNT(*) FROM "臺北"'), 20)
+        self.assertEqual(self._count(f'SELECT row_count FROM "{LEDGER_TABLE}"'), 20)
+
+    def test_changed_file_replaces_previous_rows(self):
+        write_csv(self.file_path, 20)
+        clean_and_import_file(self.file_path, "113S1", self.conn)
+        write_csv(os.path.join(self.tmp_dir, "f_lvr_land_a.csv"), 5)
+        clean_and_import_file(os.path.join(self.tmp_dir, "f_lvr_land_a.csv"), "113S1", self.conn)
+
+        write_csv(self.file_path, 12, price=30000000)
+        self.assertEqual(clean_and_import_file(self.file_path, "113S1", self.conn), 12)
+
+        self.assertEqual(self._count('SELECT COUNT(*) FROM "臺北"'), 12)
+        self.assertEqual(self._count('SELECT MIN("總價元") FROM "臺北"'), 30000000)
+        self.assertEqual(self._count('SELECT COUNT(*) FROM "新北"'), 5)
+        self.assertEqual(self._count(f'SELECT COUNT(*) FROM "{LEDGER_TABLE}"'), 2)
+
+    def test_same_file_in_other_season_is_imported(self):
+        write_csv(self.file_path, 20)
+        clean_and_import_file(self.file_path, "113S1", self.conn)
+        clean_and_import_file(self.file_path, "113S2", self.conn)
+
+        self.assertEqual(self._count('SELECT COUNT(*) FROM "臺北"'), 40)
+
+    def test_latest_notice_periods_do_not_replace_each_other(self):
+        write_csv(self.file_path, 20)
+        clean_and_import_file(self.file_path, "latest_notice", self.conn)
+        write_csv(self.file_path, 8, price=5000000)
+        clean_and_import_file(self.file_path, "latest_notice", self.conn)
+
+        self.assertEqual(self._count('SELECT COUNT(*) FROM "臺北"'), 28)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from ngui.preprocessing import process_real_estate_and_import as importer
+from ngui.preprocessing.import_quarantine import QUARANTINE_TABLE, REASON_BAD_DATE, REASON_NOT_NUMERIC
+from tests.test_import_ledger import ENGLISH_HEADER, HEADER
+
+
+def write_dirty_csv(path: str, rows: int, bad_every: int = 0):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER + "\n" + ENGLISH_HEADER + "\n")
+        for i in range(rows):
+            bad = bool(bad_every) and i % bad_every == 0
+            price = "--" if bad else str(12000000 + i)
+            trade_date = "民國一一二年" if bad else "1120315"
+            f.write(f"大安區,房地(土地+建物),{trade_date},住宅大樓(11層含以上有電梯),住家用,"
+                    f"0990101,{80 + i},{price},0,0\n")
+
+
+class TestImportQuarantine(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, "a_lvr_land_a.csv")
+        self.conn = sqlite3.connect(":memory:")
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def _quarantine(self):
+        return self.conn.execute(
+            f'SELECT season, filename, row_index, "column", raw_value, reason '
+            f'FROM "{QUARANTINE_TABLE}" ORDER BY row_index, "column"'
+        ).fetchall()
+
+    def test_bad_values_are_quarantined_with_one_summary_line(self):
+        write_dirty_csv(self.file_path, 2500, bad_every=500)
+        with patch.object(importer, "log_warning") as log_warning, patch("builtins.print"):
+            rows = importer.clean_and_import_file(self.file_path, "113S1", self.conn)
+
+        self.assertEqual(rows, 2500)
+        self.assertEqual(log_warning.call_count, 1)
+        self.assertIn("總價元 無法轉換為數值 5 筆", log_warning.call_args[0][0])
+
+        expected = []
+        for row_index in range(0, 2500, 500):
+            expected.append(("113S1", "a_lvr_land_a.csv", row_index, "交易年月日", "民國一一二年", REASON_BAD_DATE))
+            expected.append(("113S1", "a_lvr_land_a.csv", row_index, "總價元", "--", REASON_NOT_NUMERIC))
+        self.assertEqual(self._quarantine(), expected)
+
+        # 被隔離的值在資料表中為 0 / 空字串
+        zeroed = self.conn.execute('SELECT COUNT(*) FROM "臺北" WHERE "建物總價萬元" = 0 AND "交易年" = \'\'')
+        self.assertEqual(zeroed.fetchone()[0], 5)
+
+    def test_reimport_replaces_quarantine_rows(self):
+        write_dirty_csv(self.file_path, 100, bad_every=10)
+        importer.clean_and_import_file(self.file_path, "113S1", self.conn)
+        write_dirty_csv(self.file_path, 100, bad_every=50)
+        importer.clean_and_import_file(self.file_path, "113S1", self.conn)
+
+        self.assertEqual(len(self._quarantine()), 4)
+
+    def test_clean_file_has_no_quarantine_rows(self):
+        write_dirty_csv(self.file_path, 100)
+        with patch.object(importer, "log_warning") as log_warning:
+            importer.clean_and_import_file(self.file_path, "113S1", self.conn)
+
+        log_warning.assert_not_called()
+        self.assertEqual(self._quarantine(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+import asyncio
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from benchmarks.fake_moi_server import FakeMoiServer
+from benchmarks.synthetic_lvr_land import write_lvr_land_csv
+from ngui.preprocessing import process_real_estate_and_import as importer
+from ngui.preprocessing.season_ledger import STATE_EXTRACTED, STATE_IMPORTED, STATE_LISTED, get_season_states
+from service import fetch_service, ingest_pipeline, season_downloader
+from utils import download_validators
+
+SEASONS = ["112S1", "112S2", "112S3"]
+MEMBERS = ["a_lvr_land_a.csv", "f_lvr_land_b.csv", "a_lvr_land_c.csv"]
+ROWS = 200
+
+
+def build_season_zip(csv_dir: str, seed: int) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i, name in enumerate(MEMBERS):
+            csv_path = os.path.join(csv_dir, name)
+            write_lvr_land_csv(csv_path, ROWS, presale=name.endswith("b.csv"), seed=seed * 10 + i)
+            archive.write(csv_path, name)
+    return buffer.getvalue()
+
+
+class TestIngestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.raw_dir = os.path.join(self.tmp_dir, "raw")
+        self.old_dir = os.path.join(self.tmp_dir, "old")
+        self.db_path = os.path.join(self.tmp_dir, "real_estate.sqlite")
+        csv_dir = os.path.join(self.tmp_dir, "csv")
+        for path in (self.raw_dir, self.old_dir, csv_dir):
+            os.makedirs(path)
+
+        self.server = FakeMoiServer({season: build_season_zip(csv_dir, i) for i, season in enumerate(SEASONS)})
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+        zip_path = lambda season: os.path.join(self.raw_dir, f"{season}.zip")
+        for target, name, value in (
+            (importer, "RAW_DATA_DIR", self.raw_dir),
+            (importer, "OLD_DATA_DIR", self.old_dir),
+            (ingest_pipeline, "RAW_DATA_DIR", self.raw_dir),
+            (ingest_pipeline, "OLD_DATA_DIR", self.old_dir),
+            (ingest_pipeline, "DB_PATH", self.db_path),
+            (ingest_pipeline, "season_zip_path", zip_path),
+            (ingest_pipeline, "season_zip_url", self.server.season_url),
+            (season_downloader, "season_zip_path", zip_path),
+            (season_downloader, "season_zip_url", self.server.season_url),
+            (download_validators, "VALIDATOR_FILE", os.path.join(self.raw_dir, "download_validators.json")),
+        ):
+            patcher = patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _run(self, **kwargs):
+        with patch("builtins.print"):
+            return asyncio.run(ingest_pipeline.run_ingest_pipeline(SEASONS, **kwargs))
+
+    def _row_counts(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return {city: conn.execute(f'SELECT COUNT(*) FROM "{city}"').fetchone()[0] for city in ("臺北", "新北")}
+        finally:
+            conn.close()
+
+    def _season_states(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return {season: entry["state"] for season, entry in get_season_states(conn).items()}
+        finally:
+            conn.close()
+
+    def test_pipeline_downloads_extracts_and_imports(self):
+        report = self._run(extract_workers=2, queue_size=1)
+
+        # 每期 a_lvr_land_a (臺北) 與 f_lvr_land_b (新北預售屋) 需要匯入，c 檔不解壓縮
+        self.assertEqual(report["files"], len(SEASONS) * 2)
+        self.assertEqual(report["rows"], len(SEASONS) * ROWS * 2)
+        self.assertEqual({name: stage["items"] for name, stage in report["stages"].items()},
+                         {"download": 3, "extract": 3, "clean": 6, "import": 6})
+        self.assertIn(report["bottleneck"], ingest_pipeline.STAGES)
+
+        for season in SEASONS:
+            self.assertEqual(sorted(os.listdir(os.path.join(self.old_dir, season))),
+                             ["a_lvr_land_a.csv", "f_lvr_land_b.csv"])
+        self.assertEqual(os.listdir(self.raw_dir), ["download_validators.json"])
+        self.assertEqual(self._season_states(), {season: STATE_IMPORTED for season in SEASONS})
+
+    def test_unchanged_seasons_are_not_reimported(self):
+        self._run()
+        report = self._run()
+
+        self.assertEqual(report["files"], 0)
+        self.assertEqual(report["stages"]["extract"]["items"], 0)
+
+    def test_failed_season_does_not_stop_the_others(self):
+        self.server.seasons["112S2"] = b"not a zip"
+        report = self._run(retry_limit=0)
+
+        self.assertEqual(report["stages"]["extract"]["failed"], 1)
+        self.assertEqual(report["files"], 4)
+        self.assertEqual(self._season_states(),
+                         {"112S1": STATE_IMPORTED, "112S2": STATE_LISTED, "112S3": STATE_IMPORTED})
+
+        # 下次執行時只重新下載、匯入損毀的期別
+        self.server.seasons["112S2"] = self.server.seasons["112S1"]
+        self.server.requests.clear()
+        report = self._run(retry_limit=0)
+        self.assertEqual(report["stages"]["extract"]["items"], 1)
+        self.assertEqual(self._season_states()["112S2"], STATE_IMPORTED)
+
+    def test_failed_write_keeps_file_for_next_run(self):
+        write_file_transaction = importer.write_file_transaction
+
+        def fail_once(conn, pending, filename, *args):
+            if filename == "f_lvr_land_b.csv" and pending[0].startswith("112S2"):
+                raise sqlite3.OperationalError("database is locked")
+            return write_file_transaction(conn, pending, filename, *args)
+
+        with patch.object(ingest_pipeline, "write_file_transaction", fail_once):
+            report = self._run()
+
+        self.assertEqual(report["stages"]["import"]["failed"], 1)
+        self.assertEqual(os.listdir(os.path.join(self.raw_dir, "112S2")), ["f_lvr_land_b.csv"])
+        self.assertNotIn("f_lvr_land_b.csv", os.listdir(os.path.join(self.old_dir, "112S2")))
+        self.assertEqual(self._season_states()["112S2"], STATE_EXTRACTED)
+
+        # 下次執行時重新匯入留下的檔案
+        report = self._run()
+        self.assertEqual(report["files"], 1)
+        self.assertEqual(self._season_states(), {season: STATE_IMPORTED for season in SEASONS})
+        self.assertEqual(report["rows"], ROWS)
+
+    def test_only_written_cities_defer_indexes(self):
+        deferred = []
+        deferred_indexes = ingest_pipeline.deferred_indexes
+
+        def record(conn, tables, *args):
+            deferred.extend(tables)
+            return deferred_indexes(conn, tables, *args)
+
+        with patch.object(ingest_pipeline, "deferred_indexes", record):
+            self._run()
+
+        # 只有這次寫入的縣市 (臺北、新北) 會刪除再重建索引，其他縣市的索引不受影響
+        self.assertEqual(sorted(deferred), ["新北", "臺北"])
+
+    def test_files_are_streamed_in_chunks(self):
+        # chunk 比檔案小、每個檔案最多暫存一個 chunk：清洗與寫入交錯進行，結果與整檔匯入相同
+        with patch.object(importer, "IMPORT_CHUNK_SIZE", 30), patch.object(ingest_pipeline, "STREAM_QUEUE_CHUNKS", 1):
+            report = self._run(clean_workers=2)
+
+        self.assertEqual(report["files"], len(SEASONS) * 2)
+        self.assertEqual(report["rows"], len(SEASONS) * ROWS * 2)
+        self.assertEqual(self._row_counts(), {"臺北": len(SEASONS) * ROWS, "新北": len(SEASONS) * ROWS})
+        self.assertEqual(self._season_states(), {season: STATE_IMPORTED for season in SEASONS})
+
+    def test_failed_chunk_rolls_back_the_file(self):
+        clean_chunk_job = importer.clean_chunk_job
+        calls = {"112S2": 0}
+
+        def fail_second_chunk(chunk, file_path, city):
+            if "112S2" in file_path and file_path.endswith("a_lvr_land_a.csv"):
+                calls["112S2"] += 1
+                if calls["112S2"] == 2:
+                    raise ValueError("清洗失敗")
+            return clean_chunk_job(chunk, file_path, city)
+
+        with patch.object(importer, "IMPORT_CHUNK_SIZE", 50), patch.object(ingest_pipeline, "STREAM_QUEUE_CHUNKS", 1), \
+                patch.object(ingest_pipeline, "clean_chunk_job", fail_second_chunk):
+            report = self._run()
+
+        # 已寫入的第一個 chunk 隨交易 rollback，檔案留在 RAW_DATA_DIR
+        self.assertEqual(report["stages"]["clean"]["failed"], 1)
+        self.assertEqual(report["stages"]["import"]["failed"], 1)
+        self.assertEqual(report["rows"], (len(SEASONS) * 2 - 1) * ROWS)
+        self.assertEqual(os.listdir(os.path.join(self.raw_dir, "112S2")), ["a_lvr_land_a.csv"])
+        self.assertEqual(self._season_states()["112S2"], STATE_EXTRACTED)
+
+    def test_update_path_imports_history_through_pipeline(self):
+        json_path = os.path.join(self.raw_dir, "fetch_options_route.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"historySeason_id": {season: season for season in SEASONS}}, f)
+
+        with patch("builtins.print"):
+            report = asyncio.run(fetch_service.ingest_history_seasons(json_path))
+
+        self.assertEqual(report["files"], len(SEASONS) * 2)
+        self.assertEqual(self._season_states(), {season: STATE_IMPORTED for season in SEASONS})
+
+    def test_zip_ingest_reads_members_without_extracting(self):
+        with patch.object(ingest_pipeline, "ZIP_INGEST_ENABLED", True):
+            report = self._run()
+
+        self.assertEqual(report["files"], len(SEASONS) * 2)
+        for season in SEASONS:
+            self.assertEqual(os.listdir(os.path.join(self.old_dir, season)), [f"{season}.zip"])
+
+
+if __name__ == "__main__":
+    unittest.main()
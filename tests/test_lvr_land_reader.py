@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from benchmarks.synthetic_lvr_land import build_lvr_land_frame
+from ngui.preprocessing.process_real_estate_and_import import clean_chunk, iter_lvr_land_csv
+
+ROWS = 1050
+BAD_ROWS = [199, 200, 401, 1049]
+
+
+class TestChunkedReader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, "a_lvr_land_a.csv")
+
+        df = build_lvr_land_frame(ROWS, seed=3)
+        df.loc[BAD_ROWS, '總價元'] = "abc"
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write(",".join(df.columns) + "\n")
+            self.english_header = [f"column {i}" for i in range(len(df.columns))]
+            f.write(",".join(self.english_header) + "\n")
+            df.to_csv(f, header=False, index=False)
+
+    def test_chunks_match_single_read(self):
+        single = list(iter_lvr_land_csv(self.path, chunksize=ROWS * 2))
+        chunks = list(iter_lvr_land_csv(self.path, chunksize=200))
+
+        self.assertEqual(len(single), 1)
+        self.assertEqual([len(chunk) for chunk in chunks], [200] * 5 + [50])
+        pd.testing.assert_frame_equal(pd.concat(chunks), single[0])
+
+        # 英文欄名列只在檔案開頭略過一次，之後每個 chunk 的第一列都是資料
+        self.assertEqual(len(single[0]), ROWS)
+        self.assertFalse(single[0].isin(self.english_header).any().any())
+
+    def test_row_index_is_continuous_across_chunks(self):
+        chunks = list(iter_lvr_land_csv(self.path, chunksize=200))
+        expected_start = 0
+        for chunk in chunks:
+            self.assertEqual(list(chunk.index), list(range(expected_start, expected_start + len(chunk))))
+            expected_start += len(chunk)
+
+        # 隔離紀錄的 row_index (即 format_row 的 idx) 以整個檔案的資料列計算，不會在每個 chunk 重新從 0 開始
+        issues = []
+        for chunk in chunks:
+            clean_chunk(chunk, self.path, "臺北", issues)
+        records = pd.concat(issues)
+        self.assertEqual(sorted(records.loc[records["column"] == "總價元", "row_index"]), BAD_ROWS)
+
+
+if __name__ == "__main__":
+    unittest.main()
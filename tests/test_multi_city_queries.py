@@ -0,0 +1,144 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from benchmarks.synthetic_lvr_land import write_lvr_land_csv
+from ngui.components import main_sql
+from ngui.components.sqlite_client import SqliteClient
+from ngui.preprocessing.process_real_estate_and_import import clean_and_import_file
+
+CITIES = {"a": "臺北", "f": "新北", "b": "臺中"}
+
+
+class SlowSqliteClient(SqliteClient):
+    """
+    模擬遠端查詢延遲：每次查詢等待 delays[表名] 秒，failures 中的表直接拋出錯誤。
+    """
+    def __init__(self, db_path: str, delays: dict, failures=()):
+        super().__init__(db_path)
+        self.delays = delays
+        self.failures = set(failures)
+        self.calls, self.active, self.max_active = [], 0, 0
+        self._lock = threading.Lock()
+
+    def run(self, sql, params=None):
+        table = next(city for city in CITIES.values() if f'"{city}"' in sql)
+        with self._lock:
+            self.calls.append(table)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if table in self.failures:
+                raise RuntimeError("connection reset")
+            time.sleep(self.delays.get(table, 0))
+            return super().run(sql, params)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class RemoteClient:
+    """
+    不是 SqliteClient 的包裝，讓 fetch_frame 以 Supabase 的方式分頁查詢。
+    """
+    def __init__(self, client: SqliteClient):
+        self.client = client
+
+    def table(self, name: str):
+        return self.client.table(name)
+
+
+class TestMultiCityQueries(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.db_path = os.path.join(cls.tmp_dir, "real_estate.sqlite")
+        conn = sqlite3.connect(cls.db_path)
+        for code, city in CITIES.items():
+            file_path = os.path.join(cls.tmp_dir, f"{code}_lvr_land_a.csv")
+            write_lvr_land_csv(file_path, 1000, seed=len(code))
+            clean_and_import_file(file_path, "113S1", conn)
+        conn.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def _query(self, client, **kwargs):
+        with patch.object(main_sql, "db", client), patch.object(main_sql, "USE_UNIFIED_SCHEMA", False):
+            return main_sql.fetch_city_frames(
+                list(CITIES.values()), "建物總價萬元", lambda query: query.eq("交易年", "2020"), "測試", **kwargs
+            )
+
+    def test_cities_are_queried_concurrently(self):
+        client = SlowSqliteClient(self.db_path, {city: 0.3 for city in CITIES.values()})
+        started = time.perf_counter()
+        frames = self._query(client)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(list(frames), list(CITIES.values()))
+        # 逐一查詢需要 0.9 秒，同時查詢約為最慢的一個縣市
+        self.assertLess(elapsed, 0.7)
+
+    def test_failed_city_returns_partial_results(self):
+        frames = self._query(SlowSqliteClient(self.db_path, {}, failures=["新北"]))
+        self.assertEqual(list(frames), ["臺北", "臺中"])
+
+    def test_slow_city_times_out(self):
+        client = SlowSqliteClient(self.db_path, {"臺中": 1.0})
+        started = time.perf_counter()
+        frames = self._query(client, timeout=0.3)
+
+        self.assertLess(time.perf_counter() - started, 0.8)
+        self.assertEqual(list(frames), ["臺北", "新北"])
+
+    def _query_paged(self, client, workers: int, **kwargs):
+        pool = ThreadPoolExecutor(max_workers=workers)
+        self.addCleanup(pool.shutdown)
+        with patch.object(main_sql, "db", RemoteClient(client)), patch.object(main_sql, "USE_UNIFIED_SCHEMA", False), \
+                patch.object(main_sql, "QUERY_PAGE_SIZE", 100), patch.object(main_sql, "_city_pool", pool):
+            return main_sql.fetch_city_frames(list(CITIES.values()), "id", lambda query: query, "測試", **kwargs)
+
+    def test_pages_do_not_multiply_concurrency(self):
+        client = SlowSqliteClient(self.db_path, {city: 0.02 for city in CITIES.values()})
+        frames = self._query_paged(client, workers=2)
+
+        self.assertEqual({city: len(df) for city, df in frames.items()}, {city: 1000 for city in CITIES.values()})
+        # 各縣市內的分頁依序取回，同時進行的請求數不超過縣市執行緒池的大小
+        self.assertEqual(client.max_active, 2)
+
+    def test_timeout_cancels_queued_cities_and_stops_paging(self):
+        client = SlowSqliteClient(self.db_path, {city: 0.1 for city in CITIES.values()})
+        frames = self._query_paged(client, workers=1, timeout=0.35, queue_timeout=0.35)
+        time.sleep(0.3)
+
+        self.assertEqual(frames, {})
+        # 排隊逾時的縣市被取消；執行中的縣市在逾時後不再取下一頁 (完整取回需 11 次查詢)
+        self.assertEqual(set(client.calls), {"臺北"})
+        self.assertLess(len(client.calls), 7)
+
+    def test_queue_wait_does_not_count_towards_timeout(self):
+        client = SlowSqliteClient(self.db_path, {city: 0.25 for city in CITIES.values()})
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        with patch.object(main_sql, "_city_pool", pool):
+            frames = self._query(client, timeout=0.4)
+
+        # 依序執行共 0.75 秒 (超過 timeout)：每個縣市從開始執行起算都在 0.4 秒內完成
+        self.assertEqual(list(frames), list(CITIES.values()))
+
+    def test_charts_render_without_failed_city(self):
+        client = SlowSqliteClient(self.db_path, {}, failures=["臺中"])
+        with patch.object(main_sql, "db", client), patch.object(main_sql, "USE_UNIFIED_SCHEMA", False):
+            df = main_sql.query_multi_city_3d_data(list(CITIES.values()), "2020")
+        self.assertEqual(sorted(df["縣市"].unique()), sorted(["臺北", "新北"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
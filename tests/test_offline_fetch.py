@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from benchmarks.fake_moi_server import FakeMoiServer, synthetic_seasons
+from utils.open_data_page import parse_history_options, parse_notice_text
+from utils.notice_parser import parse_notice_to_dict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestFakeMoiSite(unittest.TestCase):
+    def test_synthetic_page_lists_seasons_and_notice(self):
+        server = FakeMoiServer({season: b"" for season in synthetic_seasons(5)})
+        page = server.render_open_data_html()
+
+        self.assertEqual(list(parse_history_options(page)), ["113S4", "113S3", "113S2", "113S1", "112S4"])
+        self.assertIn("登記日期", parse_notice_to_dict(parse_notice_text(page)))
+
+
+class TestOfflineFetchAndImport(unittest.TestCase):
+    def test_benchmark_runs_without_network(self):
+        # 在子行程執行：benchmark 需要在匯入專案模組前設定資料目錄與下載站網址
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_fetch_and_import", "--seasons", "1", "--rows", "20"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=300,
+        )
+        self.assertEqual(result.returncode, 0, result.stdout[-2000:] + result.stderr[-2000:])
+        self.assertIn("公告更新、檔案未變更", result.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
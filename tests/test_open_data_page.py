@@ -0,0 +1,243 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from api.routes.real_estate import fetch_latest_notice_route, fetch_options_route
+from benchmarks.fake_moi_server import FakeMoiServer
+from utils import open_data_page
+from utils.open_data_page import open_data_session, parse_history_options, parse_notice_text
+
+NOTICE = "資料內容：登記日期 114年6月11日至 114年6月20日之買賣案件，及訂約日期 114年5月11日至 114年5月20日之租賃案件"
+
+OPEN_DATA_HTML = f"""
+<html><body>
+<div id="tab_opendata_active_content">
+  <p>本期下載</p>
+  <span class="text-danger">{NOTICE}</span>
+</div>
+<div id="tab_opendata_history_content">
+  <select id="historySeason_id">
+    <option value="">請選擇</option>
+    <option value="114S1">114年第1季</option>
+    <option value="113S4"> 113年第4季 </option>
+  </select>
+</div>
+</body></html>
+"""
+
+# 內容由 JavaScript 產生時，靜態 HTML 只有空的容器
+SCRIPT_ONLY_HTML = """
+<html><body>
+<div id="tab_opendata_active_content"><span class="text-danger"></span></div>
+<select id="historySeason_id"></select>
+<script>render()</script>
+</body></html>
+"""
+
+
+class TestParseOpenDataPage(unittest.TestCase):
+    def test_parse_notice_text(self):
+        self.assertEqual(parse_notice_text(OPEN_DATA_HTML), NOTICE)
+        self.assertIsNone(parse_notice_text(SCRIPT_ONLY_HTML))
+
+    def test_parse_history_options(self):
+        self.assertEqual(parse_history_options(OPEN_DATA_HTML), {"114S1": "114年第1季", "113S4": "113年第4季"})
+        self.assertEqual(parse_history_options(SCRIPT_ONLY_HTML), {})
+
+
+class TestStaticFastPath(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeMoiServer().start()
+        self.url = f"{self.server.base_url}/DownloadOpenData"
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _run(self, coroutine):
+        with patch("builtins.print"):
+            return asyncio.run(coroutine)
+
+    def test_static_html_does_not_launch_browser(self):
+        self.server.open_data_html = OPEN_DATA_HTML
+        with patch.object(fetch_latest_notice_route, "_notice_text_with_playwright", AsyncMock()) as notice_browser, \
+                patch.object(fetch_options_route, "_history_options_with_playwright", AsyncMock()) as options_browser:
+            self.assertEqual(self._run(fetch_latest_notice_route.fetch_notice_text(self.url)), NOTICE)
+            self.assertEqual(self._run(fetch_options_route.fetch_history_options(self.url)),
+                             {"114S1": "114年第1季", "113S4": "113年第4季"})
+
+        notice_browser.assert_not_called()
+        options_browser.assert_not_called()
+
+    def test_falls_back_to_playwright_when_static_html_lacks_data(self):
+        self.server.open_data_html = SCRIPT_ONLY_HTML
+        with patch.object(fetch_latest_notice_route, "_notice_text_with_playwright",
+                          AsyncMock(return_value=NOTICE)) as notice_browser, \
+                patch.object(fetch_options_route, "_history_options_with_playwright",
+                             AsyncMock(return_value={"114S1": "114年第1季"})) as options_browser:
+            self.assertEqual(self._run(fetch_latest_notice_route.fetch_notice_text(self.url)), NOTICE)
+            self.assertEqual(self._run(fetch_options_route.fetch_history_options(self.url)), {"114S1": "114年第1季"})
+
+        notice_browser.assert_awaited_once_with(self.url)
+        options_browser.assert_awaited_once_with(self.url)
+
+
+class FakeOption:
+    def __init__(self, value, text):
+        self.value, self.text = value, text
+
+    async def get_attribute(self, name):
+        return self.value
+
+    async def inner_text(self):
+        return self.text
+
+
+class FakeLocator:
+    def __init__(self, page, selector):
+        self.page, self.selector = page, selector
+
+    async def inner_text(self, timeout=None):
+        return NOTICE
+
+    async def click(self):
+        self.page.clicks.append(self.selector)
+
+    async def wait_for(self, timeout=None):
+        pass
+
+    def locator(self, selector):
+        return self
+
+    async def element_handles(self):
+        return [FakeOption("", "請選擇"), FakeOption("114S1", " 114年第1季 ")]
+
+
+class FakeRoute:
+    def __init__(self, resource_type):
+        self.request = type("Request", (), {"resource_type": resource_type})()
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "abort"
+
+    async def continue_(self):
+        self.outcome = "continue"
+
+
+class FakePage:
+    def __init__(self, fail_goto=False):
+        self.gotos, self.clicks, self.handlers = [], [], []
+        self.fail_goto = fail_goto
+
+    async def route(self, pattern, handler):
+        self.handlers.append(handler)
+
+    async def goto(self, url, timeout=None):
+        self.gotos.append(url)
+        if self.fail_goto:
+            raise TimeoutError("頁面載入逾時")
+
+    def locator(self, selector):
+        return FakeLocator(self, selector)
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.launches, self.closes, self.pages, self.stopped = 0, 0, [], False
+        self.goto_failures = 0
+        self.chromium = self
+
+    async def start(self):
+        return self
+
+    async def launch(self, headless=True):
+        self.launches += 1
+        return self
+
+    async def new_page(self):
+        self.pages.append(FakePage(fail_goto=self.goto_failures > 0))
+        self.goto_failures -= 1
+        return self.pages[-1]
+
+    async def close(self):
+        self.closes += 1
+
+    async def stop(self):
+        self.stopped = True
+
+
+class TestSharedBrowserSession(unittest.TestCase):
+    def setUp(self):
+        self.playwright = FakePlaywright()
+        patcher = patch.object(open_data_page, "async_playwright", lambda: self.playwright)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_browser_and_page_load_for_both_scrapes(self):
+        url = open_data_page.OPEN_DATA_URL
+
+        async def update_run():
+            async with open_data_session() as session:
+                notice = await fetch_latest_notice_route._notice_text_with_playwright(url)
+                options = await fetch_options_route._history_options_with_playwright(url)
+                return notice, options, session.timings
+
+        notice, options, timings = asyncio.run(update_run())
+
+        self.assertEqual((notice, options), (NOTICE, {"114S1": "114年第1季"}))
+        self.assertEqual(self.playwright.launches, 1)
+        page = self.playwright.pages[0]
+        self.assertEqual(page.gotos, [url])
+        self.assertEqual(page.clicks, [open_data_page.HISTORY_TAB_SELECTOR])
+        self.assertTrue(self.playwright.stopped)
+        self.assertEqual(set(timings), {"啟動", "載入頁面", "本期公告", "歷史期別"})
+
+    def test_failed_page_load_closes_browser_before_retry(self):
+        self.playwright.goto_failures = 1
+
+        async def update_run():
+            session = open_data_page.OpenDataBrowser(open_data_page.OPEN_DATA_URL)
+            with self.assertRaises(TimeoutError):
+                await session.notice_text()
+            self.assertEqual((self.playwright.launches, self.playwright.closes), (1, 1))
+            self.assertTrue(self.playwright.stopped)
+
+            notice = await session.notice_text()
+            # 重試只留下一個開啟中的瀏覽器
+            self.assertEqual((self.playwright.launches, self.playwright.closes), (2, 1))
+            await session.close()
+            return notice
+
+        self.assertEqual(asyncio.run(update_run()), NOTICE)
+        self.assertEqual(self.playwright.closes, 2)
+
+    def test_static_resources_are_blocked(self):
+        asyncio.run(fetch_options_route._history_options_with_playwright(open_data_page.OPEN_DATA_URL))
+
+        handler = self.playwright.pages[0].handlers[0]
+        outcomes = {}
+        for resource_type in ("document", "script", "image", "font", "stylesheet"):
+            route = FakeRoute(resource_type)
+            asyncio.run(handler(route))
+            outcomes[resource_type] = route.outcome
+        self.assertEqual(outcomes, {"document": "continue", "script": "continue", "image": "abort",
+                                    "font": "abort", "stylesheet": "abort"})
+
+    def test_static_html_is_fetched_once_per_session(self):
+        server = FakeMoiServer().start()
+        self.addCleanup(server.stop)
+        server.open_data_html = OPEN_DATA_HTML
+        url = f"{server.base_url}/DownloadOpenData"
+
+        async def update_run():
+            async with open_data_session(url):
+                await fetch_latest_notice_route.fetch_notice_text(url)
+                await fetch_options_route.fetch_history_options(url)
+
+        asyncio.run(update_run())
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(self.playwright.launches, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from benchmarks.synthetic_lvr_land import write_lvr_land_csv
+from ngui.preprocessing import process_real_estate_and_import as importer
+
+FILES = ["a_lvr_land_a.csv", "a_lvr_land_b.csv", "f_lvr_land_a.csv", "f_lvr_land_b.csv"]
+ROWS = 700
+
+
+class TestParallelImport(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        # chunk 比檔案小，每個檔案分成多個 chunk 串流給 writer
+        patcher = patch.object(importer, "IMPORT_CHUNK_SIZE", 200)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _import(self, name: str, workers: int, broken: str = None) -> str:
+        base_dir = os.path.join(self.tmp_dir, name)
+        raw_dir, old_dir = os.path.join(base_dir, "raw"), os.path.join(base_dir, "old")
+        season_dir = os.path.join(raw_dir, "113S1")
+        os.makedirs(season_dir)
+        os.makedirs(old_dir)
+        for i, filename in enumerate(FILES):
+            file_path = os.path.join(season_dir, filename)
+            if filename == broken:
+                with open(file_path, "w", encoding="utf-8") as f:
+                    f.write("欄位\nfield\n1\n")
+            else:
+                write_lvr_land_csv(file_path, ROWS, presale=filename.endswith("b.csv"), seed=i)
+
+        db_path = os.path.join(base_dir, "real_estate.sqlite")
+        with patch.object(importer, "RAW_DATA_DIR", raw_dir), patch.object(importer, "OLD_DATA_DIR", old_dir), \
+                patch.object(importer, "DB_PATH", db_path), patch("builtins.print"):
+            stats = importer.apply_clean_and_import_file(workers=workers)
+        self.assertEqual(stats["files"], len(FILES))
+        return db_path
+
+    def _contents(self, db_path: str):
+        conn = sqlite3.connect(db_path)
+        try:
+            tables = {city: conn.execute(f'SELECT * FROM "{city}" ORDER BY id').fetchall() for city in ("臺北", "新北")}
+            ledger = conn.execute(
+                "SELECT filename, content_hash, row_count FROM import_ledger ORDER BY filename").fetchall()
+            return tables, ledger
+        finally:
+            conn.close()
+
+    def test_parallel_matches_serial(self):
+        serial_tables, serial_ledger = self._contents(self._import("serial", workers=1))
+        parallel_tables, parallel_ledger = self._contents(self._import("parallel", workers=2))
+
+        self.assertEqual(sum(len(rows) for rows in serial_tables.values()), ROWS * len(FILES))
+        self.assertEqual(parallel_tables, serial_tables)
+        self.assertEqual(parallel_ledger, serial_ledger)
+
+    def test_failed_file_does_not_block_the_others(self):
+        tables, ledger = self._contents(self._import("broken", workers=2, broken="a_lvr_land_b.csv"))
+
+        self.assertEqual([row[0] for row in ledger], ["a_lvr_land_a.csv", "f_lvr_land_a.csv", "f_lvr_land_b.csv"])
+        self.assertEqual(sum(len(rows) for rows in tables.values()), ROWS * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
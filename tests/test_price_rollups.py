@@ -0,0 +1,123 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_lvr_land import write_lvr_land_csv
+from ngui.components import main_sql
+from ngui.components.sqlite_client import SqliteClient
+from ngui.preprocessing.price_rollups import (
+    AGE_ROLLUP_TABLE, PRICE_BAND_UNDER_100M, PRICE_BAND_ZERO, ROLLUP_PENDING_TABLE, ROLLUP_TABLE,
+    rebuild_city_rollups, refresh_price_rollups, rollup_quantile, sketch_bucket,
+)
+from ngui.preprocessing.process_real_estate_and_import import clean_and_import_file
+
+CITIES = ["臺北", "新北"]
+
+
+class TestPriceRollups(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.db_path = os.path.join(cls.tmp_dir, "real_estate.sqlite")
+        conn = sqlite3.connect(cls.db_path)
+        for code, city in (("a", "臺北"), ("f", "新北")):
+            file_path = os.path.join(cls.tmp_dir, f"{code}_lvr_land_a.csv")
+            write_lvr_land_csv(file_path, 5000, seed=len(city))
+            clean_and_import_file(file_path, "113S1", conn)
+        refresh_price_rollups(conn, CITIES)
+        conn.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def setUp(self):
+        patcher = patch.object(main_sql, "db", SqliteClient(self.db_path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _both(self, func, *args, **kwargs):
+        with patch.object(main_sql, "USE_PRICE_ROLLUPS", True):
+            rollup = func(*args, **kwargs)
+        with patch.object(main_sql, "USE_PRICE_ROLLUPS", False):
+            raw = func(*args, **kwargs)
+        self.assertFalse(raw.empty)
+        return rollup.reset_index(drop=True), raw.reset_index(drop=True)
+
+    def test_avg_price_matches_raw_rows(self):
+        rollup, raw = self._both(main_sql.query_avg_price, "臺北", "房地", "2020", None)
+        self.assertEqual(rollup["ym"].tolist(), raw["ym"].tolist())
+        np.testing.assert_allclose(rollup["avg_price_million"], raw["avg_price_million"], atol=1)
+
+    def test_multi_year_price_matches_raw_rows(self):
+        rollup, raw = self._both(main_sql.query_multi_year_price, "新北", None, ["2019", "2020"], "中古屋")
+        self.assertEqual(rollup[["year", "month"]].values.tolist(), raw[["year", "month"]].values.tolist())
+        np.testing.assert_allclose(rollup["avg_price_million"], raw["avg_price_million"], atol=1)
+
+    def test_price_with_age_matches_raw_rows(self):
+        for kwargs, rtol in (({}, 1e-9), ({"remove_zero": True, "limit_under_100m": True}, 1e-9),
+                             ({"use_median": True}, 0.02)):
+            rollup, raw = self._both(main_sql.query_multi_city_price_with_age, CITIES, "2020", None, None, **kwargs)
+            keys = ["city", "month", "house_age"]
+            merged = pd.merge(rollup, raw, on=keys, suffixes=("_rollup", "_raw"))
+            self.assertEqual(len(merged), len(raw))
+            self.assertEqual(len(rollup), len(raw))
+            np.testing.assert_allclose(merged["avg_price_million_rollup"], merged["avg_price_million_raw"], rtol=rtol)
+
+    def test_only_imported_months_are_refreshed(self):
+        db_path = os.path.join(self.tmp_dir, "incremental.sqlite")
+        shutil.copy(self.db_path, db_path)
+        conn = sqlite3.connect(db_path)
+        self.addCleanup(conn.close)
+        # 新北沒有匯入新資料：彙總列不應被重算
+        conn.execute(f'UPDATE "{ROLLUP_TABLE}" SET count = -1 WHERE "縣市" = ?', ("新北",))
+        conn.commit()
+
+        # 匯入一個新檔案後再以不同內容修訂，修訂前、後資料所在的月份都要重算
+        file_path = os.path.join(self.tmp_dir, "incremental", "a_lvr_land_b.csv")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        for seed in (7, 8):
+            write_lvr_land_csv(file_path, 40, presale=True, seed=seed)
+            clean_and_import_file(file_path, "113S2", conn)
+            refresh_price_rollups(conn, CITIES)
+
+        self.assertEqual(conn.execute(f'SELECT COUNT(*) FROM "{ROLLUP_PENDING_TABLE}"').fetchone()[0], 0)
+        self.assertEqual({row[0] for row in conn.execute(
+            f'SELECT DISTINCT count FROM "{ROLLUP_TABLE}" WHERE "縣市" = ?', ("新北",))}, {-1})
+
+        # 只重算部分月份的結果與重建整個縣市相同
+        def snapshot(table):
+            return pd.read_sql_query(
+                f'SELECT * FROM "{table}" WHERE "縣市" = ? ORDER BY "交易年", "交易月", "分類", "交易標的", "屋況", '
+                f'{"房齡, " if table == AGE_ROLLUP_TABLE else ""}price_band', conn, params=("臺北",))
+
+        incremental = {table: snapshot(table) for table in (ROLLUP_TABLE, AGE_ROLLUP_TABLE)}
+        rebuild_city_rollups(conn, "臺北")
+        for table, frame in incremental.items():
+            pd.testing.assert_frame_equal(frame, snapshot(table))
+
+    def test_sketch_median_is_close_to_exact_median(self):
+        prices = np.random.default_rng(0).lognormal(7, 1, 1001).round(1)
+        buckets, counts = np.unique(sketch_bucket(prices), return_counts=True)
+        halves = [dict(zip(buckets[i::2].astype(str).tolist(), counts[i::2].tolist())) for i in (0, 1)]
+        rollups = pd.DataFrame({
+            "key": ["a", "a", "b"],
+            "price_band": [PRICE_BAND_UNDER_100M, PRICE_BAND_UNDER_100M, PRICE_BAND_ZERO],
+            "count": [sum(halves[0].values()), sum(halves[1].values()), 3],
+            "sketch": [json.dumps(halves[0]), json.dumps(halves[1]), "{}"],
+        })
+
+        medians = rollup_quantile(rollups, ["key"]).set_index("key")["quantile"]
+        self.assertAlmostEqual(medians["a"] / np.median(prices), 1, delta=0.01)
+        self.assertEqual(medians["b"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
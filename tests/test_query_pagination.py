@@ -0,0 +1,92 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from benchmarks.synthetic_lvr_land import write_lvr_land_csv
+from ngui.components import main_sql
+from ngui.components.sqlite_client import SqliteClient
+from ngui.preprocessing.process_real_estate_and_import import clean_and_import_file
+from tests.test_city_indexes import RecordingSqliteClient
+
+
+class CappedSqliteClient(RecordingSqliteClient):
+    """
+    模擬 PostgREST 的 max-rows：每次回應最多 max_rows 筆，總筆數查詢不受限。
+    """
+    def __init__(self, db_path: str, max_rows: int):
+        super().__init__(db_path)
+        self.max_rows = max_rows
+
+    def run(self, sql, params=None):
+        rows = super().run(sql, params)
+        return rows if sql.startswith("SELECT COUNT") else rows[:self.max_rows]
+
+
+class TestQueryPagination(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.db_path = os.path.join(cls.tmp_dir, "real_estate.sqlite")
+        conn = sqlite3.connect(cls.db_path)
+        file_path = os.path.join(cls.tmp_dir, "a_lvr_land_a.csv")
+        write_lvr_land_csv(file_path, 2000, seed=1)
+        clean_and_import_file(file_path, "113S1", conn)
+        conn.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def _fetch(self, client, **kwargs):
+        with patch.object(main_sql, "db", client):
+            return main_sql.fetch_frame("臺北", "id, 建物總價萬元", lambda query: query.gt("建物總價萬元", 0), **kwargs)
+
+    def test_pages_are_fetched_concurrently_and_reassembled_in_order(self):
+        full = self._fetch(SqliteClient(self.db_path))
+        client = RecordingSqliteClient(self.db_path)
+        paged = self._fetch(client, page_size=300, workers=3)
+
+        self.assertGreater(len(full), 300)
+        self.assertEqual(paged["id"].tolist(), sorted(full["id"].tolist()))
+        pages = [sql for sql, _ in client.queries if "LIMIT" in sql]
+        self.assertEqual(len(pages), -(-len(full) // 300))
+        self.assertEqual(sum(sql.startswith("SELECT COUNT") for sql, _ in client.queries), 1)
+
+    def test_pages_share_one_thread_pool(self):
+        threads = set()
+
+        class ThreadRecordingClient(RecordingSqliteClient):
+            def run(self, sql, params=None):
+                threads.add(threading.current_thread())
+                return super().run(sql, params)
+
+        for _ in range(3):
+            self._fetch(ThreadRecordingClient(self.db_path), page_size=300, workers=2)
+
+        # 第一頁在呼叫端的執行緒取回，其餘頁都在共用的分頁執行緒池中執行，不會每次查詢建立新的執行緒
+        page_threads = threads - {threading.current_thread()}
+        self.assertTrue(page_threads)
+        self.assertLessEqual(page_threads, set(main_sql._page_pool._threads))
+
+    def test_server_row_cap_smaller_than_page_size(self):
+        truncated = CappedSqliteClient(self.db_path, max_rows=250)
+        with patch.object(main_sql, "db", truncated):
+            single = main_sql.fetch_frame("臺北", "id", page_size=0)
+        self.assertEqual(len(single), 250)
+
+        paged = self._fetch(CappedSqliteClient(self.db_path, max_rows=250), page_size=1000)
+        self.assertEqual(len(paged), len(self._fetch(SqliteClient(self.db_path))))
+        self.assertTrue(paged["id"].is_unique)
+
+    def test_sqlite_backend_is_not_paged_by_default(self):
+        client = RecordingSqliteClient(self.db_path)
+        self._fetch(client)
+        self.assertEqual(len(client.queries), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from benchmarks.synthetic_lvr_land import write_lvr_land_csv
+from ngui.components import main_sql
+from ngui.preprocessing.process_real_estate_and_import import clean_and_import_file
+from tests.test_city_indexes import RecordingSqliteClient
+
+
+class TestQueryPushdown(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.db_path = os.path.join(cls.tmp_dir, "real_estate.sqlite")
+        conn = sqlite3.connect(cls.db_path)
+        file_path = os.path.join(cls.tmp_dir, "a_lvr_land_a.csv")
+        write_lvr_land_csv(file_path, 3000, seed=3)
+        clean_and_import_file(file_path, "113S1", conn)
+        cls.full = pd.read_sql('SELECT * FROM "臺北" WHERE "交易年" = \'2020\'', conn)
+        conn.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def setUp(self):
+        self.client = RecordingSqliteClient(self.db_path)
+        patcher = patch.object(main_sql, "db", self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_distribution_projects_columns_and_filters_in_sql(self):
+        df = main_sql.query_distribution_data("2020", "臺北", remove_zero=True, limit_under_100m=True)
+
+        sql, params = self.client.queries[-1]
+        self.assertNotIn("*", sql)
+        self.assertIn('"建物總價萬元" IS NOT NULL', sql)
+        self.assertIn('"建物總價萬元" > ?', sql)
+        self.assertIn('"建物總價萬元" < ?', sql)
+
+        # 與原本在 pandas 過濾的結果相同
+        price = pd.to_numeric(self.full["建物總價萬元"], errors="coerce")
+        expected = self.full[price.notna() & (price > 0) & (price < 10000)]
+        self.assertEqual(len(df), len(expected))
+        self.assertEqual(sorted(df["price"].tolist()), sorted(price[expected.index].tolist()))
+
+        # 傳輸的資料量 (JSON) 不到原本 select("*") 的一半
+        projected = len(json.dumps(df.drop(columns="price").to_dict("records"), ensure_ascii=False, default=str))
+        everything = len(json.dumps(self.full.to_dict("records"), ensure_ascii=False, default=str))
+        self.assertLess(projected, everything / 2)
+
+    def test_chart_columns_are_present(self):
+        df = main_sql.query_distribution_data("2020", "臺北")
+        for column in ("建物坪數", "建物總價萬元", "鄉鎮市區", "建物型態", "建物每坪單價萬元", "主要用途", "房齡", "屋況"):
+            self.assertIn(column, df.columns)
+
+    def test_price_with_age_pushes_age_and_price_filters(self):
+        with patch.object(main_sql, "USE_PRICE_ROLLUPS", False):
+            df = main_sql.query_multi_city_price_with_age(["臺北"], "2020", None, None, remove_zero=True)
+
+        self.assertFalse(df.empty)
+        sql, _ = self.client.queries[-1]
+        self.assertIn('"房齡" >= ?', sql)
+        self.assertIn('"建物總價萬元" > ?', sql)
+        self.assertNotIn('"交易標的", ', sql.split(" FROM ")[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from benchmarks.fake_moi_server import FakeMoiServer
+from service import season_downloader
+
+SEASONS = [f"{year}S{quarter}" for year in (111, 112) for quarter in (1, 2, 3, 4)]
+
+
+class TestSeasonDownloader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.server = FakeMoiServer({season: season.encode() * 1000 for season in SEASONS}).start()
+        for name, value in (
+            ("season_zip_url", self.server.season_url),
+            ("season_zip_path", lambda season: os.path.join(self.tmp_dir, f"{season}.zip")),
+            ("BACKOFF_BASE", 0.01),
+        ):
+            patcher = patch.object(season_downloader, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def _download(self, seasons, **kwargs):
+        with patch("builtins.print"):
+            return asyncio.run(season_downloader.download_seasons(seasons, **kwargs))
+
+    def test_downloads_run_concurrently(self):
+        self.server.latency = 0.2
+        started = time.perf_counter()
+        report = self._download(SEASONS, concurrency=4)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(sorted(report["succeeded"]), sorted(SEASONS))
+        self.assertEqual(report["bytes"], sum(len(season) * 1000 for season in SEASONS))
+        # 8 期、每期 0.2 秒延遲，4 個並行約 0.4 秒；逐一下載需 1.6 秒
+        self.assertLess(elapsed, 1.2)
+        for season in SEASONS:
+            with open(os.path.join(self.tmp_dir, f"{season}.zip"), "rb") as f:
+                self.assertEqual(f.read(), season.encode() * 1000)
+
+    def test_transient_errors_are_retried(self):
+        self.server.fail_counts = {"112S1": 2}
+        report = self._download(["112S1"], retry_limit=3)
+
+        result = report["results"][0]
+        self.assertTrue(result["success"])
+        self.assertEqual(result["attempts"], 3)
+
+    def test_missing_season_is_not_retried(self):
+        report = self._download(["099S1"], retry_limit=3)
+
+        self.assertEqual(report["failed"], {"099S1": "HTTP 404"})
+        self.assertEqual(report["results"][0]["attempts"], 1)
+
+    def test_interrupted_download_resumes_with_range(self):
+        self.server.truncate_at = {"112S1": 1500}
+        report = self._download(["112S1"], retry_limit=3)
+
+        result = report["results"][0]
+        self.assertTrue(result["success"])
+        self.assertEqual(result["attempts"], 2)
+        # 第二次只傳輸剩下的部分
+        self.assertEqual(result["bytes"], len("112S1") * 1000 - 1500)
+        self.assertEqual(self.server.requests[-1]["headers"].get("Range"), "bytes=1500-")
+
+        zip_path = os.path.join(self.tmp_dir, "112S1.zip")
+        with open(zip_path, "rb") as f:
+            self.assertEqual(f.read(), b"112S1" * 1000)
+        self.assertFalse(os.path.exists(zip_path + ".part"))
+
+    def _clear_downloads(self):
+        for name in os.listdir(self.tmp_dir):
+            os.remove(os.path.join(self.tmp_dir, name))
+
+    def test_unchanged_seasons_are_skipped_with_conditional_requests(self):
+        validators = {}
+        first = self._download(SEASONS[:3], validators=validators)
+        self.assertEqual(first["unchanged"], [])
+        self._clear_downloads()
+
+        self.server.seasons["111S2"] = b"updated" * 1000
+        second = self._download(SEASONS[:3], validators=validators)
+
+        self.assertEqual(sorted(second["unchanged"]), ["111S1", "111S3"])
+        self.assertEqual(second["bytes"], len(b"updated") * 1000)
+        self.assertEqual(os.listdir(self.tmp_dir), ["111S2.zip"])
+        sent = [request["headers"] for request in self.server.requests[-3:]]
+        self.assertTrue(all("If-None-Match" in headers for headers in sent))
+
+    def test_identical_content_is_skipped_without_server_validators(self):
+        self.server.send_validators = False
+        validators = {}
+        self._download(["112S3"], validators=validators)
+        self._clear_downloads()
+
+        report = self._download(["112S3"], validators=validators)
+        self.assertEqual(report["unchanged"], ["112S3"])
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+        entry = validators[self.server.season_url("112S3")]
+        self.assertEqual(entry["content_length"], len("112S3") * 1000)
+
+    def test_slow_season_times_out(self):
+        self.server.latency = 0.5
+        report = self._download(["112S2"], retry_limit=0, season_timeout=0.1)
+        self.assertIn("逾時", report["failed"]["112S2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from api.routes.real_estate import download_zip_route
+from benchmarks.fake_moi_server import FakeMoiServer
+from benchmarks.synthetic_lvr_land import build_season_zip
+from ngui.preprocessing.season_ledger import (
+    STATE_DOWNLOADED, STATE_EXTRACTED, STATE_IMPORTED, STATE_LISTED, advance_season, get_season_states,
+    mark_seasons_imported, pending_seasons, record_listed,
+)
+from service import fetch_service, season_downloader
+from utils import download_validators
+
+SEASONS = ["112S2", "112S3", "112S4"]
+
+
+class TestSeasonLedger(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.addCleanup(self.conn.close)
+
+    def test_states_advance_with_timestamps(self):
+        self.assertEqual(record_listed(self.conn, {"112S4": "112年第4季"}), ["112S4"])
+        advance_season(self.conn, "112S4", STATE_DOWNLOADED, "abc", 123)
+        advance_season(self.conn, "112S4", STATE_EXTRACTED)
+
+        entry = get_season_states(self.conn)["112S4"]
+        self.assertEqual((entry["state"], entry["zip_sha256"], entry["zip_bytes"]), (STATE_EXTRACTED, "abc", 123))
+        self.assertIsNotNone(entry["downloaded_at"])
+        self.assertIsNotNone(entry["extracted_at"])
+        self.assertIsNone(entry["imported_at"])
+
+        advance_season(self.conn, "112S4", STATE_LISTED)
+        entry = get_season_states(self.conn)["112S4"]
+        self.assertIsNone(entry["downloaded_at"])
+        self.assertEqual(entry["zip_sha256"], "abc")
+
+    def test_listing_again_keeps_progress(self):
+        record_listed(self.conn, {season: season for season in SEASONS[:2]})
+        mark_seasons_imported(self.conn, SEASONS[:2])
+
+        self.assertEqual(record_listed(self.conn, {season: season for season in SEASONS}), ["112S4"])
+        self.assertEqual(pending_seasons(self.conn), {"112S4": STATE_LISTED})
+
+    def test_unknown_state_is_rejected(self):
+        record_listed(self.conn, {"112S4": "112S4"})
+        with self.assertRaises(ValueError):
+            advance_season(self.conn, "112S4", "cleaned")
+
+
+class TestSelectiveBackfill(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.db_path = os.path.join(self.tmp_dir, "land.db")
+        self.json_path = os.path.join(self.tmp_dir, "fetch_options_route.json")
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump({"historySeason_id": {season: season for season in SEASONS}}, f)
+
+        self.server = FakeMoiServer({season: build_season_zip(5, seed=i) for i, season in enumerate(SEASONS)}).start()
+        self.addCleanup(self.server.stop)
+        zip_path = lambda season: os.path.join(self.tmp_dir, f"{season}.zip")
+        for target, name, value in (
+            (fetch_service, "DB_PATH", self.db_path),
+            (fetch_service, "RAW_DATA_DIR", self.tmp_dir),
+            (download_zip_route, "season_zip_url", self.server.season_url),
+            (download_zip_route, "season_zip_path", zip_path),
+            (season_downloader, "season_zip_url", self.server.season_url),
+            (season_downloader, "season_zip_path", zip_path),
+            (download_validators, "VALIDATOR_FILE", os.path.join(self.tmp_dir, "validators.json")),
+        ):
+            patcher = patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _backfill(self):
+        with patch("builtins.print"):
+            pending = asyncio.run(fetch_service.batch_download_zip_from_json(self.json_path))
+            fetch_service.extract_downloaded_seasons(pending)
+        return pending
+
+    def _states(self):
+        with sqlite3.connect(self.db_path) as conn:
+            return {season: entry["state"] for season, entry in get_season_states(conn).items()}
+
+    def _downloaded(self):
+        # 已匯入期別的條件式請求 (內容未變更時回 304) 不算下載
+        return sorted(request["season"] for request in self.server.requests
+                      if "If-None-Match" not in request["headers"])
+
+    def _mark_imported(self, conn, seasons):
+        # 與實際下載、匯入後相同：ledger 記錄壓縮檔的 sha256 與大小，驗證資訊快取記錄 ETag
+        validators = download_validators.load_validators()
+        for season in seasons:
+            data = self.server.seasons[season]
+            sha256 = hashlib.sha256(data).hexdigest()
+            advance_season(conn, season, STATE_DOWNLOADED, sha256, len(data))
+            validators[self.server.season_url(season)] = {
+                "etag": f'"{hashlib.sha1(data).hexdigest()}"', "last_modified": FakeMoiServer.LAST_MODIFIED,
+                "content_length": len(data), "sha256": sha256,
+            }
+        download_validators.save_validators(validators)
+        mark_seasons_imported(conn, seasons)
+
+    def test_new_quarter_downloads_only_that_season(self):
+        with sqlite3.connect(self.db_path) as conn:
+            record_listed(conn, {season: season for season in SEASONS[:2]})
+            self._mark_imported(conn, SEASONS[:2])
+
+        self.assertEqual(self._backfill(), ["112S4"])
+        self.assertEqual(self._downloaded(), ["112S4"])
+        self.assertEqual(self._states()["112S4"], STATE_EXTRACTED)
+        self.assertTrue(os.listdir(os.path.join(self.tmp_dir, "112S4")))
+
+    def test_resume_skips_finished_stages(self):
+        # 上次在 112S3 解壓縮前中斷：壓縮檔還在，不需重新下載
+        with sqlite3.connect(self.db_path) as conn:
+            record_listed(conn, {season: season for season in SEASONS})
+            self._mark_imported(conn, ["112S2"])
+            advance_season(conn, "112S3", STATE_DOWNLOADED)
+        with open(os.path.join(self.tmp_dir, "112S3.zip"), "wb") as f:
+            f.write(build_season_zip(5, seed=1))
+
+        self.assertEqual(self._backfill(), ["112S3", "112S4"])
+        self.assertEqual(self._downloaded(), ["112S4"])
+        self.assertEqual(self._states(), {"112S2": STATE_IMPORTED, "112S3": STATE_EXTRACTED,
+                                          "112S4": STATE_EXTRACTED})
+
+        # 解壓縮後的資料夾被清掉 (例如匯入前當機) 時重新下載
+        shutil.rmtree(os.path.join(self.tmp_dir, "112S3"))
+        self.server.requests.clear()
+        self._backfill()
+        self.assertEqual(self._downloaded(), ["112S3"])
+
+    def test_corrupt_zip_is_queued_for_download_again(self):
+        with sqlite3.connect(self.db_path) as conn:
+            record_listed(conn, {season: season for season in SEASONS})
+            self._mark_imported(conn, SEASONS[:2])
+        self.server.seasons["112S4"] = self.server.seasons["112S4"][:-100]
+
+        self._backfill()
+        self.assertEqual(self._states()["112S4"], STATE_LISTED)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, "112S4.zip")))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, "112S4")))
+
+        self.server.seasons["112S4"] = build_season_zip(5, seed=2)
+        self._backfill()
+        self.assertEqual(self._states()["112S4"], STATE_EXTRACTED)
+
+    def test_revised_imported_season_is_downloaded_again(self):
+        with sqlite3.connect(self.db_path) as conn:
+            record_listed(conn, {season: season for season in SEASONS})
+            self._mark_imported(conn, SEASONS)
+
+        # 內容未變更：只送出條件式請求 (304)，不需要後續處理
+        self.assertEqual(self._backfill(), [])
+        self.assertEqual(self._downloaded(), [])
+        self.assertEqual(len(self.server.requests), len(SEASONS))
+
+        # 112S3 被修訂：退回 listed 後重新下載、解壓縮，等待匯入
+        revised = build_season_zip(5, seed=9)
+        self.server.seasons["112S3"] = revised
+        self.assertEqual(self._backfill(), ["112S3"])
+        states = self._states()
+        self.assertEqual(states, {"112S2": STATE_IMPORTED, "112S3": STATE_EXTRACTED, "112S4": STATE_IMPORTED})
+        with sqlite3.connect(self.db_path) as conn:
+            entry = get_season_states(conn)["112S3"]
+        self.assertEqual((entry["zip_sha256"], entry["zip_bytes"]), (hashlib.sha256(revised).hexdigest(), len(revised)))
+        self.assertIsNone(entry["imported_at"])
+
+    def test_lost_validators_fall_back_to_ledger_hash(self):
+        with sqlite3.connect(self.db_path) as conn:
+            record_listed(conn, {season: season for season in SEASONS})
+            self._mark_imported(conn, SEASONS)
+        os.remove(download_validators.VALIDATOR_FILE)
+
+        # 沒有驗證資訊時整個下載，但大小與 sha256 與 ledger 相同，不重新匯入也不留下壓縮檔
+        self.assertEqual(self._backfill(), [])
+        self.assertEqual(self._states(), {season: STATE_IMPORTED for season in SEASONS})
+        self.assertFalse([name for name in os.listdir(self.tmp_dir) if name.endswith(".zip")])
+
+
+if __name__ == "__main__":
+    unittest.main()
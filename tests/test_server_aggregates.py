@@ -0,0 +1,81 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from benchmarks.synthetic_lvr_land import write_lvr_land_csv
+from ngui.components import main_sql
+from ngui.components.sqlite_client import SqliteClient
+from ngui.preprocessing.process_real_estate_and_import import clean_and_import_file
+
+
+class FailingRpcClient(SqliteClient):
+    def rpc(self, name, params=None):
+        raise RuntimeError("function public.price_trend_monthly does not exist")
+
+
+class TestServerAggregates(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.db_path = os.path.join(cls.tmp_dir, "real_estate.sqlite")
+        conn = sqlite3.connect(cls.db_path)
+        file_path = os.path.join(cls.tmp_dir, "a_lvr_land_a.csv")
+        write_lvr_land_csv(file_path, 5000, seed=7)
+        clean_and_import_file(file_path, "113S1", conn)
+        conn.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def setUp(self):
+        for name, value in (("db", SqliteClient(self.db_path)), ("USE_PRICE_ROLLUPS", False)):
+            patcher = patch.object(main_sql, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _both(self, func, *args):
+        with patch.object(main_sql, "USE_SERVER_AGGREGATES", True):
+            server = func(*args)
+        with patch.object(main_sql, "USE_SERVER_AGGREGATES", False):
+            local = func(*args)
+        self.assertFalse(local.empty)
+        return server, local.reset_index(drop=True)
+
+    def test_monthly_average_matches_pandas(self):
+        server, local = self._both(main_sql.query_avg_price, "臺北", "房地", "2020", None)
+        pd.testing.assert_frame_equal(server, local, check_dtype=False)
+
+    def test_multi_year_average_matches_pandas(self):
+        server, local = self._both(main_sql.query_multi_year_price, "臺北", None, ["2018", "2019", "2020"], "中古屋")
+        pd.testing.assert_frame_equal(server, local, check_dtype=False)
+        self.assertLessEqual(len(server), 36)
+
+    def test_median_and_count(self):
+        trend = main_sql.fetch_monthly_trend("臺北", ["2020"], None, None)
+        conn = sqlite3.connect(self.db_path)
+        raw = pd.read_sql(
+            'SELECT "交易年月日", "建物總價萬元" FROM "臺北" WHERE "交易年" = \'2020\' AND "建物總價萬元" IS NOT NULL', conn
+        )
+        conn.close()
+        raw["month"] = raw["交易年月日"].str[4:6].astype(int)
+        expected = raw.groupby("month")["建物總價萬元"].agg(["count", "median"]).reset_index()
+
+        self.assertEqual(trend["month"].tolist(), expected["month"].tolist())
+        self.assertEqual(trend["count"].tolist(), expected["count"].tolist())
+        self.assertEqual(trend["median_price"].round(6).tolist(), expected["median"].round(6).tolist())
+
+    def test_missing_rpc_falls_back_to_pandas(self):
+        with patch.object(main_sql, "db", FailingRpcClient(self.db_path)), \
+                patch.object(main_sql, "USE_SERVER_AGGREGATES", True):
+            fallback = main_sql.query_avg_price("臺北", None, "2020", None)
+        self.assertFalse(fallback.empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from ngui.preprocessing.sqlite_bulk_load import BULK_LOAD_PRAGMAS, bulk_load_session
+
+PRAGMAS = list(BULK_LOAD_PRAGMAS)
+
+
+class TestBulkLoadSession(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.conn = sqlite3.connect(os.path.join(self.tmp_dir, "real_estate.sqlite"))
+        self.addCleanup(self.conn.close)
+
+        self.conn.execute('CREATE TABLE "臺北" (id INTEGER PRIMARY KEY AUTOINCREMENT, "交易年" TEXT, "屋況" TEXT)')
+        self.conn.execute('CREATE INDEX "idx_臺北_year_status" ON "臺北" ("交易年", "屋況")')
+        self.conn.execute('CREATE TABLE "新北" (id INTEGER PRIMARY KEY AUTOINCREMENT, "交易年" TEXT)')
+        self.conn.execute('CREATE INDEX "idx_新北_year" ON "新北" ("交易年")')
+        # 匯入前的設定刻意與 BULK_LOAD_PRAGMAS、SQLite 預設值都不同
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute("PRAGMA cache_size = -4096")
+        self.conn.commit()
+        self.before = self._pragmas()
+
+    def _pragmas(self):
+        return {name: self.conn.execute(f"PRAGMA {name}").fetchone()[0] for name in PRAGMAS}
+
+    def _indexes(self):
+        return sorted(row[0] for row in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"))
+
+    def test_normal_exit_restores_pragmas_and_indexes(self):
+        with bulk_load_session(self.conn, ["臺北"]):
+            self.assertEqual(self._indexes(), ["idx_新北_year"])
+            self.assertNotEqual(self._pragmas(), self.before)
+            self.conn.execute('INSERT INTO "臺北" ("交易年", "屋況") VALUES (?, ?)', ("2020", "中古屋"))
+            self.conn.commit()
+
+        self.assertEqual(self._pragmas(), self.before)
+        self.assertEqual(self._indexes(), ["idx_新北_year", "idx_臺北_year_status"])
+
+    def test_exception_restores_pragmas_and_indexes(self):
+        with self.assertRaises(RuntimeError):
+            with bulk_load_session(self.conn, ["臺北", "新北"]):
+                self.assertEqual(self._indexes(), [])
+                raise RuntimeError("匯入失敗")
+
+        self.assertEqual(self._pragmas(), self.before)
+        self.assertEqual(self._indexes(), ["idx_新北_year", "idx_臺北_year_status"])
+
+    def test_incremental_load_keeps_indexes(self):
+        self.conn.executemany('INSERT INTO "臺北" ("交易年", "屋況") VALUES (?, ?)', [("2020", "中古屋")] * 100)
+        self.conn.commit()
+
+        # 臺北已有 100 筆、本次只匯入 10 筆：保留索引；新北為空表：延後建立索引
+        with bulk_load_session(self.conn, ["臺北", "新北"], expected_rows=lambda table: 10):
+            self.assertEqual(self._indexes(), ["idx_臺北_year_status"])
+        self.assertEqual(self._indexes(), ["idx_新北_year", "idx_臺北_year_status"])
+
+        # 匯入量達到現有筆數的 INDEX_DEFER_RATIO 時延後建立索引
+        with bulk_load_session(self.conn, ["臺北"], expected_rows=lambda table: 100):
+            self.assertEqual(self._indexes(), ["idx_新北_year"])
+        self.assertEqual(self._indexes(), ["idx_新北_year", "idx_臺北_year_status"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from benchmarks.synthetic_lvr_land import write_lvr_land_csv
+from ngui.components import main_sql
+from ngui.preprocessing.process_real_estate_and_import import clean_and_import_file
+from ngui.preprocessing.unified_schema import FACT_TABLE, INTEGER_PARTS, UNIFIED_VIEW, VIEW_COLUMNS, sync_unified_schema
+from tests.test_city_indexes import RecordingSqliteClient
+
+CITIES = {"a": "臺北", "f": "新北"}
+
+
+class TestUnifiedSchema(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "real_estate.sqlite")
+        self.conn = sqlite3.connect(self.db_path)
+        for code, city in CITIES.items():
+            write_lvr_land_csv(self._csv_path(code), 2000, seed=len(city))
+            clean_and_import_file(self._csv_path(code), "113S1", self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def _csv_path(self, code: str) -> str:
+        return os.path.join(self.tmp_dir, f"{code}_lvr_land_a.csv")
+
+    def _rows(self, sql: str, params=()):
+        return sorted(self.conn.execute(sql, params).fetchall(), key=repr)
+
+    def _assert_view_matches_city_tables(self):
+        columns = ", ".join(f'"{col}"' for col in VIEW_COLUMNS)
+        # 事實表的年/月/日存成整數
+        source_columns = ", ".join(
+            f"CAST(NULLIF(\"{col}\", '') AS INTEGER)" if col in INTEGER_PARTS else f'"{col}"' for col in VIEW_COLUMNS
+        )
+        for city in CITIES.values():
+            expected = self._rows(f'SELECT {source_columns} FROM "{city}"')
+            actual = self._rows(f'SELECT {columns} FROM "{UNIFIED_VIEW}" WHERE "縣市" = ?', (city,))
+            self.assertEqual(actual, expected)
+
+    def test_migration_preserves_rows(self):
+        totals = sync_unified_schema(self.conn, list(CITIES.values()))
+        self.assertEqual(totals["inserted"], 4000)
+        self._assert_view_matches_city_tables()
+
+        # 維度值只存一次
+        districts = self.conn.execute('SELECT COUNT(*) FROM dim_district').fetchone()[0]
+        distinct = self.conn.execute(
+            'SELECT COUNT(*) FROM (SELECT "鄉鎮市區" FROM "臺北" UNION SELECT "鄉鎮市區" FROM "新北")'
+        ).fetchone()[0]
+        self.assertEqual(districts, distinct)
+
+    def test_resync_only_applies_changes(self):
+        sync_unified_schema(self.conn, list(CITIES.values()))
+        self.assertEqual(sync_unified_schema(self.conn, list(CITIES.values())), {"inserted": 0, "deleted": 0})
+
+        # 內容變更的檔案重新匯入後，舊資料列被替換
+        write_lvr_land_csv(self._csv_path("a"), 500, seed=99)
+        clean_and_import_file(self._csv_path("a"), "113S1", self.conn)
+        totals = sync_unified_schema(self.conn, list(CITIES.values()))
+
+        self.assertEqual(totals, {"inserted": 500, "deleted": 2000})
+        self.assertEqual(self.conn.execute(f'SELECT COUNT(*) FROM "{FACT_TABLE}"').fetchone()[0], 2500)
+        self._assert_view_matches_city_tables()
+
+    def test_multi_city_query_is_single_indexed_query(self):
+        sync_unified_schema(self.conn, list(CITIES.values()))
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+
+        client = RecordingSqliteClient(self.db_path)
+        with patch.object(main_sql, "db", client), patch.object(main_sql, "USE_UNIFIED_SCHEMA", True):
+            unified = main_sql.query_multi_city_3d_data(list(CITIES.values()), "2020", "房地", None)
+            self.assertEqual(len(client.queries), 1)
+
+            sql, params = client.queries[0]
+            plan = [row[3] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            self.assertTrue(any("idx_transactions_" in step for step in plan), plan)
+
+        with patch.object(main_sql, "db", client):
+            per_city = main_sql.query_multi_city_3d_data(list(CITIES.values()), "2020", "房地", None)
+
+        self.assertFalse(unified.empty)
+        self.assertEqual(
+            unified.sort_values(list(unified.columns)).values.tolist(),
+            per_city.sort_values(list(per_city.columns)).values.tolist(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes.real_estate import update_status_route
+from service import update_job
+from utils.file_lock import LockBusyError, file_lock, is_locked
+
+
+class TestFileLock(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.lock_path = os.path.join(self.tmp_dir, "update.lock")
+
+    def test_second_holder_is_rejected(self):
+        with file_lock(self.lock_path):
+            self.assertTrue(is_locked(self.lock_path))
+            with self.assertRaises(LockBusyError):
+                with file_lock(self.lock_path):
+                    pass
+        self.assertFalse(is_locked(self.lock_path))
+
+    def test_lock_file_records_pid(self):
+        with file_lock(self.lock_path):
+            with open(self.lock_path, "r") as f:
+                self.assertEqual(f.read(), str(os.getpid()))
+
+    def test_probe_leaves_lock_file_and_holder_untouched(self):
+        with file_lock(self.lock_path):
+            for _ in range(3):
+                self.assertTrue(is_locked(self.lock_path))
+            with open(self.lock_path, "r") as f:
+                self.assertEqual(f.read(), str(os.getpid()))
+            # 探測後鎖仍由原持有者持有
+            with self.assertRaises(LockBusyError):
+                with file_lock(self.lock_path):
+                    pass
+
+        # 未被持有時探測也不改寫上次持有者留下的 PID
+        with open(self.lock_path, "w") as f:
+            f.write("4242")
+        self.assertFalse(is_locked(self.lock_path))
+        with open(self.lock_path, "r") as f:
+            self.assertEqual(f.read(), "4242")
+
+
+class TestUpdateJob(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.lock_path = os.path.join(self.tmp_dir, "update.lock")
+        # 更新在子行程執行，以檔案通知假的 fetch_data 結束
+        self.release_path = os.path.join(self.tmp_dir, "release")
+        self.fetch_result = (True, True)
+        for name, value in (
+            ("UPDATE_LOCK_FILE", self.lock_path),
+            ("UPDATE_STATUS_FILE", os.path.join(self.tmp_dir, "update_status.json")),
+            ("UPDATE_PROGRESS_FILE", os.path.join(self.tmp_dir, "update_progress.json")),
+            # fork 讓子行程沿用測試替換的 fetch_data 與匯入函式
+            ("UPDATE_START_METHOD", "fork"),
+            ("fetch_data", self._fake_fetch),
+            ("apply_clean_and_import_file", lambda: {"files": 2, "rows": 10, "seconds": 0.1}),
+            ("_worker", None),
+            ("print", lambda *args, **kwargs: None),
+        ):
+            patcher = patch.object(update_job, name, value, create=name == "print")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self._release)
+
+    def _release(self):
+        with open(self.release_path, "w"):
+            pass
+
+    async def _fake_fetch(self, timings):
+        timings["本期公告"] = 0.01
+        while not os.path.exists(self.release_path):
+            time.sleep(0.01)
+        return self.fetch_result
+
+    def _wait_for(self, condition):
+        deadline = time.perf_counter() + 5
+        while not condition():
+            self.assertLess(time.perf_counter(), deadline)
+            time.sleep(0.02)
+
+    def test_start_returns_immediately_and_reports_progress(self):
+        started = time.perf_counter()
+        self.assertTrue(update_job.start_update("cron"))
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertNotEqual(update_job._worker.pid, os.getpid())
+
+        # 同一行程不會重複啟動
+        self.assertFalse(update_job.start_update("cron"))
+        self._wait_for(lambda: "本期公告" in update_job.get_update_status()["steps"])
+        status = update_job.get_update_status()
+        self.assertEqual((status["state"], status["phase"], status["trigger"]), ("running", "抓取", "cron"))
+        self.assertTrue(status["locked"])
+
+        self._release()
+        update_job._worker.join(timeout=5)
+        self.assertEqual(update_job._worker.exitcode, 0)
+        status = update_job.get_update_status()
+        self.assertEqual((status["state"], status["locked"]), ("idle", False))
+        last_run = status["last_run"]
+        self.assertEqual(last_run["result"], update_job.RESULT_UPDATED)
+        self.assertEqual(last_run["import"]["rows"], 10)
+        self.assertIn("匯入", last_run["steps"])
+
+    def test_start_is_refused_while_another_process_holds_the_lock(self):
+        with file_lock(self.lock_path):
+            self.assertFalse(update_job.start_update("cron"))
+            self.assertEqual(update_job.get_update_status()["state"], "running")
+        self.assertIsNone(update_job._worker)
+
+    def test_run_is_skipped_while_another_process_holds_the_lock(self):
+        self._release()
+        with file_lock(self.lock_path):
+            last_run = update_job.run_update("cron")
+        self.assertEqual(last_run["result"], update_job.RESULT_SKIPPED)
+        self.assertFalse(os.path.exists(update_job.UPDATE_STATUS_FILE))
+
+    def test_failure_is_recorded_and_persisted(self):
+        self._release()
+        self.fetch_result = (False, False)
+        update_job.run_update("manual")
+
+        # API 行程 (或重新啟動的行程) 從狀態檔讀到上次的結果
+        status = update_job.get_update_status()
+        self.assertEqual(status["last_run"]["result"], update_job.RESULT_FAILED)
+        self.assertFalse(status["locked"])
+
+    def test_status_route(self):
+        app = FastAPI()
+        app.include_router(update_status_route.router, prefix="/api")
+        response = TestClient(app).get("/api/update/status")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["state"], "idle")
+
+
+if __name__ == "__main__":
+    unittest.main()
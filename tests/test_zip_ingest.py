@@ -0,0 +1,129 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from benchmarks.synthetic_lvr_land import write_lvr_land_csv
+from ngui.preprocessing import process_real_estate_and_import as importer
+from ngui.preprocessing.real_estate_cleaner import is_relevant_csv
+from ngui.preprocessing.zip_ingest import (
+    extract_relevant_members, list_relevant_members, split_zip_member, zip_member_path,
+)
+
+RELEVANT = ["a_lvr_land_a.csv", "a_lvr_land_b.csv", "f_lvr_land_a.csv"]
+IRRELEVANT = ["a_lvr_land_c.csv", "a_lvr_land_a_build.csv", "a_lvr_land_b_land.csv",
+              "a_lvr_land_a_park.csv", "manifest.csv", "schema-main.csv"]
+
+
+class TestZipIngest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.raw_dir = os.path.join(self.tmp_dir, "raw")
+        self.old_dir = os.path.join(self.tmp_dir, "old")
+        self.csv_dir = os.path.join(self.tmp_dir, "csv")
+        for path in (self.raw_dir, self.old_dir, self.csv_dir):
+            os.makedirs(path)
+
+        self.zip_path = os.path.join(self.raw_dir, "113S1.zip")
+        with zipfile.ZipFile(self.zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for i, name in enumerate(RELEVANT + IRRELEVANT):
+                csv_path = os.path.join(self.csv_dir, name)
+                write_lvr_land_csv(csv_path, 300, presale=name.endswith("b.csv"), seed=i)
+                archive.write(csv_path, name)
+
+        for name, value in (("RAW_DATA_DIR", self.raw_dir), ("OLD_DATA_DIR", self.old_dir),
+                            ("DB_PATH", os.path.join(self.tmp_dir, "real_estate.sqlite")),
+                            ("ZIP_INGEST_ENABLED", True)):
+            patcher = patch.object(importer, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_relevant_csv_rules(self):
+        for name in RELEVANT:
+            self.assertTrue(is_relevant_csv(name), name)
+        for name in IRRELEVANT:
+            self.assertFalse(is_relevant_csv(name), name)
+
+    def test_member_path_round_trip(self):
+        path = zip_member_path(self.zip_path, "a_lvr_land_a.csv")
+        self.assertEqual(split_zip_member(path), (self.zip_path, "a_lvr_land_a.csv"))
+        self.assertEqual(os.path.basename(path), "a_lvr_land_a.csv")
+        self.assertIsNone(split_zip_member(os.path.join(self.csv_dir, "a_lvr_land_a.csv")))
+        self.assertEqual([os.path.basename(p) for p in list_relevant_members(self.zip_path)], RELEVANT)
+
+    def test_extracts_only_relevant_members(self):
+        dest_dir = os.path.join(self.raw_dir, "113S1")
+        paths = extract_relevant_members(self.zip_path, dest_dir)
+
+        self.assertEqual(sorted(os.listdir(dest_dir)), sorted(RELEVANT))
+        self.assertEqual([os.path.basename(path) for path in paths], RELEVANT)
+        self.assertFalse(os.path.exists(dest_dir + ".extracting"))
+
+    def test_crc_mismatch_and_truncation_are_reported(self):
+        # 未壓縮的成員改掉一個位元組，只有 CRC 檢查能發現
+        stored_path = os.path.join(self.raw_dir, "113S2.zip")
+        content = b"a_lvr_land_a" * 100
+        with zipfile.ZipFile(stored_path, "w", zipfile.ZIP_STORED) as archive:
+            archive.writestr("a_lvr_land_a.csv", content)
+        with open(stored_path, "rb") as f:
+            data = bytearray(f.read())
+        data[data.index(content) + 10] ^= 0xFF
+        with open(stored_path, "wb") as f:
+            f.write(data)
+
+        truncated_path = os.path.join(self.raw_dir, "113S3.zip")
+        with open(self.zip_path, "rb") as src, open(truncated_path, "wb") as dst:
+            dst.write(src.read()[: os.path.getsize(self.zip_path) // 2])
+
+        for zip_path in (stored_path, truncated_path):
+            dest_dir = zip_path[:-len(".zip")]
+            with self.assertRaises(zipfile.BadZipFile):
+                extract_relevant_members(zip_path, dest_dir)
+            self.assertFalse(os.path.exists(dest_dir))
+            self.assertFalse(os.path.exists(dest_dir + ".extracting"))
+
+    def test_import_streams_members_without_extracting(self):
+        stats = importer.apply_clean_and_import_file(workers=1)
+
+        self.assertEqual(stats["files"], len(RELEVANT))
+        self.assertEqual(stats["rows"], 300 * len(RELEVANT))
+        self.assertEqual(os.listdir(self.raw_dir), [])
+        self.assertTrue(os.path.exists(os.path.join(self.old_dir, "113S1", "113S1.zip")))
+
+        # 與解壓縮後逐檔匯入的結果相同
+        expected = sqlite3.connect(":memory:")
+        for name in RELEVANT:
+            importer.clean_and_import_file(os.path.join(self.csv_dir, name), "113S1", expected)
+
+        conn = sqlite3.connect(importer.DB_PATH)
+        try:
+            for city in ("臺北", "新北"):
+                sql = f'SELECT * FROM "{city}" ORDER BY id'
+                self.assertEqual(conn.execute(sql).fetchall(), expected.execute(sql).fetchall())
+            hashes = 'SELECT filename, content_hash FROM import_ledger ORDER BY filename'
+            self.assertEqual(conn.execute(hashes).fetchall(), expected.execute(hashes).fetchall())
+        finally:
+            conn.close()
+            expected.close()
+
+    def test_parallel_import_reads_members_in_workers(self):
+        stats = importer.apply_clean_and_import_file(workers=2)
+        self.assertEqual(stats["rows"], 300 * len(RELEVANT))
+
+    def test_zips_are_ignored_when_zip_ingest_is_disabled(self):
+        with patch.object(importer, "ZIP_INGEST_ENABLED", False):
+            stats = importer.apply_clean_and_import_file(workers=1)
+
+        # 壓縮檔留給解壓縮流程處理，不會被匯入或封存
+        self.assertEqual(stats["files"], 0)
+        self.assertEqual(os.listdir(self.raw_dir), ["113S1.zip"])
+
+
+if __name__ == "__main__":
+    unittest.main()
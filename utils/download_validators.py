@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+from config.paths import RAW_DATA_DIR
+
+# 每個下載網址上次成功下載的驗證資訊：
+# {url: {"etag", "last_modified", "content_length", "sha256"}}
+# 下次下載時送出 If-None-Match / If-Modified-Since，伺服器回 304 或內容大小與 sha256 相同時即視為未變更
+VALIDATOR_FILE = os.path.join(RAW_DATA_DIR, "download_validators.json")
+
+
+def load_validators(path: Optional[str] = None) -> Dict[str, Dict]:
+    path = path or VALIDATOR_FILE
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # 快取損毀時當作沒有快取，最多就是重新下載一次
+        return {}
+
+
+def save_validators(validators: Dict[str, Dict], path: Optional[str] = None):
+    path = path or VALIDATOR_FILE
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(validators, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def conditional_headers(validators: Dict[str, Dict], url: str) -> Dict[str, str]:
+    entry = validators.get(url) or {}
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def update_validator(validators: Dict[str, Dict], url: str, path: str, etag: Optional[str] = None,
+                     last_modified: Optional[str] = None) -> bool:
+    """
+    紀錄剛下載完成的檔案，回傳內容是否與上次不同 (大小或 sha256 不同)。
+    """
+    previous = validators.get(url) or {}
+    entry = {
+        "etag": etag,
+        "last_modified": last_modified,
+        "content_length": os.path.getsize(path),
+        "sha256": file_sha256(path),
+    }
+    validators[url] = entry
+    return (previous.get("content_length"), previous.get("sha256")) != (entry["content_length"], entry["sha256"])
@@ -0,0 +1,74 @@
+import os
+import sys
+from contextlib import contextmanager
+from typing import IO, Iterator
+
+if sys.platform.startswith("win"):
+    import msvcrt
+else:
+    import fcntl
+
+
+class LockBusyError(RuntimeError):
+    """
+    鎖已被其他行程 (或同一行程的其他工作) 持有。
+    """
+
+
+def _try_lock(f: IO):
+    if sys.platform.startswith("win"):
+        # msvcrt 鎖定的是檔案中的位元組範圍，固定鎖第一個位元組
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _unlock(f: IO):
+    if sys.platform.startswith("win"):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[IO]:
+    """
+    以不等待的方式取得跨行程的檔案鎖 (Linux / macOS 使用 fcntl.flock，Windows 使用 msvcrt.locking)，
+    取得後在檔案中寫入目前的 PID；已被持有時拋出 LockBusyError。
+    行程結束 (包含當機) 時作業系統會自動釋放鎖，不會留下需要手動清除的鎖檔。
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    f = open(path, "a+")
+    try:
+        try:
+            _try_lock(f)
+        except OSError as e:
+            raise LockBusyError(f"鎖已被持有：{path}") from e
+        try:
+            f.seek(0)
+            f.truncate()
+            f.write(str(os.getpid()))
+            f.flush()
+            yield f
+        finally:
+            _unlock(f)
+    finally:
+        f.close()
+
+
+def is_locked(path: str) -> bool:
+    """
+    檢查鎖是否被其他人持有 (嘗試取得後立即釋放)。
+    以唯讀方式另開檔案探測，不截斷也不寫入，持有者記錄的 PID 維持不變。
+    """
+    if not os.path.exists(path):
+        return False
+    with open(path, "r") as f:
+        try:
+            _try_lock(f)
+        except OSError:
+            return True
+        _unlock(f)
+        return False
@@ -0,0 +1,192 @@
+import os
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+# 下載中的檔案先寫到 <目標>.part，完成後才以 os.replace 原子性地換成正式檔名，
+# 中斷時保留 .part，下次以 HTTP Range 從已下載的位置續傳。
+# .part 開始下載時的 ETag (或 Last-Modified) 另存於 <目標>.part.validator，續傳時以 If-Range 帶上，
+# 伺服器上的檔案已變更時回 200 完整內容，從頭下載，不會把新舊兩個版本接在一起。
+# 收到的資料以 iter_raw 原樣寫入檔案 (Range 的位置以傳輸的位元組計算，不可經過 Content-Encoding 解碼)；
+# 不指定 chunk_size，避免 httpx 在記憶體累積到 chunk 大小才交出，斷線時遺失
+PART_SUFFIX = ".part"
+VALIDATOR_SUFFIX = ".validator"
+
+
+class IncompleteDownloadError(httpx.TransportError):
+    """
+    連線結束但下載的大小與伺服器宣告的不符；.part 會保留供續傳。
+    """
+
+
+def part_path_for(path: str) -> str:
+    return path + PART_SUFFIX
+
+
+def remove_part(path: str):
+    """
+    刪除 path 未下載完的 .part 與其驗證資訊 (例如來源已更新，不能再拿來續傳)。
+    """
+    _remove_part_files(part_path_for(path))
+
+
+def _remove_part_files(part_path: str):
+    for leftover in (part_path, part_path + VALIDATOR_SUFFIX):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+
+def _read_part_validator(part_path: str) -> Optional[str]:
+    validator_path = part_path + VALIDATOR_SUFFIX
+    if not os.path.exists(validator_path):
+        return None
+    with open(validator_path, "r", encoding="utf-8") as f:
+        return f.read().strip() or None
+
+
+def _write_part_validator(part_path: str, response: httpx.Response):
+    """
+    記錄 .part 內容對應的版本；If-Range 不接受弱 ETag (W/...)，此時改用 Last-Modified。
+    """
+    etag = response.headers.get("ETag")
+    validator = etag if etag and not etag.startswith("W/") else response.headers.get("Last-Modified")
+    validator_path = part_path + VALIDATOR_SUFFIX
+    if validator:
+        with open(validator_path, "w", encoding="utf-8") as f:
+            f.write(validator)
+    elif os.path.exists(validator_path):
+        os.remove(validator_path)
+
+
+def _resume_headers(part_path: str) -> Tuple[Dict[str, str], int]:
+    """
+    續傳用的標頭 (Range + If-Range) 與續傳位置；.part 沒有驗證資訊時無法確認版本，刪除後從頭下載。
+    """
+    # 要求原始內容，寫入檔案的位元組與 Range 的位置一致
+    headers = {"Accept-Encoding": "identity"}
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if not offset:
+        return headers, 0
+    validator = _read_part_validator(part_path)
+    if validator is None:
+        os.remove(part_path)
+        return headers, 0
+    return {**headers, "Range": f"bytes={offset}-", "If-Range": validator}, offset
+
+
+def _content_range_total(response: httpx.Response, offset: int) -> Optional[int]:
+    """
+    解析 206 回應的 Content-Range (bytes <start>-<end>/<total>)；起點與續傳位置不符時回傳 None。
+    """
+    unit, _, spec = response.headers.get("Content-Range", "").partition(" ")
+    span, _, total = spec.partition("/")
+    start = span.partition("-")[0]
+    if unit != "bytes" or not start.isdigit() or int(start) != offset:
+        return None
+    return int(total) if total.isdigit() else None
+
+
+def _prepare_part(part_path: str, response: httpx.Response, offset: int) -> Tuple[str, int, Optional[int]]:
+    """
+    依回應決定續傳或重新下載，回傳 (開檔模式, 起始位置, 預期總大小)。
+    伺服器不支援 Range 或 If-Range 的版本已變更 (回 200) 時從頭下載，並記錄新內容的驗證資訊。
+    """
+    if offset and response.status_code == 206:
+        total = _content_range_total(response, offset)
+        if total is not None or response.headers.get("Content-Range", "").endswith("/*"):
+            return "ab", offset, total
+        raise IncompleteDownloadError(f"Content-Range 與續傳位置不符：{response.headers.get('Content-Range')}")
+
+    response.raise_for_status()
+    _write_part_validator(part_path, response)
+    length = response.headers.get("Content-Length")
+    return "wb", 0, int(length) if length and length.isdigit() else None
+
+
+def _finish(part_path: str, path: str, total: Optional[int]) -> int:
+    size = os.path.getsize(part_path)
+    if total is not None and size != total:
+        raise IncompleteDownloadError(f"下載不完整：{size}/{total} bytes")
+    os.replace(part_path, path)
+    _remove_part_files(part_path)
+    return size
+
+
+def _range_not_satisfiable(response: httpx.Response, part_path: str) -> bool:
+    """
+    416：.part 已超出伺服器上的檔案 (檔案已更新)，刪除後從頭下載。
+    """
+    if response.status_code != 416:
+        return False
+    _remove_part_files(part_path)
+    return True
+
+
+def _not_modified(response: httpx.Response, part_path: str) -> bool:
+    """
+    304：條件式請求 (If-None-Match / If-Modified-Since) 的內容未變更，不需要下載；殘留的 .part 一併刪除。
+    """
+    if response.status_code != 304:
+        return False
+    _remove_part_files(part_path)
+    return True
+
+
+def _result(response: httpx.Response, written: int, size: int, offset: int) -> Dict:
+    return {
+        "bytes": written,
+        "size": size,
+        "resumed_from": offset,
+        "not_modified": response.status_code == 304,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
+def download_file(client: httpx.Client, url: str, path: str, headers: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    串流下載到 path (記憶體用量與檔案大小無關)，支援續傳。
+
+    headers 可帶入條件式請求標頭，伺服器回 304 時不寫入任何檔案，回傳 not_modified=True。
+
+    :return: {"bytes": 本次傳輸的位元組數, "size": 檔案大小, "resumed_from": 續傳起點,
+              "not_modified", "etag", "last_modified"}
+    """
+    part_path = part_path_for(path)
+    for _ in range(2):
+        range_headers, offset = _resume_headers(part_path)
+        with client.stream("GET", url, headers={**(headers or {}), **range_headers}) as response:
+            if _not_modified(response, part_path):
+                return _result(response, 0, 0, 0)
+            if _range_not_satisfiable(response, part_path):
+                continue
+            mode, offset, total = _prepare_part(part_path, response, offset)
+            written = 0
+            with open(part_path, mode) as f:
+                for chunk in response.iter_raw():
+                    f.write(chunk)
+                    written += len(chunk)
+        return _result(response, written, _finish(part_path, path, total), offset)
+    raise IncompleteDownloadError(f"無法續傳：{url}")
+
+
+async def adownload_file(client: httpx.AsyncClient, url: str, path: str, headers: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    download_file 的非同步版本。
+    """
+    part_path = part_path_for(path)
+    for _ in range(2):
+        range_headers, offset = _resume_headers(part_path)
+        async with client.stream("GET", url, headers={**(headers or {}), **range_headers}) as response:
+            if _not_modified(response, part_path):
+                return _result(response, 0, 0, 0)
+            if _range_not_satisfiable(response, part_path):
+                continue
+            mode, offset, total = _prepare_part(part_path, response, offset)
+            written = 0
+            with open(part_path, mode) as f:
+                async for chunk in response.aiter_raw():
+                    f.write(chunk)
+                    written += len(chunk)
+        return _result(response, written, _finish(part_path, path, total), offset)
+    raise IncompleteDownloadError(f"無法續傳：{url}")
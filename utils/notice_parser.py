@@ -6,6 +6,16 @@ from utils.trace import generate_trace_id
 from enums.error_code import ErrorCode
 
 
+NOTICE_PATTERN = r"(登記日期|訂約日期|交易日期)\s*([0-9]+)年([0-9]+)月([0-9]+)日[至到 ]+([0-9]+)年([0-9]+)月([0-9]+)日"
+
+
+def has_notice_dates(text: str) -> bool:
+    """
+    快速檢查文字中是否含有公告日期區間 (不寫錯誤日誌，供判斷是否需要改用瀏覽器抓取)。
+    """
+    return bool(text) and re.search(NOTICE_PATTERN, text) is not None
+
+
 def parse_notice_to_dict(text: str) -> Dict[str, Dict[str, str]]:
     """
     將公告文字轉換為結構化物件：
@@ -20,10 +30,8 @@ def parse_notice_to_dict(text: str) -> Dict[str, Dict[str, str]]:
         "交易日期": {"start": "114-5-11", "end": "114-5-20"}
     }
     """
-    pattern = r"(登記日期|訂約日期|交易日期)\s*([0-9]+)年([0-9]+)月([0-9]+)日[至到 ]+([0-9]+)年([0-9]+)月([0-9]+)日"
-
     try:
-        matches = re.findall(pattern, text)
+        matches = re.findall(NOTICE_PATTERN, text)
     except re.error as e:
         trace_id = generate_trace_id()
         log_error(ErrorCode.REGEX_COMPILE_ERROR.value, str(e), trace_id)
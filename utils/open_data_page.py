@@ -0,0 +1,182 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+from bs4 import BeautifulSoup
+from playwright.async_api import async_playwright
+
+from config.open_data import OPEN_DATA_URL
+from utils.logger import log_info
+
+# 本期公告文字、歷史期別選單的位置 (與 Playwright 抓取時使用的 selector 相同)
+NOTICE_SELECTOR = "#tab_opendata_active_content span.text-danger"
+HISTORY_OPTION_SELECTOR = "#historySeason_id option"
+HISTORY_TAB_SELECTOR = 'a.btndl[aria-controls="tab_opendata_history_content"]'
+HISTORY_SELECT_SELECTOR = "#historySeason_id"
+
+# 瀏覽器抓取時不需要載入的資源類型 (只讀取文字)
+BLOCKED_RESOURCE_TYPES = {"image", "font", "stylesheet", "media"}
+
+HTTP_TIMEOUT = httpx.Timeout(30.0)
+# 部分政府網站會擋掉預設的 python-httpx User-Agent
+HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; land-bot/1.0)"}
+
+
+async def fetch_open_data_html(url: str = OPEN_DATA_URL) -> str:
+    """
+    以一般 HTTP 請求取得頁面的靜態 HTML (不執行 JavaScript)；
+    在 open_data_session() 內時同一網址只請求一次。
+    """
+    session = _active_session.get()
+    if session is not None and url in session.html:
+        return session.html[url]
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT, headers=HEADERS, follow_redirects=True) as client:
+        response = await client.get(url)
+        response.raise_for_status()
+    log_info(f"☑️[靜態頁面] {url} 取得 {len(response.content)} bytes，耗時 {time.perf_counter() - started:.2f} 秒")
+    if session is not None:
+        session.html[url] = response.text
+    return response.text
+
+
+def parse_notice_text(html: str) -> Optional[str]:
+    """
+    從靜態 HTML 取出本期公告文字；找不到時回傳 None。
+    """
+    span = BeautifulSoup(html, "html.parser").select_one(NOTICE_SELECTOR)
+    if span is None:
+        return None
+    return span.get_text(" ", strip=True) or None
+
+
+def parse_history_options(html: str) -> Dict[str, str]:
+    """
+    從靜態 HTML 取出歷史期別選單 {value: 文字}，略過沒有 value 的選項。
+    """
+    options = BeautifulSoup(html, "html.parser").select(HISTORY_OPTION_SELECTOR)
+    return {opt["value"]: opt.get_text(strip=True) for opt in options if opt.get("value")}
+
+
+T = TypeVar("T")
+
+
+class OpenDataBrowser:
+    """
+    一次更新流程共用的 Playwright 瀏覽器：第一次需要時才啟動 Chromium 並載入頁面，
+    本期公告與歷史期別選單都從同一個分頁讀取，結果會快取；圖片、字型、CSS 等資源一律攔截不載入。
+    timings 紀錄各步驟耗時 (秒)。
+    """
+    def __init__(self, url: str = OPEN_DATA_URL):
+        self.url = url
+        self.html: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+        self._playwright = None
+        self._browser = None
+        self._page = None
+        self._notice_text: Optional[str] = None
+        self._history_options: Optional[Dict[str, str]] = None
+        self._lock = asyncio.Lock()
+
+    async def _timed(self, step: str, awaitable: Awaitable[T]) -> T:
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.timings[step] = round(self.timings.get(step, 0.0) + time.perf_counter() - started, 3)
+
+    @staticmethod
+    async def _block_static_resources(route):
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _ensure_page(self):
+        if self._page is not None:
+            return self._page
+        playwright = await self._timed("啟動", async_playwright().start())
+        browser = None
+        try:
+            browser = await self._timed("啟動", playwright.chromium.launch(headless=True))
+            page = await browser.new_page()
+            await page.route("**/*", self._block_static_resources)
+            await self._timed("載入頁面", page.goto(self.url, timeout=30000))
+        except BaseException:
+            # 載入失敗 (含被取消) 時關閉這次啟動的瀏覽器，重試時不會留下多個 Chromium
+            if browser is not None:
+                await browser.close()
+            await playwright.stop()
+            raise
+        self._playwright, self._browser, self._page = playwright, browser, page
+        return page
+
+    async def notice_text(self) -> str:
+        async with self._lock:
+            if self._notice_text is None:
+                page = await self._ensure_page()
+                # 等待元素渲染出來
+                self._notice_text = await self._timed(
+                    "本期公告", page.locator(NOTICE_SELECTOR).inner_text(timeout=10000))
+            return self._notice_text
+
+    async def history_options(self) -> Dict[str, str]:
+        async with self._lock:
+            if self._history_options is None:
+                page = await self._ensure_page()
+                self._history_options = await self._timed("歷史期別", self._read_history_options(page))
+            return self._history_options
+
+    async def _read_history_options(self, page) -> Dict[str, str]:
+        # 切換到「歷史資料」分頁，等待 select 出現
+        await page.locator(HISTORY_TAB_SELECTOR).click()
+        select_locator = page.locator(HISTORY_SELECT_SELECTOR)
+        await select_locator.wait_for(timeout=10000)
+
+        options = {}
+        for opt in await select_locator.locator("option").element_handles():
+            value = await opt.get_attribute("value")
+            if value:
+                options[value] = (await opt.inner_text()).strip()
+        return options
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            steps = "、".join(f"{step} {seconds:.2f} 秒" for step, seconds in self.timings.items())
+            log_info(f"📊[瀏覽器抓取] {steps}")
+        self._playwright = self._browser = self._page = None
+
+
+_active_session: ContextVar[Optional[OpenDataBrowser]] = ContextVar("open_data_session", default=None)
+
+
+@asynccontextmanager
+async def open_data_session(url: str = OPEN_DATA_URL):
+    """
+    一次更新流程的範圍：範圍內的靜態 HTML 與瀏覽器分頁都共用，離開時關閉瀏覽器。
+    """
+    session = OpenDataBrowser(url)
+    token = _active_session.set(session)
+    try:
+        yield session
+    finally:
+        _active_session.reset(token)
+        await session.close()
+
+
+async def with_browser(url: str, action: Callable[[OpenDataBrowser], Awaitable[T]]) -> T:
+    """
+    在目前 open_data_session() 的瀏覽器上執行 action；不在範圍內 (例如單獨呼叫 API) 時建立一次性的瀏覽器。
+    """
+    session = _active_session.get()
+    if session is not None and session.url == url:
+        return await action(session)
+    async with open_data_session(url) as session:
+        return await action(session)